@@ -2,6 +2,9 @@
 
 # Script to run Postman/Newman API tests
 # Usage: ./run-tests.sh [dev|prod]
+#
+# "Transcribe - Queue Full" is skipped unless the server runs with JOB_QUEUE_MAX_SIZE=0
+# and expect_queue_full is set, e.g. by adding --env-var "expect_queue_full=true" below
 
 set -e
 
@@ -0,0 +1,98 @@
+import os
+import time
+import logging
+from typing import Optional
+
+import av
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SAMPLING_RATE = 16000
+BYTES_PER_SAMPLE = 4  # float32
+
+
+class DecodedAudio:
+    """
+    An upload decoded once to 16 kHz mono float32 PCM in a file on disk.
+
+    array is a read-only memory map of that file, so every stage (language
+    detection, inference, chunking, retries) gets zero-copy views of the same
+    samples instead of decoding the upload again.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.num_samples = os.path.getsize(path) // BYTES_PER_SAMPLE
+        if self.num_samples == 0:
+            raise ValueError("No audio could be decoded from the file")
+        self._array: Optional[np.ndarray] = None
+
+    @property
+    def duration(self) -> float:
+        """Exact duration in seconds"""
+        return self.num_samples / SAMPLING_RATE
+
+    @property
+    def array(self) -> np.ndarray:
+        """The samples as a read-only memory-mapped float32 array"""
+        if self._array is None:
+            self._array = np.memmap(self.path, dtype=np.float32, mode="r", shape=(self.num_samples,))
+        return self._array
+
+    def window(self, start_seconds: float, end_seconds: Optional[float] = None) -> np.ndarray:
+        """Zero-copy view of the samples between two timestamps"""
+        start = max(0, int(start_seconds * SAMPLING_RATE))
+        end = self.num_samples if end_seconds is None else min(self.num_samples, int(end_seconds * SAMPLING_RATE))
+        return self.array[start:end]
+
+    def close(self):
+        """Drop the memory map"""
+        self._array = None
+
+    def delete(self):
+        """Drop the memory map and delete the PCM file"""
+        self.close()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def decode_to_pcm(input_path: str, pcm_path: str) -> DecodedAudio:
+    """
+    Decode an audio file to 16 kHz mono float32 PCM at pcm_path.
+
+    Frames are resampled and written as they are decoded, so memory stays flat
+    whatever the length of the file. The PCM is written under a temporary name
+    and renamed when complete, so an existing pcm_path is always a full decode.
+    """
+    start = time.time()
+    partial_path = pcm_path + ".part"
+    resampler = av.audio.resampler.AudioResampler(format="flt", layout="mono", rate=SAMPLING_RATE)
+    try:
+        with av.open(input_path, mode="r", metadata_errors="ignore") as container, open(partial_path, "wb") as out:
+            frames = container.decode(audio=0)
+            while True:
+                try:
+                    frame = next(frames)
+                except StopIteration:
+                    break
+                except av.error.InvalidDataError:
+                    continue  # Skip corrupt frames like faster-whisper does
+                for resampled in resampler.resample(frame):
+                    out.write(resampled.to_ndarray().tobytes())
+            # Flush samples buffered in the resampler
+            for resampled in resampler.resample(None):
+                out.write(resampled.to_ndarray().tobytes())
+        os.replace(partial_path, pcm_path)
+    except BaseException:
+        try:
+            os.unlink(partial_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+    decoded = DecodedAudio(pcm_path)
+    logger.info(f"Decoded {input_path} to PCM: {decoded.duration:.1f}s of audio in {time.time() - start:.1f}s")
+    return decoded
@@ -0,0 +1,67 @@
+from typing import List, Tuple
+
+import numpy as np
+from faster_whisper.vad import VadOptions, get_speech_timestamps
+
+from app.audio import SAMPLING_RATE
+
+
+def find_silence_gaps(
+    audio: np.ndarray,
+    sampling_rate: int = SAMPLING_RATE,
+    window_seconds: float = 600
+) -> List[Tuple[int, int]]:
+    """
+    Return (start, end) sample ranges of the silences between detected speech.
+
+    VAD runs over fixed windows of the audio, because it copies its input;
+    running it over a whole multi-hour memory map would materialize the file.
+    """
+    window = int(window_seconds * sampling_rate)
+    gaps = []
+    previous_end = 0
+    for window_start in range(0, len(audio), window):
+        speech = get_speech_timestamps(
+            np.asarray(audio[window_start:window_start + window]),
+            VadOptions(min_silence_duration_ms=500, speech_pad_ms=200),
+            sampling_rate=sampling_rate
+        )
+        for span in speech:
+            span_start = window_start + span["start"]
+            if span_start > previous_end:
+                gaps.append((previous_end, span_start))
+            previous_end = window_start + span["end"]
+    if previous_end < len(audio):
+        gaps.append((previous_end, len(audio)))
+    return gaps
+
+
+def plan_chunks(
+    total_samples: int,
+    gaps: List[Tuple[int, int]],
+    target_seconds: float,
+    sampling_rate: int = SAMPLING_RATE
+) -> List[Tuple[int, int]]:
+    """
+    Split [0, total_samples) into chunks of roughly target_seconds.
+
+    Each cut is placed in the middle of the silence gap closest to the ideal
+    boundary, searching half a chunk either side. Without a usable gap the cut
+    falls on the ideal boundary.
+    """
+    target = int(target_seconds * sampling_rate)
+    if target <= 0 or total_samples <= target * 1.5:
+        return [(0, total_samples)]
+
+    midpoints = [(start + end) // 2 for start, end in gaps]
+    chunks = []
+    chunk_start = 0
+    while total_samples - chunk_start > target * 1.5:
+        ideal = chunk_start + target
+        candidates = [m for m in midpoints if ideal - target // 2 <= m <= ideal + target // 2]
+        cut = min(candidates, key=lambda m: abs(m - ideal)) if candidates else ideal
+        chunks.append((chunk_start, cut))
+        chunk_start = cut
+    chunks.append((chunk_start, total_samples))
+    return chunks
+
@@ -1,6 +1,6 @@
 from pydantic_settings import BaseSettings
-from pydantic import ConfigDict
-from typing import Optional, List
+from pydantic import ConfigDict, model_validator
+from typing import Optional, List, Dict
 
 
 class Settings(BaseSettings):
@@ -13,6 +13,19 @@ class Settings(BaseSettings):
     
     # Redis
     redis_url: Optional[str] = None
+    redis_max_connections: int = 20  # Per pool; the API (async) and the job workers (sync) each have one
+    redis_pool_timeout: float = 5.0  # Seconds a job worker waits for a free pooled connection
+    redis_socket_timeout: float = 5.0  # Seconds a single command may take before it is retried
+    redis_connect_timeout: float = 5.0
+    redis_retries: int = 2  # Retries after a connection error or timeout, with exponential backoff
+    redis_health_check_interval: int = 30  # Idle connections are PINGed before reuse after this many seconds
+    
+    # In-process cache of Redis reads (usage and job records), invalidated by this process's writes
+    read_cache_enabled: bool = True
+    read_cache_max_entries: int = 10000
+    read_cache_usage_ttl_seconds: float = 10.0
+    read_cache_job_ttl_seconds: float = 2.0  # Bounds how stale another node's job progress can be
+    read_cache_cross_node: bool = False  # Announce writes over Redis pub/sub so other nodes invalidate at once
     
     # File Limits
     max_file_size_mb: int = 500
@@ -35,8 +48,63 @@ class Settings(BaseSettings):
     
     # Storage
     storage_root: str = "/data/transcriptions"
+    upload_dir: str = "/data/uploads"  # Uploads are streamed here and handed to the job
+    upload_session_ttl_hours: int = 24  # Resumable uploads idle this long are deleted
     model_cache_dir: str = "/data/whisper_models"
+    model_cache_budget_mb: int = 1200  # Resident model memory before idle models are evicted
+    model_preload_dir: Optional[str] = "/opt/whisper_models"  # Models baked into the image at build time
+    warmup_models: List[str] = ["tiny", "base"]  # Loaded and warmed up at startup (empty list disables warm-up)
+    
+    # Language detection pre-pass with the tiny model when language is "auto"
+    language_detection_prepass: bool = True
+    language_detection_windows: int = 3  # 30 s windows spread over the file
+    language_detection_threshold: float = 0.7  # Below this the main model detects the language itself
+    
+    # Batched inference (faster-whisper BatchedInferencePipeline over VAD-bounded chunks)
+    batched_inference: bool = False
+    batch_sizes: Dict[str, int] = {"tiny": 16, "base": 8, "small": 4}  # Larger batches trade peak memory for throughput
+    
+    # Parallel chunked transcription of long files (split at silences)
+    # Chunks transcribed at once (1 disables chunking). Models get cpu_count / chunk_parallelism threads each,
+    # so on the Fly VM's 2 shared vCPUs chunks would only contend; raise it on larger machines
+    chunk_parallelism: int = 1
+    chunk_min_duration: int = 1800  # Files at least this long (seconds), and shorter than streaming_min_duration, are chunked
+    chunk_target_seconds: int = 600  # Approximate chunk length
+    
+    # Windowed streaming transcription (the longest files, and resumed jobs)
+    streaming_min_duration: int = 3600  # Files at least this long (seconds) are streamed, chunking on or off
+    stream_window_seconds: int = 600  # Audio fed to the model per window
+    stream_overlap_seconds: int = 30  # Tail of each window decoded again by the next
+    
+    # Transcript cache (re-uploads of identical audio skip inference; entries encrypted per requester)
+    transcript_cache_enabled: bool = True
+    transcript_cache_dir: str = "/data/transcript_cache"
+    transcript_cache_ttl_hours: int = 24  # Entries are deleted this long after they were written
+    transcript_cache_max_entries: int = 500
+    transcript_cache_max_mb: int = 200
+    transcript_cache_secret: Optional[str] = None  # Falls back to API_KEY
     ttl_days: int = 7
+    expiry_sweep_interval_seconds: int = 300  # Expired transcriptions are deleted in the background this often
+    expiry_sweep_max_jobs: int = 200  # Job directories deleted per sweep at most
+    
+    # Disk space on the data volume (models, uploads and transcripts share it)
+    storage_evict_below_mb: int = 2048  # Free space below which old transcripts are evicted
+    storage_refuse_below_mb: int = 256  # Uploads that would leave less than this free are refused
+    storage_check_interval_seconds: int = 30
+    storage_usage_refresh_seconds: int = 900  # Bytes used per area are re-measured this often
+    
+    # Job Queue
+    inference_workers: int = 1  # Concurrent transcriptions (each uses both CPUs)
+    job_queue_max_size: int = 10  # Waiting jobs before new uploads get 503
+    execution_mode: str = "thread"  # "thread" (in the API process) or "process" (isolated worker processes)
+    job_max_resumes: int = 3  # Restarts a job may be resumed after before it is failed (e.g. one that keeps crashing the process)
+    
+    @model_validator(mode="after")
+    def check_stream_window(self) -> "Settings":
+        # Each window must end past the overlap dropped from it, or streaming never advances
+        if self.stream_window_seconds <= self.stream_overlap_seconds:
+            raise ValueError("stream_window_seconds must be greater than stream_overlap_seconds")
+        return self
     
     model_config = ConfigDict(
         env_file=".env",
@@ -0,0 +1,121 @@
+import os
+import json
+import zlib
+import struct
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+# Magic and header length; then the JSON header and the sections it points at
+PREAMBLE = struct.Struct("<4sI")
+MAGIC = b"CSJ1"
+
+
+@dataclass
+class Section:
+    """Where a section lies in its container; size is the uncompressed size of gzip sections"""
+    path: Path
+    offset: int
+    length: int
+    size: int
+    encoding: Optional[str] = None
+
+
+def gzip_bytes(data: bytes) -> bytes:
+    """gzip data with no name and a zero mtime, so equal input gives equal bytes"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+def write_gzip(path: Path, chunks: Iterable[bytes]) -> int:
+    """gzip chunks into path as gzip_bytes would, put in place with one rename; returns the uncompressed size"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    size = 0
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in chunks:
+                size += len(chunk)
+                f.write(compressor.compress(chunk))
+            f.write(compressor.flush())
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except FileNotFoundError:
+            pass
+        raise
+    return size
+
+
+def write_container(path: Path, metadata: Dict[str, Any], sections: Dict[str, bytes], compressed: Dict[str, int]):
+    """
+    Write a job's single-file container and put it in place with one rename.
+
+    sections maps names to their bytes; compressed maps the names of gzip
+    sections to their uncompressed size. The header records each section's
+    offset, so a reader seeks straight to the one it needs.
+    """
+    table = {}
+    offset = 0
+    for name, data in sections.items():
+        table[name] = {"offset": offset, "length": len(data)}
+        if name in compressed:
+            table[name].update(encoding="gzip", size=compressed[name])
+        offset += len(data)
+    header = json.dumps({"metadata": metadata, "sections": table}).encode("utf-8")
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(PREAMBLE.pack(MAGIC, len(header)))
+            f.write(header)
+            for data in sections.values():
+                f.write(data)
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def read_header(path: Path) -> Dict[str, Any]:
+    """
+    {"metadata", "sections"} of a container, section offsets made absolute.
+    Raises FileNotFoundError if there is none, ValueError if it isn't one.
+    """
+    with open(path, "rb") as f:
+        magic, header_length = PREAMBLE.unpack(f.read(PREAMBLE.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a job container")
+        header = json.loads(f.read(header_length))
+    start = PREAMBLE.size + header_length
+    for section in header["sections"].values():
+        section["offset"] += start
+    return header
+
+
+def find_section(path: Path, header: Dict[str, Any], name: str) -> Optional[Section]:
+    """A section of a container whose header was read, or None if it has no such section"""
+    entry = header["sections"].get(name)
+    if entry is None:
+        return None
+    return Section(
+        path=path,
+        offset=entry["offset"],
+        length=entry["length"],
+        size=entry.get("size", entry["length"]),
+        encoding=entry.get("encoding")
+    )
+
+
+def read_section(section: Section) -> bytes:
+    """A section's bytes, decompressed"""
+    with open(section.path, "rb") as f:
+        f.seek(section.offset)
+        data = f.read(section.length)
+    return zlib.decompress(data, 31) if section.encoding == "gzip" else data
@@ -0,0 +1,151 @@
+import os
+import re
+import zlib
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+
+from app.container import Section
+
+BLOCK_SIZE = 64 * 1024
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+QUALITY_PATTERN = re.compile(r"q=([0-9.]+)")
+
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """True if an Accept-Encoding header allows gzip"""
+    qualities = {}
+    for item in (accept_encoding or "").split(","):
+        name, _, params = item.partition(";")
+        match = QUALITY_PATTERN.search(params)
+        try:
+            qualities[name.strip().lower()] = float(match.group(1)) if match else 1.0
+        except ValueError:
+            qualities[name.strip().lower()] = 0.0
+    quality = qualities.get("gzip", qualities.get("x-gzip", qualities.get("*", 0.0)))
+    return quality > 0
+
+
+def serve_stored_output(request: Request, section: Section, media_type: str, filename: str) -> Response:
+    """
+    Serve a stored output (a section of a job container, or a format rendered
+    next to it) with ETag revalidation and single byte ranges.
+
+    A gzip section goes out as stored (Content-Encoding: gzip) to clients that
+    accept gzip, and is decompressed while streaming for the rest; each of the
+    two has its own ETag, and ranges count bytes of the one being sent.
+    """
+    stat = os.stat(section.path)
+    tag = f"{stat.st_size:x}-{stat.st_mtime_ns:x}-{section.offset:x}"
+    encoding = section.encoding
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "private, no-cache",
+        "Content-Disposition": f'attachment; filename="{filename}"'
+    }
+    if encoding == "gzip":
+        headers["Vary"] = "Accept-Encoding"
+    decompress = encoding == "gzip" and not accepts_gzip(request.headers.get("accept-encoding"))
+    if decompress:
+        length = section.size
+        headers["ETag"] = f'"{tag}-identity"'
+    else:
+        length = section.length
+        headers["ETag"] = f'"{tag}"'
+        if encoding:
+            headers["Content-Encoding"] = encoding
+
+    if _etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers={
+            key: value for key, value in headers.items() if key in ("Cache-Control", "ETag", "Vary")
+        })
+
+    start, end = 0, length
+    byte_range = _requested_range(request, headers["ETag"])
+    if byte_range:
+        byte_range = _resolve_range(byte_range, length)
+        if byte_range is None:
+            return Response(status_code=416, headers={"Content-Range": f"bytes */{length}"})
+        start, end = byte_range
+        headers["Content-Range"] = f"bytes {start}-{end - 1}/{length}"
+    headers["Content-Length"] = str(end - start)
+
+    if decompress:
+        body = _read_decompressed(section, start, end)
+    else:
+        body = _read_file(section.path, section.offset + start, section.offset + end)
+    return StreamingResponse(
+        body,
+        status_code=206 if byte_range else 200,
+        media_type=media_type,
+        headers=headers
+    )
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    # Weak comparison, as If-None-Match calls for
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in (tag[2:] if tag.startswith("W/") else tag for tag in tags)
+
+
+def _requested_range(request: Request, etag: str) -> Optional[Tuple[str, str]]:
+    """The (first, last) strings of a single-range Range header, unless If-Range says the file changed"""
+    match = RANGE_PATTERN.match(request.headers.get("range", "").strip())
+    if not match or match.groups() == ("", ""):
+        return None  # Absent, multiple ranges or malformed: the whole file is sent
+    if_range = request.headers.get("if-range")
+    if if_range is not None and if_range.strip() != etag:
+        return None
+    return match.group(1), match.group(2)
+
+
+def _resolve_range(byte_range: Tuple[str, str], length: int) -> Optional[Tuple[int, int]]:
+    """Half-open [start, end) of a range within length bytes, or None if unsatisfiable"""
+    first, last = byte_range
+    if not first:
+        # Suffix range: the last N bytes
+        suffix = int(last)
+        if suffix == 0 or length == 0:
+            return None
+        return max(0, length - suffix), length
+    start = int(first)
+    end = min(int(last) + 1, length) if last else length
+    if start >= length or start >= end:
+        return None
+    return start, end
+
+
+def _read_file(path: Path, start: int, end: int) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            block = f.read(min(BLOCK_SIZE, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            yield block
+
+
+def _read_decompressed(section: Section, start: int, end: int) -> Iterator[bytes]:
+    # Decompresses from the beginning of the section; bytes before start are dropped
+    decompressor = zlib.decompressobj(31)
+    position = 0
+    with open(section.path, "rb") as f:
+        f.seek(section.offset)
+        remaining = section.length
+        while position < end:
+            block = f.read(min(BLOCK_SIZE, remaining))
+            remaining -= len(block)
+            data = decompressor.decompress(block) if block else decompressor.flush()
+            if data:
+                chunk_start, chunk_end = max(start - position, 0), min(end - position, len(data))
+                if chunk_start < chunk_end:
+                    yield data[chunk_start:chunk_end]
+                position += len(data)
+            if not block:
+                break
@@ -0,0 +1,79 @@
+import json
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+
+import redis.asyncio as aioredis
+from redis.asyncio.retry import Retry as AsyncRetry
+from starlette.requests import Request
+
+from app.config import settings
+from app.redis_client import connection_options, job_events_channel
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_SECONDS = 15  # Keeps proxies from closing an idle stream
+FINAL_EVENTS = ("completed", "failed")
+
+# One connection pool shared by all subscribers in this process. A subscription
+# holds its connection for the whole stream, so this is kept apart from the
+# bounded pool that request handlers use for commands.
+_subscriber_client: Optional[aioredis.Redis] = None
+
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    """Encode one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def get_subscriber_client() -> aioredis.Redis:
+    global _subscriber_client
+    if _subscriber_client is None:
+        _subscriber_client = aioredis.from_url(settings.redis_url, **connection_options(AsyncRetry))
+    return _subscriber_client
+
+
+async def stream_job_events(
+    job_id: str,
+    request: Request,
+    load_status: Callable[[], Awaitable[Optional[Dict[str, Any]]]]
+) -> AsyncIterator[str]:
+    """
+    Server-Sent Events for one job, relayed from its Redis pub/sub channel.
+
+    The channel is subscribed before load_status reads the job's state (from
+    Redis, past the read cache), so nothing published in between is missed:
+    the stream opens with a "status" event holding that state and then
+    carries "progress", "language" and "segment" events until a final
+    "completed" or "failed" event. Segments produced before the client
+    connected are not replayed.
+    """
+    pubsub = get_subscriber_client().pubsub()
+    await pubsub.subscribe(job_events_channel(job_id))
+    try:
+        status = await load_status()
+        if status is None:
+            yield format_sse("failed", {"error": "Transcription not found"})
+            return
+        yield format_sse("status", status)
+        if status.get("status") in FINAL_EVENTS:
+            return
+
+        idle = 0.0
+        while True:
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            if message is None:
+                if await request.is_disconnected():
+                    return
+                idle += 1.0
+                if idle >= HEARTBEAT_SECONDS:
+                    idle = 0.0
+                    yield ": keepalive\n\n"
+                continue
+            idle = 0.0
+            payload = json.loads(message["data"])
+            yield format_sse(payload["event"], payload["data"])
+            if payload["event"] in FINAL_EVENTS:
+                return
+    finally:
+        await pubsub.unsubscribe()
+        await pubsub.close()
@@ -0,0 +1,72 @@
+import json
+from typing import Callable, Dict, Iterator
+
+from app.segments import SegmentStore
+
+# Download formats and their media types
+MEDIA_TYPES = {
+    "txt": "text/plain",
+    "srt": "text/srt",
+    "vtt": "text/vtt",
+    "json": "application/json",
+    "tsv": "text/tab-separated-values"
+}
+
+
+def format_timestamp(seconds: float, separator: str = ",") -> str:
+    """Format seconds as HH:MM:SS,mmm (SRT) or, with separator ".", HH:MM:SS.mmm (VTT)"""
+    total_ms = max(0, int(round(seconds * 1000)))
+    hours, remainder = divmod(total_ms, 3_600_000)
+    minutes, remainder = divmod(remainder, 60_000)
+    secs, millis = divmod(remainder, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}{separator}{millis:03d}"
+
+
+def render_txt(segments: SegmentStore, language: str, duration: float) -> Iterator[str]:
+    """The transcript as one paragraph, the same text as segments.text()"""
+    last = len(segments) - 1
+    for index, (_, _, text) in enumerate(segments):
+        if index == 0:
+            text = text.lstrip()
+        else:
+            text = " " + text
+        yield text.rstrip() if index == last else text
+
+
+def render_srt(segments: SegmentStore, language: str, duration: float) -> Iterator[str]:
+    """One SubRip cue per segment"""
+    for index, (start, end, text) in enumerate(segments, start=1):
+        yield f"{index}\n{format_timestamp(start)} --> {format_timestamp(end)}\n{text.strip()}\n\n"
+
+
+def render_vtt(segments: SegmentStore, language: str, duration: float) -> Iterator[str]:
+    """One WebVTT cue per segment"""
+    yield "WEBVTT\n\n"
+    for start, end, text in segments:
+        yield f"{format_timestamp(start, '.')} --> {format_timestamp(end, '.')}\n{text.strip()}\n\n"
+
+
+def render_json(segments: SegmentStore, language: str, duration: float) -> Iterator[str]:
+    """{"language", "duration", "segments": [{"start", "end", "text"}]}"""
+    yield f'{{"language": {json.dumps(language)}, "duration": {json.dumps(duration)}, "segments": ['
+    for index, (start, end, text) in enumerate(segments):
+        segment = json.dumps({"start": round(start, 3), "end": round(end, 3), "text": text.strip()})
+        yield segment if index == 0 else ", " + segment
+    yield "]}\n"
+
+
+def render_tsv(segments: SegmentStore, language: str, duration: float) -> Iterator[str]:
+    """start, end (integer milliseconds) and text per line, like Whisper's tsv output"""
+    yield "start\tend\ttext\n"
+    for start, end, text in segments:
+        text = " ".join(text.split())  # No tabs or newlines inside a field
+        yield f"{int(round(start * 1000))}\t{int(round(end * 1000))}\t{text}\n"
+
+
+RENDERERS: Dict[str, Callable[[SegmentStore, str, float], Iterator[str]]] = {
+    "txt": render_txt,
+    "srt": render_srt,
+    "vtt": render_vtt,
+    "json": render_json,
+    "tsv": render_tsv
+}
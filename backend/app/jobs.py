@@ -0,0 +1,145 @@
+import math
+import threading
+import time
+import logging
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue cannot accept another job"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Job queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class JobQueue:
+    """
+    Bounded FIFO of transcription jobs served by a fixed pool of inference workers.
+
+    Jobs wait in the queue until one of `num_workers` worker threads is free, so
+    at most `num_workers` transcriptions compete for CPU and RAM at any time.
+    Once `max_size` jobs are waiting, submit() raises QueueFullError.
+    """
+
+    def __init__(self, num_workers: int, max_size: int):
+        self.num_workers = max(1, num_workers)
+        self.max_size = max(0, max_size)
+        self._pending: Deque[Tuple[str, Callable[[], None], float]] = deque()
+        self._running: Dict[str, Tuple[float, float]] = {}  # job_id -> (started_at, estimated_time)
+        self._cond = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._stopping = False
+        self._completed = 0
+        self._rejected = 0
+
+    def start(self):
+        """Start the inference worker threads"""
+        with self._cond:
+            if self._threads:
+                return
+            self._stopping = False
+            for i in range(self.num_workers):
+                thread = threading.Thread(
+                    target=self._worker_loop,
+                    name=f"inference-worker-{i}",
+                    daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+        logger.info(f"Job queue started with {self.num_workers} worker(s), max queue size {self.max_size}")
+
+    def stop(self, timeout: float = 5.0):
+        """Stop accepting work and wake the workers so they can exit"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+            threads = list(self._threads)
+            self._threads = []
+        for thread in threads:
+            thread.join(timeout=timeout)
+        logger.info("Job queue stopped")
+
+    def is_full(self) -> bool:
+        """True if a new job would be rejected"""
+        with self._cond:
+            return len(self._pending) >= self.max_size
+
+    def submit(self, job_id: str, fn: Callable[[], None], estimated_time: float = 0.0, force: bool = False) -> int:
+        """
+        Queue a job for execution and return its 1-based queue position.
+        Raises QueueFullError if the queue is at capacity, unless force is set
+        (for jobs that were admitted before, e.g. resumed after a restart).
+        """
+        with self._cond:
+            if self._stopping:
+                raise QueueFullError(self._retry_after_locked())
+            if len(self._pending) >= self.max_size and not force:
+                self._rejected += 1
+                raise QueueFullError(self._retry_after_locked())
+            self._pending.append((job_id, fn, estimated_time))
+            position = len(self._pending)
+            self._cond.notify()
+        logger.info(f"Queued job {job_id} at position {position}")
+        return position
+
+    def position(self, job_id: str) -> Optional[int]:
+        """1-based position of a waiting job, 0 if it is running, None if unknown"""
+        with self._cond:
+            if job_id in self._running:
+                return 0
+            for index, (pending_id, _, _) in enumerate(self._pending):
+                if pending_id == job_id:
+                    return index + 1
+        return None
+
+    def retry_after(self) -> int:
+        """Seconds a rejected client should wait before retrying"""
+        with self._cond:
+            return self._retry_after_locked()
+
+    def stats(self) -> Dict[str, int]:
+        """Queue depth and counters for monitoring"""
+        with self._cond:
+            return {
+                "workers": self.num_workers,
+                "running": len(self._running),
+                "queued": len(self._pending),
+                "max_queue_size": self.max_size,
+                "completed": self._completed,
+                "rejected": self._rejected
+            }
+
+    def _retry_after_locked(self) -> int:
+        # Remaining work ahead of a new job, spread over the workers
+        now = time.time()
+        remaining = sum(
+            max(0.0, estimated - (now - started))
+            for started, estimated in self._running.values()
+        )
+        remaining += sum(estimated for _, _, estimated in self._pending)
+        seconds = math.ceil(remaining / self.num_workers) if remaining else 0
+        return int(min(max(seconds, 10), 600))
+
+    def _worker_loop(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopping:
+                    self._cond.wait()
+                if self._stopping:
+                    return
+                job_id, fn, estimated_time = self._pending.popleft()
+                self._running[job_id] = (time.time(), estimated_time)
+
+            logger.info(f"Worker {threading.current_thread().name} picked up job {job_id}")
+            try:
+                fn()
+            except Exception as e:
+                logger.error(f"Unhandled error in job {job_id}: {str(e)}", exc_info=True)
+            finally:
+                with self._cond:
+                    self._running.pop(job_id, None)
+                    self._completed += 1
@@ -0,0 +1,112 @@
+import os
+import json
+import time
+import logging
+from pathlib import Path
+from typing import Any, Dict, List
+
+from app.config import settings
+from app.segments import SegmentStore
+
+logger = logging.getLogger(__name__)
+
+# Files in a job's storage directory while the job runs
+JOURNAL_NAME = "segments.jsonl"  # One [start, end, text] line per finished segment
+JOB_STATE_NAME = "job.json"  # What is needed to run the job again after a restart
+PCM_NAME = "audio.pcm"  # The decoded audio, kept so a resumed job doesn't decode again
+
+
+class SegmentJournal:
+    """
+    Append-only journal of a job's finished segments, in timeline order.
+
+    Each segment is written and flushed as it is produced, so a crash loses at
+    most the segment being decoded; the file is fsynced every fsync_interval
+    seconds against losing the machine as well. The journal covers the audio
+    up to the end of its last segment, which is where a resumed job starts.
+    """
+
+    def __init__(self, path: Path, fsync_interval: float = 5.0):
+        self.path = path
+        self.fsync_interval = fsync_interval
+        _truncate_partial_line(path)
+        self._file = open(path, "a", encoding="utf-8")
+        self._last_fsync = time.time()
+
+    def append(self, start: float, end: float, text: str):
+        """Write one finished segment"""
+        self._file.write(json.dumps([start, end, text]) + "\n")
+        self._file.flush()
+        if time.time() - self._last_fsync >= self.fsync_interval:
+            os.fsync(self._file.fileno())
+            self._last_fsync = time.time()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+
+
+def _truncate_partial_line(path: Path):
+    """Drop a last line cut short by a crash, so appending starts on a fresh line"""
+    try:
+        with open(path, "rb+") as f:
+            data = f.read()
+            if data and not data.endswith(b"\n"):
+                f.truncate(data.rfind(b"\n") + 1)
+    except FileNotFoundError:
+        pass
+
+
+def read_journal(path: Path) -> SegmentStore:
+    """Segments in a journal, ignoring a last line cut short by a crash"""
+    segments = SegmentStore()
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    start, end, text = json.loads(line)
+                except ValueError:
+                    break
+                segments.append(start, end, text)
+    except FileNotFoundError:
+        pass
+    return segments
+
+
+def write_job_state(job_dir: Path, state: Dict[str, Any]):
+    """Record a running job so it can be resumed after a restart"""
+    job_dir.mkdir(parents=True, exist_ok=True)
+    tmp_path = job_dir / (JOB_STATE_NAME + ".tmp")
+    tmp_path.write_text(json.dumps(state), encoding="utf-8")
+    os.replace(tmp_path, job_dir / JOB_STATE_NAME)
+
+
+def clear_job_state(job_dir: Path):
+    """Remove the resume state, journal and decoded audio of a finished job, and its then empty directory"""
+    for name in (JOB_STATE_NAME, JOURNAL_NAME, PCM_NAME, PCM_NAME + ".part"):
+        try:
+            (job_dir / name).unlink()
+        except FileNotFoundError:
+            pass
+    try:
+        job_dir.rmdir()
+    except OSError:
+        pass  # Gone already, or not empty
+
+
+def find_interrupted_jobs() -> List[Dict[str, Any]]:
+    """States of jobs that were queued or running when the process stopped"""
+    storage_root = Path(settings.storage_root)
+    if not storage_root.exists():
+        return []
+    states = []
+    for state_path in storage_root.glob(f"*/*/{JOB_STATE_NAME}"):
+        try:
+            states.append(json.loads(state_path.read_text(encoding="utf-8")))
+        except Exception as e:
+            logger.warning(f"Skipping unreadable job state {state_path}: {str(e)}")
+    # Oldest first, so jobs resume in their original order
+    states.sort(key=lambda state: state.get("submitted_at", 0))
+    return states
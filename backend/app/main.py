@@ -1,15 +1,18 @@
 import os
-import tempfile
+import time
+import functools
+import threading
 import logging
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Header, BackgroundTasks, Query
+from fastapi import FastAPI, Form, HTTPException, Header, Query
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from starlette.requests import Request
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
-from typing import Optional
+from typing import Any, Dict, Optional
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -24,20 +27,96 @@ from app.models import (
     MinutesBalance,
     UsageLimit
 )
-from app.transcription import transcribe_audio, estimate_transcription_time
+from app.transcription import (
+    transcribe_audio,
+    estimate_transcription_time,
+    warm_up_models,
+    model_cache,
+    decoding_signature
+)
+from app.transcript_cache import transcript_cache
+from app.read_cache import read_cache
+from app.storage_manager import storage_manager
+from app.events import stream_job_events
+from app.formats import MEDIA_TYPES
+from app.downloads import serve_stored_output
+from app.journal import (
+    JOURNAL_NAME,
+    PCM_NAME,
+    SegmentJournal,
+    read_journal,
+    write_job_state,
+    clear_job_state,
+    find_interrupted_jobs
+)
 from app.security import validate_upload
+from app.uploads import (
+    receive_upload,
+    discard_upload,
+    create_upload_session,
+    get_upload_session,
+    session_status,
+    write_upload_chunk,
+    hash_file,
+    take_upload_data,
+    restore_upload_data,
+    delete_upload_session,
+    cleanup_stale_upload_sessions,
+    restore_upload_reservations
+)
 from app.storage import (
     save_transcription_outputs,
-    get_transcription_files,
+    get_transcription_text,
+    find_output,
+    get_storage_path,
+    delete_transcription,
     generate_job_id,
-    cleanup_expired_transcriptions
+    index_expiry,
+    cleanup_expired_transcriptions,
+    ExpirySweeper
 )
-from app.redis_client import RedisClient
+from app.redis_client import RedisClient, AsyncRedisClient, ProgressPublisher, InsufficientMinutesError
+from app.jobs import JobQueue, QueueFullError
+from app.worker_pool import ProcessWorkerPool
 from app.config import settings
 
 
-# Initialize Redis client
+# Initialize Redis clients: async for request handlers, sync for job workers
 redis_client = RedisClient()
+async_redis = AsyncRedisClient()
+
+# Job progress is written to Redis in the background, stale updates coalesced
+progress_publisher = ProgressPublisher(redis_client)
+expiry_sweeper = ExpirySweeper(settings.expiry_sweep_interval_seconds, settings.expiry_sweep_max_jobs)
+
+# Bounded queue of transcription jobs, served by a fixed number of inference workers
+job_queue = JobQueue(
+    num_workers=settings.inference_workers,
+    max_size=settings.job_queue_max_size
+)
+
+# In "process" mode inference runs in isolated worker processes, one per queue worker
+worker_pool = (
+    ProcessWorkerPool(settings.inference_workers, warmup_models=settings.warmup_models)
+    if settings.execution_mode == "process" else None
+)
+
+# Set once startup model warm-up has finished; /health reports "not ready" until then
+warmup_done = threading.Event()
+
+# Set on shutdown so jobs cut off by it are left to resume instead of failing
+shutting_down = threading.Event()
+
+
+def run_warmup():
+    """Load and warm the default models in the background at startup"""
+    try:
+        warm_up_models(settings.warmup_models)
+    except Exception as e:
+        logger.error(f"Model warm-up failed: {str(e)}", exc_info=True)
+    finally:
+        # Jobs still load models on demand if warm-up failed
+        warmup_done.set()
 
 # Initialize rate limiter
 limiter = Limiter(key_func=get_remote_address)
@@ -53,18 +132,47 @@ app.add_middleware(
     CORSMiddleware,
     allow_origins=allowed_origins,
     allow_credentials=True,
-    allow_methods=["GET", "POST"],
+    allow_methods=["GET", "POST", "PUT", "DELETE"],
     allow_headers=["*"],
 )
 
 # Background task for cleanup
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup: ensure directories exist
+    # Startup: connect the request handlers' Redis pool and ensure directories exist
+    await async_redis.connect()
     os.makedirs("/data/whisper_models", exist_ok=True)
     os.makedirs("/data/transcriptions", exist_ok=True)
+    os.makedirs(settings.upload_dir, exist_ok=True)
+    if settings.transcript_cache_enabled:
+        os.makedirs(settings.transcript_cache_dir, exist_ok=True)
+    restore_upload_reservations()
+    storage_manager.start()
+    if worker_pool:
+        # Worker processes warm up their own models
+        worker_pool.start()
+    else:
+        threading.Thread(target=run_warmup, name="model-warmup", daemon=True).start()
+    progress_publisher.start()
+    # Other nodes' writes to usage and job records, dropped from this node's read cache
+    invalidation_listener = None
+    if settings.read_cache_cross_node and redis_client.client:
+        invalidation_listener = redis_client.listen_for_invalidations()
+    job_queue.start()
+    resume_interrupted_jobs()
+    expiry_sweeper.start()
     yield
-    # Shutdown: cleanup if needed
+    # Shutdown: stop inference workers
+    shutting_down.set()
+    expiry_sweeper.stop()
+    storage_manager.stop()
+    job_queue.stop()
+    progress_publisher.stop()
+    if invalidation_listener:
+        invalidation_listener.stop()
+    if worker_pool:
+        worker_pool.stop()
+    await async_redis.close()
 
 app.router.lifespan_context = lifespan
 
@@ -76,22 +184,71 @@ def verify_api_key(x_api_key: Optional[str] = Header(None)) -> bool:
     return x_api_key == settings.api_key
 
 
+def raise_queue_full(retry_after: int):
+    """Reject a request because the job queue is full"""
+    raise HTTPException(
+        status_code=503,
+        detail="Server is busy with other transcriptions. Please try again shortly.",
+        headers={"Retry-After": str(retry_after)}
+    )
+
+
+def raise_insufficient_minutes(error: InsufficientMinutesError):
+    """Reject a job whose minutes could not be reserved"""
+    if error.is_paid:
+        raise HTTPException(
+            status_code=402,
+            detail=f"Insufficient minutes. Required: {error.required:.1f}, Available: {error.available:.1f}"
+        )
+    kind = "free" if error.tier == "tiny_base" else "premium"
+    raise HTTPException(
+        status_code=403,
+        detail=f"Insufficient {kind} minutes. Required: {error.required:.1f}, Available: {error.available:.1f}"
+    )
+
+
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
+    """Health check endpoint, 503 until model warm-up has finished"""
+    ready = worker_pool.is_ready() if worker_pool else warmup_done.is_set()
+    if not ready:
+        return JSONResponse(status_code=503, content={"status": "not ready", "detail": "Warming up models"})
     return {"status": "ok"}
 
 
+@app.get("/metrics")
+async def get_metrics(
+    x_api_key: Optional[str] = Header(None)
+):
+    """Queue, worker, cache and background task counters for tuning"""
+    if not verify_api_key(x_api_key):
+        raise HTTPException(status_code=401, detail="Invalid API key")
+    
+    return {
+        "queue": job_queue.stats(),
+        "workers": worker_pool.stats() if worker_pool else None,
+        # In process mode models live in the worker processes (see workers.model_cache)
+        "model_cache": model_cache.stats(),
+        "transcript_cache": transcript_cache.stats(),
+        "progress_publisher": progress_publisher.stats(),
+        "read_cache": read_cache.stats(),
+        "expiry_sweeper": expiry_sweeper.stats(),
+        "storage": storage_manager.stats()
+    }
+
+
 @app.post("/transcribe", response_model=TranscriptionResponse)
 async def transcribe(
-    background_tasks: BackgroundTasks,
-    file: UploadFile = File(...),
-    language: str = Form("auto"),
-    model: str = Form("base"),
-    fingerprint: str = Form(...),
+    request: Request,
     x_api_key: Optional[str] = Header(None)
 ):
-    """Transcribe audio file"""
+    """
+    Transcribe audio file.
+    
+    Multipart form fields: file, language ("auto"), model ("base"), fingerprint.
+    The body is parsed here rather than through File()/Form() parameters so the
+    file is streamed to disk once instead of being spooled and copied.
+    """
     # Rate limiting - check manually (skip for now in dev, will add back later)
     # rate_limit_key = get_remote_address(request) if request else "unknown"
     # if not redis_client.set_rate_limit(rate_limit_key, 10, 3600):
@@ -100,14 +257,148 @@ async def transcribe(
     if not verify_api_key(x_api_key):
         raise HTTPException(status_code=401, detail="Invalid API key")
     
-    # Get usage info
-    usage = redis_client.get_usage(fingerprint)
+    # Reject early when the queue is full, before reading the upload
+    if job_queue.is_full():
+        raise_queue_full(job_queue.retry_after())
+    
+    upload = await receive_upload(request)
+    try:
+        fingerprint = upload.fields.get("fingerprint")
+        if not fingerprint:
+            raise HTTPException(status_code=400, detail="Missing form field 'fingerprint'")
+        return await submit_transcription(
+            upload_path=upload.path,
+            filename=upload.filename,
+            fingerprint=fingerprint,
+            language=upload.fields.get("language", "auto"),
+            model=upload.fields.get("model", "base"),
+            content_hash=upload.sha256
+        )
+    except BaseException:
+        # The job owns the file only once it has been queued
+        discard_upload(upload.path)
+        raise
+
+
+@app.post("/uploads")
+async def create_upload(
+    fingerprint: str = Form(...),
+    filename: str = Form(...),
+    size: int = Form(...),
+    x_api_key: Optional[str] = Header(None)
+):
+    """Start a resumable upload of `size` bytes; PUT chunks to /uploads/{upload_id}"""
+    if not verify_api_key(x_api_key):
+        raise HTTPException(status_code=401, detail="Invalid API key")
+    
+    # Opportunistic GC of abandoned sessions
+    await run_in_threadpool(cleanup_stale_upload_sessions)
+    session = await run_in_threadpool(create_upload_session, fingerprint, filename, size)
+    return session_status(session)
+
+
+@app.put("/uploads/{upload_id}")
+async def upload_chunk(
+    upload_id: str,
+    request: Request,
+    fingerprint: str = Query(...),
+    x_api_key: Optional[str] = Header(None)
+):
+    """Write one chunk; the body's position is given by Content-Range: bytes start-end/total"""
+    if not verify_api_key(x_api_key):
+        raise HTTPException(status_code=401, detail="Invalid API key")
+    
+    return await write_upload_chunk(request, upload_id, fingerprint)
+
+
+@app.get("/uploads/{upload_id}")
+async def get_upload(
+    upload_id: str,
+    fingerprint: str = Query(...),
+    x_api_key: Optional[str] = Header(None)
+):
+    """Received ranges and the contiguous offset to resume from"""
+    if not verify_api_key(x_api_key):
+        raise HTTPException(status_code=401, detail="Invalid API key")
+    
+    return session_status(get_upload_session(upload_id, fingerprint))
+
+
+@app.delete("/uploads/{upload_id}")
+async def abort_upload(
+    upload_id: str,
+    fingerprint: str = Query(...),
+    x_api_key: Optional[str] = Header(None)
+):
+    """Abandon a resumable upload and delete its data"""
+    if not verify_api_key(x_api_key):
+        raise HTTPException(status_code=401, detail="Invalid API key")
+    
+    get_upload_session(upload_id, fingerprint)
+    await run_in_threadpool(delete_upload_session, upload_id)
+    return {"success": True}
+
+
+@app.post("/uploads/{upload_id}/complete", response_model=TranscriptionResponse)
+async def complete_upload(
+    upload_id: str,
+    fingerprint: str = Form(...),
+    language: str = Form("auto"),
+    model: str = Form("base"),
+    x_api_key: Optional[str] = Header(None)
+):
+    """Turn a fully received upload into a transcription job"""
+    if not verify_api_key(x_api_key):
+        raise HTTPException(status_code=401, detail="Invalid API key")
+    
+    if job_queue.is_full():
+        raise_queue_full(job_queue.retry_after())
+    
+    session = get_upload_session(upload_id, fingerprint)
+    status = session_status(session)
+    if not status["complete"]:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Upload incomplete: {status['received_bytes']} of {status['size']} bytes received"
+        )
+    
+    upload_path = await run_in_threadpool(take_upload_data, session)
+    try:
+        response = await submit_transcription(
+            upload_path=upload_path,
+            filename=session["filename"],
+            fingerprint=fingerprint,
+            language=language,
+            model=model
+        )
+    except BaseException:
+        # Keep the session so the client can finalize again (e.g. after buying minutes)
+        restore_upload_data(session, upload_path)
+        raise
+    await run_in_threadpool(delete_upload_session, upload_id)
+    return response
+
+
+async def submit_transcription(
+    upload_path: str,
+    filename: str,
+    fingerprint: str,
+    language: str,
+    model: str,
+    content_hash: Optional[str] = None
+) -> TranscriptionResponse:
+    """
+    Validate an upload on disk, check the caller's minutes and queue a job for it.
+    On success the job takes ownership of upload_path and deletes it when done.
+    content_hash is the upload's SHA-256 if it was hashed while streaming in.
+    """
+    # Get usage info (paid users may upload longer files)
+    usage = await async_redis.get_usage(fingerprint)
     is_paid = usage.get("is_paid", False)
-    minutes = usage.get("minutes", 0.0)
     
     # Validate and get file info
     try:
-        safe_filename, duration = await validate_upload(file, is_paid=is_paid)
+        safe_filename, duration = await run_in_threadpool(validate_upload, upload_path, filename, is_paid)
     except HTTPException:
         raise
     except Exception as e:
@@ -126,163 +417,393 @@ async def transcribe(
             detail=f"Model '{model_size.value}' is currently unavailable due to server memory constraints. Please use tiny, base, or small models."
         )
     
-    # Check free tier limits
-    if not is_paid:
-        tiny_base_minutes_used = usage.get("tiny_base_minutes_used", 0.0)
-        premium_minutes_used = usage.get("premium_minutes_used", 0.0)
-        duration_minutes = duration / 60.0
-        
-        if model_size in [ModelSize.TINY, ModelSize.BASE]:
-            remaining_free_minutes = 45.0 - tiny_base_minutes_used
-            if duration_minutes > remaining_free_minutes:
-                raise HTTPException(
-                    status_code=403,
-                    detail=f"Insufficient free minutes. Required: {duration_minutes:.1f}, Available: {remaining_free_minutes:.1f}"
-                )
-        elif model_size == ModelSize.SMALL:
-            # Only small model allowed in free tier premium minutes (medium/large disabled due to RAM)
-            remaining_premium_minutes = 5.0 - premium_minutes_used
-            if duration_minutes > remaining_premium_minutes:
-                raise HTTPException(
-                    status_code=403,
-                    detail=f"Insufficient premium minutes. Required: {duration_minutes:.1f}, Available: {remaining_premium_minutes:.1f}"
-                )
+    # Check and hold the minutes in one atomic step, so concurrent jobs can't spend the same minutes
+    try:
+        reservation = await async_redis.reserve_minutes(fingerprint, model_size.value, duration / 60.0)
+    except InsufficientMinutesError as e:
+        raise_insufficient_minutes(e)
     
-    # Check minutes balance for paid users
-    if is_paid:
-        duration_minutes = duration / 60.0
-        if minutes < duration_minutes:
-            raise HTTPException(
-                status_code=402,
-                detail=f"Insufficient minutes. Required: {duration_minutes:.1f}, Available: {minutes:.1f}"
+    # Until a job owns the reservation, a failure releases it
+    reservation_owned = False
+    # Set once this request runs the transcription that identical submissions follow
+    leading = False
+    job_dir = None
+    try:
+        # Identical audio already transcribed (or being transcribed) for this requester
+        cache_key = None
+        if settings.transcript_cache_enabled:
+            if content_hash is None:
+                content_hash = await run_in_threadpool(hash_file, upload_path)
+            cache_key = transcript_cache.key(
+                fingerprint, content_hash, model_size.value, language, decoding_signature(model_size)
             )
+            cached = await run_in_threadpool(transcript_cache.get, cache_key, fingerprint, content_hash)
+            if cached:
+                job_id = generate_job_id()
+                logger.info(f"Serving job {job_id} from the transcript cache")
+                await run_in_threadpool(complete_job, job_id, fingerprint, model_size, is_paid, duration, cached, reservation)
+                reservation_owned = True  # Committed with the usage
+                discard_upload(upload_path)
+                return TranscriptionResponse(
+                    job_id=job_id,
+                    status="completed",
+                    message="Transcription completed (identical audio was transcribed before)"
+                )
+        
+        # Generate job ID
+        job_id = generate_job_id()
+        
+        # Estimate transcription time
+        estimated_time = estimate_transcription_time(duration, model_size)
+        
+        # Store initial job metadata with estimated time
+        await async_redis.store_job_metadata(job_id, {
+            "fingerprint": fingerprint,
+            "status": "queued",
+            "duration": duration,
+            "model": model_size.value,
+            "progress": 0.0,
+            "elapsed_time": 0.0,
+            "estimated_total_time": estimated_time,
+            "time_remaining": estimated_time
+        })
+        
+        # Follow a job already transcribing the same audio instead of queueing another
+        job_dir = get_storage_path(fingerprint, job_id)
+        if cache_key:
+            follower = {"job_id": job_id, "is_paid": is_paid, "reservation": reservation}
+            # Persisted before joining, so the follower outlives a restart (see resume_interrupted_jobs);
+            # a leader overwrites it with its own state below
+            write_job_state(job_dir, dict(
+                follower, fingerprint=fingerprint, cache_key=cache_key, follows=True, submitted_at=time.time()
+            ))
+            if transcript_cache.join(cache_key, follower):
+                reservation_owned = True
+                logger.info(f"Job {job_id} follows an in-flight job for the same audio")
+                discard_upload(upload_path)
+                return TranscriptionResponse(
+                    job_id=job_id,
+                    status="queued",
+                    message="Transcription queued (identical audio is already being transcribed)"
+                )
+            leading = True
+        
+        # Everything needed to run the job, persisted so it survives a restart.
+        # The streamed upload goes straight to the job, no further copies.
+        job = {
+            "job_id": job_id,
+            "fingerprint": fingerprint,
+            "model": model_size.value,
+            "language": language,
+            "duration": duration,
+            "is_paid": is_paid,
+            "estimated_time": estimated_time,
+            "upload_path": upload_path,
+            "cache_key": cache_key,
+            "content_hash": content_hash,
+            "reservation": reservation,
+            "submitted_at": time.time()
+        }
+        write_job_state(job_dir, job)
+        # Failed jobs leave a directory behind too
+        index_expiry(fingerprint, job_id)
+        
+        try:
+            position = job_queue.submit(job_id, functools.partial(run_job, job), estimated_time)
+            reservation_owned = True
+        except QueueFullError as e:
+            await async_redis.delete_job_metadata(job_id)
+            delete_transcription(fingerprint, job_id)
+            raise_queue_full(e.retry_after)
+    except BaseException:
+        if not reservation_owned:
+            if job_dir is not None:
+                clear_job_state(job_dir)
+            # Jobs that followed this one while it was being queued would otherwise wait forever
+            if leading:
+                await run_in_threadpool(finish_followers, cache_key, fingerprint, model_size, duration, None)
+            await async_redis.release_minutes(fingerprint, reservation)
+        raise
     
-    # Generate job ID
-    job_id = generate_job_id()
-    
-    # Estimate transcription time
-    estimated_time = estimate_transcription_time(duration, model_size)
-    
-    # Store initial job metadata with estimated time
-    redis_client.store_job_metadata(job_id, {
-        "fingerprint": fingerprint,
-        "status": "processing",
-        "duration": duration,
-        "model": model_size.value,
-        "progress": 0.0,
-        "elapsed_time": 0.0,
-        "estimated_total_time": estimated_time,
-        "time_remaining": estimated_time
-    })
+    return TranscriptionResponse(
+        job_id=job_id,
+        status="queued",
+        message=f"Transcription queued (position {position})"
+    )
+
+
+def run_job(job: Dict[str, Any]):
+    """
+    Run a transcription job on an inference worker.
     
-    # Save file temporarily
-    with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(safe_filename)[1]) as tmp:
-        content = await file.read()
-        tmp.write(content)
-        tmp_path = tmp.name
+    Finished segments are appended to a journal in the job's storage directory
+    and the decoded audio is kept there too, so a job interrupted by a restart
+    resumes after its last journaled segment (see resume_interrupted_jobs).
+    """
+    job_id = job["job_id"]
+    fingerprint = job["fingerprint"]
+    model_size = ModelSize(job["model"])
+    duration = job["duration"]
+    cache_key = job.get("cache_key")
+    job_dir = get_storage_path(fingerprint, job_id)
+    resume_segments = read_journal(job_dir / JOURNAL_NAME)
+    # A language found before the interruption saves detecting it again
+    language = job.get("detected_language") or job["language"]
     
-    # Process transcription in background
-    def process_transcription():
-        try:
-            logger.info(f"Starting transcription for job {job_id}, model: {model_size.value}, duration: {duration}s, language: {language}")
-            
-            # Update status to processing
-            redis_client.store_job_metadata(job_id, {
-                "fingerprint": fingerprint,
-                "status": "processing",
-                "duration": duration,
-                "model": model_size.value,
-                "progress": 0.0,
-                "elapsed_time": 0.0,
-                "estimated_total_time": estimated_time,
-                "time_remaining": estimated_time
-            })
-            
-            # Define progress callback
-            def update_progress(progress: float, elapsed_time: float, estimated_total_time: float):
-                logger.info(f"Job {job_id} progress: {progress:.1%}, elapsed: {elapsed_time:.1f}s, estimated: {estimated_total_time:.1f}s")
-                redis_client.update_job_progress(job_id, progress, elapsed_time, estimated_total_time)
-            
-            # Run transcription with progress tracking
+    result = None
+    journal = None
+    interrupted = False
+    try:
+        logger.info(f"Starting transcription for job {job_id}, model: {model_size.value}, duration: {duration}s, language: {language}")
+        
+        # Update status to processing
+        redis_client.store_job_metadata(job_id, {
+            "fingerprint": fingerprint,
+            "status": "processing",
+            "duration": duration,
+            "model": model_size.value,
+            "progress": 0.0,
+            "elapsed_time": 0.0,
+            "estimated_total_time": job["estimated_time"],
+            "time_remaining": job["estimated_time"]
+        })
+        journal = SegmentJournal(job_dir / JOURNAL_NAME)
+        
+        # This job plus any jobs following it for the same audio
+        def live_job_ids():
+            followers = transcript_cache.followers(cache_key) if cache_key else []
+            return [job_id] + [follower["job_id"] for follower in followers]
+        
+        # Define progress callback
+        def update_progress(progress: float, elapsed_time: float, estimated_total_time: float):
+            logger.info(f"Job {job_id} progress: {progress:.1%}, elapsed: {elapsed_time:.1f}s, estimated: {estimated_total_time:.1f}s")
+            for live_job_id in live_job_ids():
+                progress_publisher.submit(live_job_id, progress, elapsed_time, estimated_total_time)
+        
+        # Publish the language as soon as it's known, before the transcript is done
+        def update_language(detected_language: str, probability: float):
+            logger.info(f"Job {job_id} language: {detected_language} ({probability:.2f})")
+            job["detected_language"] = detected_language
+            write_job_state(job_dir, job)
+            for live_job_id in live_job_ids():
+                progress_publisher.publish(live_job_id, "language", {"language": detected_language, "probability": probability})
+        
+        # Journal each finished segment and stream it to clients on /transcription/{job_id}/events
+        def publish_segment(start: float, end: float, text: str):
+            journal.append(start, end, text)
+            for live_job_id in live_job_ids():
+                progress_publisher.publish(live_job_id, "segment", {"start": start, "end": end, "text": text})
+        
+        # Run transcription with progress tracking
+        transcribe_kwargs = {
+            "progress_callback": update_progress,
+            "language_callback": update_language,
+            "segment_callback": publish_segment,
+            "pcm_path": str(job_dir / PCM_NAME),
+            "resume_segments": resume_segments or None
+        }
+        if worker_pool:
+            logger.info(f"Sending job {job_id} to a worker process")
+            result = worker_pool.transcribe(job_id, job["upload_path"], model_size, language, **transcribe_kwargs)
+        else:
             logger.info(f"Calling transcribe_audio for job {job_id}")
-            result = transcribe_audio(
-                tmp_path, 
-                model_size, 
-                language,
-                audio_duration=duration,
-                progress_callback=update_progress
-            )
-            logger.info(f"Transcription completed for job {job_id}, language detected: {result.get('language')}, text length: {len(result.get('text', ''))}")
-            
-            # Save outputs
-            logger.info(f"Saving transcription outputs for job {job_id}")
-            save_transcription_outputs(
-                fingerprint=fingerprint,
-                job_id=job_id,
-                text=result["text"],
-                language=result["language"],
-                duration=duration
-            )
-            
-            # Update usage
-            logger.info(f"Updating usage for fingerprint {fingerprint}")
-            redis_client.increment_usage(fingerprint, model_size.value, is_paid, duration_seconds=duration)
-            
-            # Deduct minutes if paid (subtract actual minutes transcribed)
-            if is_paid:
-                duration_minutes = duration / 60.0
-                redis_client.deduct_minutes(fingerprint, duration_minutes)
-            
-            # Store job metadata
-            logger.info(f"Marking job {job_id} as completed")
-            redis_client.store_job_metadata(job_id, {
-                "fingerprint": fingerprint,
-                "status": "completed",
-                "language": result["language"],
-                "duration": duration,
-                "model": model_size.value
-            })
-            # Verify it was stored correctly
-            verification = redis_client.get_job_metadata(job_id)
-            logger.info(f"Verified job {job_id} metadata after storing: status={verification.get('status') if verification else None}")
-            
-        except Exception as e:
-            logger.error(f"Transcription failed for job {job_id}: {str(e)}", exc_info=True)
-            redis_client.store_job_metadata(job_id, {
-                "fingerprint": fingerprint,
-                "status": "failed",
-                "error": str(e)
-            })
-        finally:
+            result = transcribe_audio(job["upload_path"], model_size, language, **transcribe_kwargs)
+        logger.info(f"Transcription completed for job {job_id}, language detected: {result.get('language')}, segments: {len(result['segments'])}")
+        
+        complete_job(job_id, fingerprint, model_size, job["is_paid"], duration, result, job.get("reservation"))
+        
+    except Exception as e:
+        if shutting_down.is_set() and result is None:
+            # Killed by a redeploy - keep the journal and resume on the next start
+            interrupted = True
+            logger.warning(f"Job {job_id} interrupted by shutdown, will resume: {str(e)}")
+            return
+        logger.error(f"Transcription failed for job {job_id}: {str(e)}", exc_info=True)
+        fail_job(job_id, fingerprint, str(e), job.get("reservation"))
+    finally:
+        if journal:
+            journal.close()
+        if not interrupted:
+            if cache_key:
+                if result is not None:
+                    try:
+                        transcript_cache.put(cache_key, fingerprint, job["content_hash"], result)
+                    except Exception as e:
+                        logger.warning(f"Failed to cache transcript of job {job_id}: {str(e)}")
+                finish_followers(cache_key, fingerprint, model_size, duration, result)
+            clear_job_state(job_dir)
             # Delete audio file immediately
             try:
-                os.unlink(tmp_path)
-                logger.info(f"Deleted temporary file {tmp_path}")
+                os.unlink(job["upload_path"])
+                logger.info(f"Deleted temporary file {job['upload_path']}")
             except Exception as e:
-                logger.warning(f"Failed to delete temporary file {tmp_path}: {str(e)}")
+                logger.warning(f"Failed to delete temporary file {job['upload_path']}: {str(e)}")
+
+
+def resume_interrupted_jobs():
+    """
+    Queue the jobs a previous process left unfinished; each continues from its journal.
+    Jobs that followed one for identical audio follow it again, or fail if it isn't resumed.
+    """
+    jobs = find_interrupted_jobs()
+    for job in jobs:
+        if job.get("follows"):
+            continue
+        job_id = job["job_id"]
+        job_dir = get_storage_path(job["fingerprint"], job_id)
+        if not os.path.exists(job["upload_path"]) and not (job_dir / PCM_NAME).exists():
+            logger.warning(f"Audio of interrupted job {job_id} is gone, failing it")
+            fail_job(job_id, job["fingerprint"], "Transcription was interrupted", job.get("reservation"))
+            clear_job_state(job_dir)
+            continue
+        # Counted before it runs, so a job that takes the process down with it doesn't resume forever
+        attempts = job.get("resume_attempts", 0) + 1
+        if attempts > settings.job_max_resumes:
+            logger.error(f"Job {job_id} was interrupted {attempts} times, failing it")
+            fail_job(job_id, job["fingerprint"], "Transcription was interrupted too many times", job.get("reservation"))
+            clear_job_state(job_dir)
+            discard_upload(job["upload_path"])
+            continue
+        job["resume_attempts"] = attempts
+        write_job_state(job_dir, job)
+        committed = read_journal(job_dir / JOURNAL_NAME)
+        logger.info(f"Resuming job {job_id} after {committed.last_end:.1f}s")
+        redis_client.store_job_metadata(job_id, {
+            "fingerprint": job["fingerprint"],
+            "status": "queued",
+            "duration": job["duration"],
+            "model": job["model"],
+            "progress": 0.0,
+            "elapsed_time": 0.0,
+            "estimated_total_time": job["estimated_time"],
+            "time_remaining": job["estimated_time"]
+        })
+        if job.get("cache_key"):
+            # In flight again, for its followers below and identical submissions
+            transcript_cache.join(job["cache_key"], None)
+        # Already admitted once, so not subject to the queue limit
+        job_queue.submit(job_id, functools.partial(run_job, job), job["estimated_time"], force=True)
     
-    background_tasks.add_task(process_transcription)
+    for follower in jobs:
+        if not follower.get("follows"):
+            continue
+        if transcript_cache.join(follower["cache_key"], follower):
+            logger.info(f"Job {follower['job_id']} follows its resumed job again")
+            continue
+        # Nothing to follow: undo the join, which recorded the follower as running it
+        transcript_cache.finish(follower["cache_key"])
+        logger.warning(f"Job {follower['job_id']} followed a job that wasn't resumed, failing it")
+        fail_job(follower["job_id"], follower["fingerprint"], "Transcription was interrupted", follower.get("reservation"))
+        clear_job_state(get_storage_path(follower["fingerprint"], follower["job_id"]))
+
+
+def complete_job(
+    job_id: str,
+    fingerprint: str,
+    model_size: ModelSize,
+    is_paid: bool,
+    duration: float,
+    result: Dict[str, Any],
+    reservation: Optional[Dict[str, Any]] = None
+):
+    """Save a finished transcription's outputs, charge usage (releasing its reservation) and mark the job completed"""
+    # Exact duration from the decode; usage is still charged on the duration checked at upload
+    exact_duration = result.get("duration", duration)
     
-    return TranscriptionResponse(
+    # Save outputs
+    logger.info(f"Saving transcription outputs for job {job_id}")
+    save_transcription_outputs(
+        fingerprint=fingerprint,
         job_id=job_id,
-        status="queued",
-        message="Transcription started"
+        segments=result["segments"],
+        language=result["language"],
+        duration=exact_duration
     )
+    
+    # Update usage, and deduct the minutes if paid, in one atomic step
+    logger.info(f"Updating usage for fingerprint {fingerprint}")
+    redis_client.commit_usage(fingerprint, model_size.value, is_paid, duration / 60.0, reservation)
+    
+    # Store job metadata
+    logger.info(f"Marking job {job_id} as completed")
+    progress_publisher.discard(job_id)
+    redis_client.store_job_metadata(job_id, {
+        "fingerprint": fingerprint,
+        "status": "completed",
+        "language": result["language"],
+        "duration": exact_duration,
+        "model": model_size.value,
+        "peak_rss_mb": result.get("peak_rss_mb")
+    })
+    # Verify it was stored correctly
+    verification = redis_client.get_job_metadata(job_id)
+    logger.info(f"Verified job {job_id} metadata after storing: status={verification.get('status') if verification else None}")
+    progress_publisher.publish(job_id, "completed", {
+        "language": result["language"],
+        "duration": exact_duration,
+        "download_urls": get_download_urls(job_id)
+    })
+
+
+def get_download_urls(job_id: str) -> Dict[str, str]:
+    """Download URLs of a completed job (relative paths for now)"""
+    return {
+        "txt": f"/download/{job_id}/txt",
+        "srt": f"/download/{job_id}/srt",
+        "vtt": f"/download/{job_id}/vtt",
+        "json": f"/download/{job_id}/json",
+        "tsv": f"/download/{job_id}/tsv"
+    }
+
+
+def fail_job(job_id: str, fingerprint: str, error: str, reservation: Optional[Dict[str, Any]] = None):
+    """Mark a job as failed and release the minutes it reserved"""
+    progress_publisher.discard(job_id)
+    redis_client.release_minutes(fingerprint, reservation)
+    redis_client.store_job_metadata(job_id, {
+        "fingerprint": fingerprint,
+        "status": "failed",
+        "error": error
+    })
+    progress_publisher.publish(job_id, "failed", {"error": error})
+
+
+def finish_followers(
+    cache_key: str,
+    fingerprint: str,
+    model_size: ModelSize,
+    duration: float,
+    result: Optional[Dict[str, Any]]
+):
+    """Complete the jobs that followed an in-flight transcription with its result, or fail them"""
+    for follower in transcript_cache.finish(cache_key):
+        try:
+            if result is None:
+                fail_job(follower["job_id"], fingerprint, "Transcription failed", follower.get("reservation"))
+            else:
+                complete_job(
+                    follower["job_id"], fingerprint, model_size, follower["is_paid"], duration, result,
+                    follower.get("reservation")
+                )
+        except Exception as e:
+            logger.error(f"Failed to finish follower job {follower['job_id']}: {str(e)}", exc_info=True)
+        clear_job_state(get_storage_path(fingerprint, follower["job_id"]))
 
 
 @app.get("/transcription/{job_id}", response_model=TranscriptionResult)
 async def get_transcription(
     job_id: str,
     fingerprint: str = Query(...),
+    partial: bool = Query(False),
     x_api_key: Optional[str] = Header(None)
 ):
-    """Get transcription result or progress"""
+    """Get transcription result or progress; with partial=true a running job includes the text so far"""
     if not verify_api_key(x_api_key):
         raise HTTPException(status_code=401, detail="Invalid API key")
     
     # Get job metadata
-    metadata = redis_client.get_job_metadata(job_id)
-    logger.info(f"GET /transcription/{job_id}: Retrieved metadata from Redis: status={metadata.get('status') if metadata else None}, metadata_keys={list(metadata.keys()) if metadata else None}")
+    metadata = await async_redis.get_job_metadata(job_id)
+    logger.debug(f"GET /transcription/{job_id}: Retrieved metadata from Redis: status={metadata.get('status') if metadata else None}, metadata_keys={list(metadata.keys()) if metadata else None}")
     if not metadata:
         raise HTTPException(status_code=404, detail="Transcription not found")
     
@@ -291,13 +812,17 @@ async def get_transcription(
         raise HTTPException(status_code=403, detail="Access denied")
     
     status = metadata.get("status", "queued")
-    logger.info(f"GET /transcription/{job_id}: Determined status={status}, will return branch: {status}")
+    logger.debug(f"GET /transcription/{job_id}: Determined status={status}, will return branch: {status}")
     
     # If still processing or queued, return progress data
     if status in ["queued", "processing"]:
+        text = ""  # Empty text while processing unless the partial transcript was asked for
+        if partial:
+            segments = await run_in_threadpool(read_journal, get_storage_path(fingerprint, job_id) / JOURNAL_NAME)
+            text = segments.text()
         return TranscriptionResult(
             job_id=job_id,
-            text="",  # Empty text while processing
+            text=text,
             language=metadata.get("language", "unknown"),
             duration=metadata.get("duration", 0),
             download_urls={},  # No download URLs yet
@@ -305,33 +830,23 @@ async def get_transcription(
             progress=metadata.get("progress", 0.0),
             elapsed_time=metadata.get("elapsed_time", 0.0),
             estimated_total_time=metadata.get("estimated_total_time"),
-            time_remaining=metadata.get("time_remaining")
+            time_remaining=metadata.get("time_remaining"),
+            queue_position=job_queue.position(job_id) if status == "queued" else None
         )
     
     # If completed, return full result
     if status == "completed":
-        # Get files
-        files = get_transcription_files(fingerprint, job_id)
-        if not files:
+        # Rendered from the stored segments on first read, then memoized
+        text = await run_in_threadpool(get_transcription_text, fingerprint, job_id)
+        if text is None:
             raise HTTPException(status_code=404, detail="Transcription files not found")
         
-        # Read text file
-        with open(files["txt"], "r", encoding="utf-8") as f:
-            text = f.read()
-        
-        # Build download URLs (relative paths for now)
-        download_urls = {
-            "txt": f"/download/{job_id}/txt",
-            "srt": f"/download/{job_id}/srt",
-            "vtt": f"/download/{job_id}/vtt"
-        }
-        
         return TranscriptionResult(
             job_id=job_id,
             text=text,
             language=metadata.get("language", "unknown"),
             duration=metadata.get("duration", 0),
-            download_urls=download_urls,
+            download_urls=get_download_urls(job_id),
             status="completed"
         )
     
@@ -339,19 +854,67 @@ async def get_transcription(
     raise HTTPException(status_code=500, detail=metadata.get("error", "Transcription failed"))
 
 
+@app.get("/transcription/{job_id}/events")
+async def transcription_events(
+    job_id: str,
+    request: Request,
+    fingerprint: str = Query(...),
+    x_api_key: Optional[str] = Header(None)
+):
+    """
+    Live job events as Server-Sent Events, instead of polling /transcription/{job_id}.
+    
+    Opens with a "status" event (the job's current state), then streams "progress",
+    "language" and "segment" events and ends with "completed" or "failed".
+    """
+    if not verify_api_key(x_api_key):
+        raise HTTPException(status_code=401, detail="Invalid API key")
+    
+    metadata = await async_redis.get_job_metadata(job_id)
+    if not metadata:
+        raise HTTPException(status_code=404, detail="Transcription not found")
+    if metadata.get("fingerprint") != fingerprint:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    async def load_status() -> Optional[Dict[str, Any]]:
+        # Read after subscribing, so it must be current: a cached record could predate events already missed
+        current = await async_redis.get_job_metadata(job_id, fresh=True)
+        if current is None:
+            return None
+        status = {key: value for key, value in current.items() if key != "fingerprint"}
+        if status.get("status") == "queued":
+            status["queue_position"] = job_queue.position(job_id)
+        elif status.get("status") == "completed":
+            status["download_urls"] = get_download_urls(job_id)
+        return status
+    
+    return StreamingResponse(
+        stream_job_events(job_id, request, load_status),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @app.get("/download/{job_id}/{format}")
 async def download_transcription(
     job_id: str,
     format: str,
+    request: Request,
     fingerprint: str = Query(...),
     x_api_key: Optional[str] = Header(None)
 ):
-    """Download transcription file"""
+    """
+    Download transcription file (txt, srt, vtt, json or tsv).
+    
+    Formats are stored gzip-compressed in the job's container; clients accepting
+    gzip get the stored bytes as they are. Repeat downloads support ETag (304)
+    and Range.
+    """
     if not verify_api_key(x_api_key):
         raise HTTPException(status_code=401, detail="Invalid API key")
     
     # Get job metadata
-    metadata = redis_client.get_job_metadata(job_id)
+    metadata = await async_redis.get_job_metadata(job_id)
     if not metadata:
         raise HTTPException(status_code=404, detail="Transcription not found")
     
@@ -359,29 +922,14 @@ async def download_transcription(
     if metadata.get("fingerprint") != fingerprint:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    # Get files
-    files = get_transcription_files(fingerprint, job_id)
-    if not files:
-        raise HTTPException(status_code=404, detail="Transcription files not found")
-    
-    # Get file path
-    if format not in files:
+    if format not in MEDIA_TYPES:
         raise HTTPException(status_code=400, detail=f"Invalid format: {format}")
     
-    file_path = files[format]
-    
-    # Determine media type
-    media_types = {
-        "txt": "text/plain",
-        "srt": "text/srt",
-        "vtt": "text/vtt"
-    }
+    section = await run_in_threadpool(find_output, fingerprint, job_id, format, download=True)
+    if section is None:
+        raise HTTPException(status_code=404, detail="Transcription files not found")
     
-    return FileResponse(
-        file_path,
-        media_type=media_types.get(format, "application/octet-stream"),
-        filename=f"transcription.{format}"
-    )
+    return serve_stored_output(request, section, MEDIA_TYPES[format], f"transcription.{format}")
 
 
 @app.get("/minutes", response_model=MinutesBalance)
@@ -393,7 +941,7 @@ async def get_minutes(
     if not verify_api_key(x_api_key):
         raise HTTPException(status_code=401, detail="Invalid API key")
     
-    usage = redis_client.get_usage(fingerprint)
+    usage = await async_redis.get_usage(fingerprint)
     return MinutesBalance(
         minutes=usage.get("minutes", 0.0),
         email=usage.get("email")
@@ -411,11 +959,7 @@ async def add_minutes(
     if not verify_api_key(x_api_key):
         raise HTTPException(status_code=401, detail="Invalid API key")
     
-    usage = redis_client.get_usage(fingerprint)
-    current_minutes = usage.get("minutes", 0.0)
-    new_minutes = current_minutes + minutes
-    
-    redis_client.set_minutes(fingerprint, new_minutes, email)
+    new_minutes = await async_redis.add_minutes(fingerprint, minutes, email)
     
     return {"success": True, "minutes": new_minutes}
 
@@ -433,7 +977,7 @@ async def add_minutes_by_email(
         raise HTTPException(status_code=400, detail="Invalid email address")
     if minutes <= 0:
         raise HTTPException(status_code=400, detail="Minutes must be positive")
-    total = redis_client.add_minutes_by_email(email.strip(), minutes)
+    total = await async_redis.add_minutes_by_email(email.strip(), minutes)
     return {"success": True, "minutes": total}
 
 
@@ -454,7 +998,7 @@ async def claim_minutes(
     email_lower = email.lower().strip()
 
     # First: if admin added minutes by email (pending bucket), merge into this fingerprint
-    merged = redis_client.merge_pending_into_fingerprint(fingerprint, email_lower)
+    merged = await async_redis.merge_pending_into_fingerprint(fingerprint, email_lower)
     if merged:
         return MinutesBalance(
             minutes=merged.get("minutes", 0.0),
@@ -462,14 +1006,14 @@ async def claim_minutes(
         )
     
     # Else: find existing usage by email (e.g. from Stripe) and link
-    existing = redis_client.find_usage_by_email(email_lower)
+    existing = await async_redis.find_usage_by_email(email_lower)
     if not existing:
         raise HTTPException(
             status_code=404,
             detail="No minutes found for this email address"
         )
     
-    usage = redis_client.link_fingerprint_to_email(fingerprint, email_lower)
+    usage = await async_redis.link_fingerprint_to_email(fingerprint, email_lower)
     
     return MinutesBalance(
         minutes=usage.get("minutes", 0.0),
@@ -486,7 +1030,7 @@ async def get_usage_limits(
     if not verify_api_key(x_api_key):
         raise HTTPException(status_code=401, detail="Invalid API key")
     
-    usage = redis_client.get_usage(fingerprint)
+    usage = await async_redis.get_usage(fingerprint)
     is_paid = usage.get("is_paid", False)
     
     if is_paid:
@@ -510,12 +1054,20 @@ async def get_usage_limits(
 async def cleanup_expired(
     x_api_key: Optional[str] = Header(None)
 ):
-    """Manual cleanup endpoint (should be called by cron)"""
+    """Manual cleanup endpoint; expired transcriptions are also swept in the background"""
     if not verify_api_key(x_api_key):
         raise HTTPException(status_code=401, detail="Invalid API key")
     
-    deleted = cleanup_expired_transcriptions()
-    return {"deleted": deleted, "message": f"Cleaned up {deleted} expired transcriptions"}
+    reclaimed = await run_in_threadpool(cleanup_expired_transcriptions)
+    expiry_sweeper.record(reclaimed)
+    await run_in_threadpool(cleanup_stale_upload_sessions)
+    await run_in_threadpool(transcript_cache.cleanup)
+    deleted = reclaimed["jobs"]
+    return {
+        "deleted": deleted,
+        "bytes_reclaimed": reclaimed["bytes"],
+        "message": f"Cleaned up {deleted} expired transcriptions"
+    }
 
 
 if __name__ == "__main__":
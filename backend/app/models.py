@@ -37,6 +37,7 @@ class TranscriptionResult(BaseModel):
     elapsed_time: Optional[float] = None  # seconds
     estimated_total_time: Optional[float] = None  # seconds
     time_remaining: Optional[float] = None  # seconds
+    queue_position: Optional[int] = None  # 1-based while queued, 0 once running
 
 
 class MinutesBalance(BaseModel):
@@ -0,0 +1,124 @@
+import json
+import time
+import uuid
+import threading
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Pub/sub channel on which nodes announce the keys they wrote (when cross-node invalidation is on)
+INVALIDATION_CHANNEL = "read_cache:invalidate"
+
+# Identifies this process in invalidation messages, so it skips its own
+NODE_ID = uuid.uuid4().hex
+
+
+class ReadCache:
+    """
+    Bounded in-process cache of Redis reads, in front of both Redis clients.
+
+    Each key type (the key's prefix, e.g. "usage" or "job") has its own TTL;
+    types without one are never cached. The clients invalidate every key they
+    write once the write is done, so reads in this process see their own
+    writes at once and other nodes' writes within the TTL, or at once with
+    cross-node invalidation. A read that raced a write is not cached: lookup()
+    returns the key's version and put() drops the value if the key was
+    invalidated in between. Least recently used keys go first at max_entries.
+    """
+
+    def __init__(self, max_entries: int, ttls: Dict[str, float]):
+        self.max_entries = max_entries
+        self.ttls = ttls
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()  # key -> (expires_at, value)
+        self._versions: "OrderedDict[str, int]" = OrderedDict()  # key -> invalidation count
+        self._lock = threading.Lock()
+        self._hits: Dict[str, int] = {key_type: 0 for key_type in ttls}
+        self._misses: Dict[str, int] = {key_type: 0 for key_type in ttls}
+        self.invalidations = 0
+
+    def lookup(self, key: str) -> Tuple[bool, Any, int]:
+        """(hit, value, version) of key; after a miss, pass the version to put() with the value read"""
+        key_type = key.split(":", 1)[0]
+        if key_type not in self.ttls:
+            return False, None, 0
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self._hits[key_type] += 1
+                return True, _copy(entry[1]), 0
+            self._misses[key_type] += 1
+            return False, None, self._versions.get(key, 0)
+
+    def put(self, key: str, value: Any, version: int):
+        """Cache a value read from Redis, unless key was invalidated since its lookup()"""
+        ttl = self.ttls.get(key.split(":", 1)[0])
+        if not ttl:
+            return
+        with self._lock:
+            if self._versions.get(key, 0) != version:
+                return
+            self._entries[key] = (time.monotonic() + ttl, _copy(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, keys: List[str]):
+        """Drop keys that were just written"""
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+                self._versions[key] = self._versions.pop(key, 0) + 1
+                while len(self._versions) > self.max_entries:
+                    self._versions.popitem(last=False)
+            self.invalidations += len(keys)
+
+    def handle_invalidation_message(self, message: Dict[str, Any]):
+        """Invalidate the keys another node announced on INVALIDATION_CHANNEL"""
+        try:
+            payload = json.loads(message["data"])
+            if payload["node"] != NODE_ID:
+                self.invalidate(payload["keys"])
+        except Exception as e:
+            logger.warning(f"Ignoring malformed read cache invalidation: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Hits, misses and hit rate per key type, for monitoring"""
+        with self._lock:
+            by_type = {}
+            for key_type in self.ttls:
+                hits, misses = self._hits[key_type], self._misses[key_type]
+                by_type[key_type] = {
+                    "hits": hits,
+                    "misses": misses,
+                    "hit_rate": round(hits / (hits + misses), 3) if hits + misses else None
+                }
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "invalidations": self.invalidations,
+                "types": by_type
+            }
+
+
+def invalidation_message(keys: List[str]) -> str:
+    """Message announcing written keys to the other nodes"""
+    return json.dumps({"node": NODE_ID, "keys": keys})
+
+
+def _copy(value: Any) -> Any:
+    # Callers may update the (flat) dicts they get back
+    return dict(value) if isinstance(value, dict) else value
+
+
+read_cache = ReadCache(
+    max_entries=settings.read_cache_max_entries,
+    ttls={
+        "usage": settings.read_cache_usage_ttl_seconds,
+        "job": settings.read_cache_job_ttl_seconds
+    } if settings.read_cache_enabled else {}
+)
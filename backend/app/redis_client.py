@@ -1,12 +1,313 @@
 import redis
+import redis.asyncio as aioredis
 import os
 import json
-from typing import Optional, Dict, Any
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from redis.asyncio.retry import Retry as AsyncRetry
+from redis.backoff import ExponentialBackoff
+from redis.exceptions import ConnectionError, ResponseError, TimeoutError
+from redis.retry import Retry
 
 from app.config import settings
+from app.read_cache import INVALIDATION_CHANNEL, invalidation_message, read_cache
+
+USAGE_TTL = 86400 * 365  # 1 year
+JOB_TTL = 604800  # 7 days
+
+
+# Sets fields of a job record unless the job has completed or failed, and then
+# publishes an event for it, in one round-trip. Field updates keep the
+# record's TTL. KEYS[1]: job key; ARGV[1]: event channel; ARGV[2]: event
+# message; ARGV[3..]: field, value pairs. Returns 1 if the record was updated.
+UPDATE_LIVE_JOB_SCRIPT = """
+if redis.call('TYPE', KEYS[1])['ok'] ~= 'hash' then
+    return 0
+end
+local status = redis.call('HGET', KEYS[1], 'status')
+if status == '"completed"' or status == '"failed"' then
+    return 0
+end
+for i = 3, #ARGV, 2 do
+    redis.call('HSET', KEYS[1], ARGV[i], ARGV[i + 1])
+end
+redis.call('PUBLISH', ARGV[1], ARGV[2])
+return 1
+"""
+
+
+def job_events_channel(job_id: str) -> str:
+    """Pub/sub channel carrying a job's live events"""
+    return f"job_events:{job_id}"
+
+
+def encode_job_fields(metadata: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Job metadata as the fields of its Redis hash. Each value is stored as JSON
+    so numbers, booleans and None read back as they were written.
+    """
+    return {field: json.dumps(value) for field, value in metadata.items()}
+
+
+def decode_job_fields(fields: Dict[str, str]) -> Optional[Dict[str, Any]]:
+    """Inverse of encode_job_fields; None for a missing record"""
+    if not fields:
+        return None
+    return {field: json.loads(value) for field, value in fields.items()}
+
+
+def job_update_args(job_id: str, event: str, data: Dict[str, Any], fields: Dict[str, Any]) -> list:
+    """ARGV for UPDATE_LIVE_JOB_SCRIPT"""
+    args = [job_events_channel(job_id), json.dumps({"event": event, "data": data})]
+    for field, value in encode_job_fields(fields).items():
+        args += [field, value]
+    return args
+
+
+def progress_fields(progress: float, elapsed_time: float, estimated_total_time: float) -> Dict[str, Any]:
+    """Progress fields of a running job, also the data of its "progress" event"""
+    return {
+        "progress": progress,
+        "elapsed_time": elapsed_time,
+        "estimated_total_time": estimated_total_time,
+        "time_remaining": max(0, estimated_total_time - elapsed_time)
+    }
+
+
+def connection_options(retry_class=Retry) -> Dict[str, Any]:
+    """
+    Timeout, retry and health-check policy shared by the sync and async clients.
+    A command that hits a connection error or timeout is retried on a fresh
+    connection with exponential backoff, so no single call waits longer than
+    about (retries + 1) * socket timeout.
+    """
+    return {
+        "decode_responses": True,
+        "socket_timeout": settings.redis_socket_timeout,
+        "socket_connect_timeout": settings.redis_connect_timeout,
+        "socket_keepalive": True,
+        "health_check_interval": settings.redis_health_check_interval,
+        "retry": retry_class(ExponentialBackoff(cap=1.0, base=0.05), settings.redis_retries),
+        "retry_on_error": [ConnectionError, TimeoutError]
+    }
+
+
+# Reserves a job's minutes: free-tier minutes of the model's tier, or the
+# paid balance, less what other unfinished jobs hold. KEYS[1]: usage key;
+# ARGV[1]: minutes; ARGV[2]: tier; ARGV[3]: free minutes of the tier;
+# ARGV[4]: TTL. Returns {reserved field or "" if short, minutes available, "1" if paid}.
+RESERVE_MINUTES_SCRIPT = """
+local needed = tonumber(ARGV[1])
+local is_paid = redis.call('HGET', KEYS[1], 'is_paid') == '1'
+local field, available
+if is_paid then
+    field = 'reserved_minutes'
+    available = tonumber(redis.call('HGET', KEYS[1], 'minutes') or '0')
+else
+    field = 'reserved_' .. ARGV[2] .. '_minutes'
+    available = tonumber(ARGV[3]) - tonumber(redis.call('HGET', KEYS[1], ARGV[2] .. '_minutes_used') or '0')
+end
+available = available - tonumber(redis.call('HGET', KEYS[1], field) or '0')
+local paid_flag = is_paid and '1' or '0'
+if available < needed then
+    return {'', tostring(available), paid_flag}
+end
+redis.call('HINCRBYFLOAT', KEYS[1], field, ARGV[1])
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return {field, tostring(available - needed), paid_flag}
+"""
+
+# Charges a finished job and releases its reservation. KEYS[1]: usage key;
+# ARGV[1]: minutes; ARGV[2]: tier; ARGV[3]: "1" if paid; ARGV[4]: reserved
+# field ("" for none); ARGV[5]: reserved minutes; ARGV[6]: TTL.
+COMMIT_USAGE_SCRIPT = """
+local minutes = tonumber(ARGV[1])
+if ARGV[4] ~= '' then
+    local reserved = tonumber(redis.call('HGET', KEYS[1], ARGV[4]) or '0')
+    redis.call('HSET', KEYS[1], ARGV[4], tostring(math.max(0, reserved - tonumber(ARGV[5]))))
+end
+redis.call('HINCRBYFLOAT', KEYS[1], ARGV[2] .. '_minutes_used', ARGV[1])
+if ARGV[3] == '1' then
+    local balance = tonumber(redis.call('HGET', KEYS[1], 'minutes') or '0')
+    redis.call('HINCRBYFLOAT', KEYS[1], 'minutes', tostring(-math.max(0, math.min(balance, minutes))))
+    redis.call('HSET', KEYS[1], 'is_paid', '1')
+end
+redis.call('EXPIRE', KEYS[1], ARGV[6])
+return 1
+"""
+
+# Releases a reservation of a job that won't run. KEYS[1]: usage key;
+# ARGV[1]: reserved field; ARGV[2]: reserved minutes.
+RELEASE_MINUTES_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+local reserved = tonumber(redis.call('HGET', KEYS[1], ARGV[1]) or '0')
+redis.call('HSET', KEYS[1], ARGV[1], tostring(math.max(0, reserved - tonumber(ARGV[2]))))
+return 1
+"""
+
+# Moves the minutes pending for an email into a fingerprint's balance.
+# KEYS[1]: pending key; KEYS[2]: usage key; KEYS[3]: email_to_fingerprint key;
+# KEYS[4]: email index key; ARGV[1]: email; ARGV[2]: fingerprint; ARGV[3]: TTL.
+# Returns the new balance, or nil if nothing was pending.
+CLAIM_PENDING_SCRIPT = """
+local pending = redis.call('HGET', KEYS[1], 'minutes')
+if not pending then
+    return false
+end
+local balance = redis.call('HINCRBYFLOAT', KEYS[2], 'minutes', pending)
+redis.call('HSET', KEYS[2], 'email', ARGV[1], 'is_paid', '1')
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+redis.call('SET', KEYS[3], ARGV[2], 'EX', ARGV[3])
+redis.call('SADD', KEYS[4], ARGV[2])
+redis.call('EXPIRE', KEYS[4], ARGV[3])
+redis.call('DEL', KEYS[1])
+return balance
+"""
+
+
+# Fields a fingerprint takes over from the email account it is linked to
+LINKED_USAGE_FIELDS = ("minutes", "tiny_base_minutes_used", "premium_minutes_used", "email", "is_paid")
+
+
+class InsufficientMinutesError(Exception):
+    """Raised when a job's minutes cannot be reserved"""
+
+    def __init__(self, is_paid: bool, tier: str, required: float, available: float):
+        super().__init__(f"Insufficient minutes. Required: {required:.1f}, Available: {available:.1f}")
+        self.is_paid = is_paid
+        self.tier = tier
+        self.required = required
+        self.available = available
+
+
+def usage_tier(model: str) -> str:
+    """Usage counter a model's minutes go to: "tiny_base", or "premium" for small and up"""
+    return "tiny_base" if model in ["tiny", "base"] else "premium"
+
+
+def free_tier_minutes(tier: str) -> float:
+    """Free minutes of a usage tier"""
+    return settings.free_tiny_base_minutes if tier == "tiny_base" else settings.free_premium_minutes
+
+
+def default_usage() -> Dict[str, Any]:
+    """Usage of a fingerprint that has none recorded"""
+    return {
+        "tiny_base_minutes_used": 0.0,
+        "premium_minutes_used": 0.0,
+        "is_paid": False,
+        "email": None,
+        "minutes": 0.0
+    }
+
+
+def encode_usage(usage: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Usage as the fields of its Redis hash: numbers as plain decimals so
+    HINCRBYFLOAT and the scripts above can change them in place, is_paid as
+    "1" or "0" and no field for a missing email.
+    """
+    fields = {}
+    for field, value in usage.items():
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            fields[field] = "1" if value else "0"
+        else:
+            fields[field] = str(value)
+    return fields
+
+
+def decode_usage(fields: Dict[str, str]) -> Dict[str, Any]:
+    """Inverse of encode_usage, with defaults for missing fields"""
+    usage = default_usage()
+    for field, value in fields.items():
+        if field == "is_paid":
+            usage[field] = value == "1"
+        elif field == "email":
+            usage[field] = value
+        else:
+            try:
+                usage[field] = float(value)
+            except ValueError:
+                usage[field] = value
+    return usage
+
+
+def parse_usage(data: Optional[str]) -> Dict[str, Any]:
+    """Usage from the JSON string it was stored as before usage records were hashes"""
+    if not data:
+        return default_usage()
+    usage = json.loads(data)
+    # Ensure minute fields exist (for backward compatibility with old count-based data)
+    if "tiny_base_minutes_used" not in usage:
+        usage["tiny_base_minutes_used"] = 0.0
+    if "premium_minutes_used" not in usage:
+        usage["premium_minutes_used"] = 0.0
+    return usage
+
+
+def is_wrong_type(error: ResponseError) -> bool:
+    """True for an error from a hash command run on a record still stored as a JSON string"""
+    return "WRONGTYPE" in str(error)
+
+
+def email_index_key(email: str) -> str:
+    """
+    Set of the fingerprints whose usage records carry an email. Every write
+    that sets an email adds to it; entries left behind when a record's email
+    changes or expires are skipped and removed by find_usage_by_email.
+    """
+    return f"email_index:{email.lower()}"
+
+
+def queue_email_index(pipe, email: str, fingerprint: str):
+    """Queue adding a fingerprint to an email's index on a (sync or async) pipeline"""
+    pipe.sadd(email_index_key(email), fingerprint)
+    pipe.expire(email_index_key(email), USAGE_TTL)
+
+
+def queue_usage_migration(pipe, key: str, data: str):
+    """Queue rewriting a usage record stored as one JSON string as a hash, indexing its email"""
+    usage = json.loads(data)
+    pipe.delete(key)
+    pipe.hset(key, mapping=encode_usage(usage))
+    pipe.expire(key, USAGE_TTL)
+    fingerprint = key[len("usage:"):]
+    if usage.get("email") and not fingerprint.startswith("pending:"):
+        queue_email_index(pipe, usage["email"], fingerprint)
+
+
+def merge_linked_usage(existing_usage: Dict[str, Any], current_usage: Dict[str, Any], email: str):
+    """Merge the usage of a fingerprint into the email account it is linked to (both updated in place)"""
+    # Merge minutes and usage minutes
+    merged_minutes = existing_usage.get("minutes", 0.0) + current_usage.get("minutes", 0.0)
+    merged_tiny_base_minutes = max(
+        existing_usage.get("tiny_base_minutes_used", 0.0),
+        current_usage.get("tiny_base_minutes_used", 0.0)
+    )
+    merged_premium_minutes = max(
+        existing_usage.get("premium_minutes_used", 0.0),
+        current_usage.get("premium_minutes_used", 0.0)
+    )
+    
+    for usage in (existing_usage, current_usage):
+        usage["minutes"] = merged_minutes
+        usage["tiny_base_minutes_used"] = merged_tiny_base_minutes
+        usage["premium_minutes_used"] = merged_premium_minutes
+        usage["email"] = email
+        usage["is_paid"] = True
 
 
 class RedisClient:
+    """
+    Blocking client for worker threads and processes, on a bounded pool that
+    makes callers wait (up to redis_pool_timeout) for a free connection.
+    The API's request handlers use AsyncRedisClient instead.
+    """
+
     def __init__(self):
         redis_url = settings.redis_url
         if not redis_url:
@@ -15,9 +316,18 @@ class RedisClient:
             return
         
         try:
-            self.client = redis.from_url(redis_url, decode_responses=True)
+            pool = redis.BlockingConnectionPool.from_url(
+                redis_url,
+                max_connections=settings.redis_max_connections,
+                timeout=settings.redis_pool_timeout,
+                **connection_options()
+            )
+            self.client = redis.Redis(connection_pool=pool)
             # Test connection
             self.client.ping()
+            self._update_live_job = self.client.register_script(UPDATE_LIVE_JOB_SCRIPT)
+            self._commit_usage = self.client.register_script(COMMIT_USAGE_SCRIPT)
+            self._release_minutes = self.client.register_script(RELEASE_MINUTES_SCRIPT)
             print("Redis connected successfully")
         except Exception as e:
             print(f"Warning: Redis connection failed: {e}")
@@ -28,297 +338,616 @@ class RedisClient:
     def get_usage(self, fingerprint: str) -> Dict[str, Any]:
         """Get usage data for a fingerprint"""
         if not self.client:
+            return default_usage()
+        return self._read_through(f"usage:{fingerprint}", self._read_usage)
+    
+    def _read_usage(self, key: str) -> Dict[str, Any]:
+        try:
+            return decode_usage(self.client.hgetall(key))
+        except ResponseError:
+            return parse_usage(self.client.get(key))
+    
+    def commit_usage(
+        self,
+        fingerprint: str,
+        model: str,
+        is_paid: bool,
+        minutes: float,
+        reservation: Optional[Dict[str, Any]] = None
+    ):
+        """
+        Charge a finished job's minutes in one atomic round-trip: add them to
+        the model's usage counter, deduct them from a paid balance and release
+        the job's reservation (see AsyncRedisClient.reserve_minutes).
+        """
+        if not self.client:
+            return
+        key = f"usage:{fingerprint}"
+        self._call_migrating([key], lambda: self._commit_usage(
+            keys=[key],
+            args=[
+                minutes,
+                usage_tier(model),
+                "1" if is_paid else "0",
+                reservation["field"] if reservation else "",
+                reservation["minutes"] if reservation else 0,
+                USAGE_TTL
+            ]
+        ))
+    
+    def release_minutes(self, fingerprint: str, reservation: Optional[Dict[str, Any]]):
+        """Release the reservation of a job that failed or was never run"""
+        if not self.client or not reservation:
+            return
+        key = f"usage:{fingerprint}"
+        self._call_migrating([key], lambda: self._release_minutes(
+            keys=[key], args=[reservation["field"], reservation["minutes"]]
+        ))
+    
+    def backfill_email_index(self, batch_size: int = 500) -> Dict[str, int]:
+        """
+        Index the emails of all existing usage records (one SCAN over usage:*,
+        pipelined in batches). Safe to run again; the write paths keep the
+        index current afterwards.
+        """
+        if not self.client:
+            return {"scanned": 0, "indexed": 0}
+        scanned = indexed = 0
+        keys = []
+        for key in self.client.scan_iter(match="usage:*", count=batch_size):
+            if key.startswith("usage:pending:"):
+                continue
+            keys.append(key)
+            if len(keys) >= batch_size:
+                indexed += self._index_emails(keys)
+                scanned += len(keys)
+                keys = []
+        if keys:
+            indexed += self._index_emails(keys)
+            scanned += len(keys)
+        return {"scanned": scanned, "indexed": indexed}
+    
+    def _index_emails(self, keys: List[str]) -> int:
+        with self.client.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.type(key)
+            types = pipe.execute()
+            for key, key_type in zip(keys, types):
+                # Hashes, or JSON strings not converted yet
+                if key_type == "hash":
+                    pipe.hget(key, "email")
+                else:
+                    pipe.get(key)
+            values = pipe.execute()
+            indexed = 0
+            for key, key_type, value in zip(keys, types, values):
+                email = value if key_type == "hash" else (json.loads(value).get("email") if value else None)
+                if email:
+                    queue_email_index(pipe, email, key[len("usage:"):])
+                    indexed += 1
+            pipe.execute()
+        return indexed
+    
+    def _call_migrating(self, keys: List[str], call: Callable[[], Any]) -> Any:
+        """
+        Run a write to usage records, converting the records it touches to
+        hashes first if they are still JSON strings, and invalidate their
+        cached reads afterwards.
+        """
+        try:
+            try:
+                return call()
+            except ResponseError as e:
+                if not is_wrong_type(e):
+                    raise
+            for key in keys:
+                data = self.client.get(key) if self.client.type(key) == "string" else None
+                if data:
+                    with self.client.pipeline(transaction=True) as pipe:
+                        queue_usage_migration(pipe, key, data)
+                        pipe.execute()
+            return call()
+        finally:
+            self._invalidate(keys)
+    
+    def _read_through(self, key: str, read: Callable[[str], Any]) -> Any:
+        """Read a record through the in-process read cache"""
+        hit, value, version = read_cache.lookup(key)
+        if hit:
+            return value
+        value = read(key)
+        read_cache.put(key, value, version)
+        return value
+    
+    def _invalidate(self, keys: List[str]):
+        """Drop written keys from the read cache, in this process and (if enabled) on the other nodes"""
+        read_cache.invalidate(keys)
+        if settings.read_cache_cross_node:
+            self.client.publish(INVALIDATION_CHANNEL, invalidation_message(keys))
+    
+    def listen_for_invalidations(self):
+        """Apply other nodes' read cache invalidations from a background thread; stop() the returned thread at shutdown"""
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(**{INVALIDATION_CHANNEL: read_cache.handle_invalidation_message})
+        return pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+    
+    def store_job_metadata(self, job_id: str, metadata: Dict[str, Any], ttl: int = JOB_TTL):
+        """Replace a job's record (a hash of its metadata) with TTL (default 7 days), in one round-trip"""
+        if not self.client:
+            return
+        with self.client.pipeline(transaction=True) as pipe:
+            pipe.delete(f"job:{job_id}")
+            pipe.hset(f"job:{job_id}", mapping=encode_job_fields(metadata))
+            pipe.expire(f"job:{job_id}", ttl)
+            pipe.execute()
+        self._invalidate([f"job:{job_id}"])
+    
+    def get_job_metadata(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get job metadata"""
+        if not self.client:
+            return None
+        return self._read_through(f"job:{job_id}", self._read_job)
+    
+    def _read_job(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            return decode_job_fields(self.client.hgetall(key))
+        except ResponseError:
+            # Record written as one JSON string before job records were hashes
+            data = self.client.get(key)
+            return json.loads(data) if data else None
+    
+    def delete_job_metadata(self, job_id: str):
+        """Delete job metadata"""
+        if not self.client:
+            return
+        self.client.delete(f"job:{job_id}")
+        self._invalidate([f"job:{job_id}"])
+    
+    def update_job_progress(self, job_id: str, progress: float, elapsed_time: float, estimated_total_time: float):
+        """Update a running job's progress and publish it; completed or failed jobs are left alone"""
+        self.update_jobs_progress({job_id: (progress, elapsed_time, estimated_total_time)})
+    
+    def update_jobs_progress(self, updates: Dict[str, Tuple[float, float, float]]):
+        """update_job_progress for several jobs, pipelined in one round-trip"""
+        if not self.client or not updates:
+            return
+        with self.client.pipeline(transaction=False) as pipe:
+            for job_id, (progress, elapsed_time, estimated_total_time) in updates.items():
+                event = progress_fields(progress, elapsed_time, estimated_total_time)
+                self._update_live_job(
+                    keys=[f"job:{job_id}"],
+                    args=job_update_args(job_id, "progress", event, {"status": "processing", **event}),
+                    client=pipe
+                )
+            pipe.execute()
+        self._invalidate([f"job:{job_id}" for job_id in updates])
+    
+    def publish_job_events(self, events: List[Tuple[str, str, Dict[str, Any]]]):
+        """
+        Publish (job_id, event, data) events in order, pipelined in one round-trip.
+        A "language" event ({"language", "probability"}) also records the language of a job still running.
+        """
+        if not self.client or not events:
+            return
+        with self.client.pipeline(transaction=False) as pipe:
+            for job_id, event, data in events:
+                if event == "language":
+                    self._update_live_job(
+                        keys=[f"job:{job_id}"],
+                        args=job_update_args(job_id, "language", data, {
+                            "language": data["language"], "language_probability": data["probability"]
+                        }),
+                        client=pipe
+                    )
+                else:
+                    pipe.publish(job_events_channel(job_id), json.dumps({"event": event, "data": data}))
+            pipe.execute()
+        self._invalidate([f"job:{job_id}" for job_id, event, _ in events if event == "language"])
+    
+    def set_rate_limit(self, key: str, limit: int, window: int):
+        """Set rate limit counter"""
+        if not self.client:
+            return True  # Allow in dev mode
+        current = self.client.incr(f"ratelimit:{key}")
+        if current == 1:
+            self.client.expire(f"ratelimit:{key}", window)
+        return current <= limit
+
+
+class ProgressPublisher:
+    """
+    Writes job progress and live events to Redis from one background thread.
+
+    submit() only records the latest progress of a job and returns, so an
+    inference worker never waits on Redis. The thread writes whatever is
+    waiting in one pipelined round-trip; updates that arrive while a write is
+    in flight replace older ones of the same job, so when Redis is slow stale
+    progress is dropped instead of queueing up behind it.
+
+    publish() queues an event (segment, language, completed, failed) to go
+    out in order. Segments beyond max_events waiting are dropped, since they
+    are journaled and in the final transcript anyway; the other events are
+    always kept. A failed write is logged, never raised into the job.
+    """
+
+    def __init__(self, client: RedisClient, max_events: int = 10000):
+        self.client = client
+        self.max_events = max_events
+        self._latest: Dict[str, Tuple[float, float, float]] = {}
+        self._events: List[Tuple[str, str, Dict[str, Any]]] = []
+        self._events_written = 0
+        self._events_dropped = 0
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._written = 0
+        self._dropped = 0
+
+    def start(self):
+        """Start the publishing thread"""
+        with self._cond:
+            if self._thread:
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="progress-publisher", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Write what is still waiting and stop the thread"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+            thread, self._thread = self._thread, None
+        if thread:
+            thread.join(timeout=timeout)
+
+    def submit(self, job_id: str, progress: float, elapsed_time: float, estimated_total_time: float):
+        """Queue a job's progress, replacing any of its progress not yet written"""
+        if not self.client.client:
+            return
+        with self._cond:
+            if job_id in self._latest:
+                self._dropped += 1
+            self._latest[job_id] = (progress, elapsed_time, estimated_total_time)
+            self._cond.notify()
+
+    def publish(self, job_id: str, event: str, data: Dict[str, Any]):
+        """Queue a live event for a job, after the events queued before it"""
+        if not self.client.client:
+            return
+        with self._cond:
+            if event == "segment" and len(self._events) >= self.max_events:
+                self._events_dropped += 1
+                return
+            self._events.append((job_id, event, data))
+            self._cond.notify()
+
+    def discard(self, job_id: str):
+        """Drop a job's unwritten progress, e.g. once it has completed"""
+        with self._cond:
+            self._latest.pop(job_id, None)
+
+    def stats(self) -> Dict[str, int]:
+        """Progress updates written, dropped as stale and waiting, and the same for events"""
+        with self._cond:
             return {
-                "tiny_base_minutes_used": 0.0,
-                "premium_minutes_used": 0.0,
-                "is_paid": False,
-                "email": None,
-                "minutes": 0.0
+                "written": self._written,
+                "dropped": self._dropped,
+                "waiting": len(self._latest),
+                "events_written": self._events_written,
+                "events_dropped": self._events_dropped,
+                "events_waiting": len(self._events)
             }
-        data = self.client.get(f"usage:{fingerprint}")
-        if data:
-            usage = json.loads(data)
-            # Ensure minute fields exist (for backward compatibility with old count-based data)
-            if "tiny_base_minutes_used" not in usage:
-                usage["tiny_base_minutes_used"] = 0.0
-            if "premium_minutes_used" not in usage:
-                usage["premium_minutes_used"] = 0.0
-            return usage
-        return {
-            "tiny_base_minutes_used": 0.0,
-            "premium_minutes_used": 0.0,
-            "is_paid": False,
-            "email": None,
-            "minutes": 0.0
-        }
-    
-    def find_usage_by_email(self, email: str) -> Optional[tuple[str, Dict[str, Any]]]:
-        """Find usage data by email. Returns (fingerprint, usage_data) or None"""
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._latest and not self._events and not self._stopping:
+                    self._cond.wait()
+                if not self._latest and not self._events:
+                    return
+                batch, self._latest = self._latest, {}
+                events, self._events = self._events, []
+            # Events first: a job's completed event goes out before progress, which is ignored after it
+            try:
+                self.client.publish_job_events(events)
+                with self._cond:
+                    self._events_written += len(events)
+            except Exception as e:
+                # Live events are a broadcast; the job's stored record and outputs don't depend on them
+                print(f"Warning: Failed to publish {len(events)} job event(s): {e}")
+            try:
+                self.client.update_jobs_progress(batch)
+                with self._cond:
+                    self._written += len(batch)
+            except Exception as e:
+                # Progress is advisory; the job's next update overwrites it anyway
+                print(f"Warning: Failed to write progress of {len(batch)} job(s): {e}")
+
+class AsyncRedisClient:
+    """
+    asyncio client for the API's request handlers, so a slow Redis call
+    suspends only the request waiting on it instead of blocking the event
+    loop (and every other in-flight request) the way the sync client does.
+
+    Commands share one bounded, health-checked connection pool (a command
+    finding all redis_max_connections in use fails rather than waits) and the
+    same timeout and retry policy as RedisClient. connect() is called at startup
+    and close() at shutdown; without Redis it falls back to the same defaults
+    as RedisClient.
+    """
+
+    def __init__(self):
+        self.client: Optional[aioredis.Redis] = None
+
+    async def connect(self):
+        redis_url = settings.redis_url
+        if not redis_url:
+            return
+        
+        try:
+            # Not BlockingConnectionPool: in redis-py 5.0 its asyncio version
+            # stalls for the whole pool timeout when a connect fails
+            pool = aioredis.ConnectionPool.from_url(
+                redis_url,
+                max_connections=settings.redis_max_connections,
+                **connection_options(AsyncRetry)
+            )
+            self.client = aioredis.Redis(connection_pool=pool)
+            await self.client.ping()
+            self._reserve_minutes = self.client.register_script(RESERVE_MINUTES_SCRIPT)
+            self._release_minutes = self.client.register_script(RELEASE_MINUTES_SCRIPT)
+            self._claim_pending = self.client.register_script(CLAIM_PENDING_SCRIPT)
+            print("Async Redis connected successfully")
+        except Exception as e:
+            print(f"Warning: Async Redis connection failed: {e}")
+            self.client = None
+
+    async def close(self):
+        if self.client:
+            await self.client.aclose(close_connection_pool=True)
+            self.client = None
+
+    async def get_usage(self, fingerprint: str) -> Dict[str, Any]:
+        """Get usage data for a fingerprint"""
+        if not self.client:
+            return default_usage()
+        return await self._read_through(f"usage:{fingerprint}", self._read_usage)
+
+    async def _read_usage(self, key: str) -> Dict[str, Any]:
+        try:
+            return decode_usage(await self.client.hgetall(key))
+        except ResponseError:
+            return parse_usage(await self.client.get(key))
+
+    async def find_usage_by_email(self, email: str) -> Optional[tuple[str, Dict[str, Any]]]:
+        """Find usage data by email, through the email index. Returns (fingerprint, usage_data) or None"""
         if not self.client:
             return None
         
-        # Check if email is already mapped to a fingerprint
-        mapped_fp = self.client.get(f"email_to_fingerprint:{email.lower()}")
-        if mapped_fp:
-            usage = self.get_usage(mapped_fp)
-            if usage.get("email", "").lower() == email.lower():
-                return (mapped_fp, usage)
+        email_lower = email.lower()
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.get(f"email_to_fingerprint:{email_lower}")
+            pipe.smembers(email_index_key(email_lower))
+            mapped_fp, indexed = await pipe.execute()
         
-        # Search all usage keys for matching email
-        cursor = 0
-        while True:
-            cursor, keys = self.client.scan(cursor, match="usage:*", count=100)
-            for key in keys:
-                data = self.client.get(key)
-                if data:
-                    usage = json.loads(data)
-                    if usage.get("email", "").lower() == email.lower():
-                        fingerprint = key.replace("usage:", "")
-                        return (fingerprint, usage)
-            if cursor == 0:
+        # The fingerprint the email is mapped to first, then the others recorded with it
+        candidates = ([mapped_fp] if mapped_fp else []) + sorted(set(indexed) - {mapped_fp})
+        stale = []
+        found = None
+        for fingerprint in candidates:
+            usage = await self.get_usage(fingerprint)
+            if (usage.get("email") or "").lower() == email_lower:
+                found = (fingerprint, usage)
                 break
+            stale.append(fingerprint)
         
-        return None
-    
-    def link_fingerprint_to_email(self, fingerprint: str, email: str) -> Dict[str, Any]:
+        stale_indexed = [fingerprint for fingerprint in stale if fingerprint in indexed]
+        if stale_indexed:
+            await self.client.srem(email_index_key(email_lower), *stale_indexed)
+        return found
+
+    async def link_fingerprint_to_email(self, fingerprint: str, email: str) -> Dict[str, Any]:
         """Link a fingerprint to an email account and merge minutes"""
         if not self.client:
-            return self.get_usage(fingerprint)
+            return await self.get_usage(fingerprint)
         
         email_lower = email.lower()
-        current_usage = self.get_usage(fingerprint)
-        
-        # Find existing usage by email
-        existing = self.find_usage_by_email(email_lower)
+        current_usage = await self.get_usage(fingerprint)
+        existing = await self.find_usage_by_email(email_lower)
         
         if existing:
             existing_fp, existing_usage = existing
-            
-            # If already linked to this fingerprint, return current usage
             if existing_fp == fingerprint:
                 return current_usage
-            
-            # Merge minutes and usage minutes
-            merged_minutes = existing_usage.get("minutes", 0.0) + current_usage.get("minutes", 0.0)
-            merged_tiny_base_minutes = max(
-                existing_usage.get("tiny_base_minutes_used", 0.0),
-                current_usage.get("tiny_base_minutes_used", 0.0)
-            )
-            merged_premium_minutes = max(
-                existing_usage.get("premium_minutes_used", 0.0),
-                current_usage.get("premium_minutes_used", 0.0)
-            )
-            
-            # Update the existing fingerprint with merged data
-            existing_usage["minutes"] = merged_minutes
-            existing_usage["tiny_base_minutes_used"] = merged_tiny_base_minutes
-            existing_usage["premium_minutes_used"] = merged_premium_minutes
-            existing_usage["email"] = email_lower
-            existing_usage["is_paid"] = True
-            
-            self.client.setex(
-                f"usage:{existing_fp}",
-                86400 * 365,
-                json.dumps(existing_usage)
-            )
-            
-            # Update current fingerprint to point to email account
-            current_usage["email"] = email_lower
-            current_usage["minutes"] = merged_minutes
-            current_usage["tiny_base_minutes_used"] = merged_tiny_base_minutes
-            current_usage["premium_minutes_used"] = merged_premium_minutes
-            current_usage["is_paid"] = True
-            
-            self.client.setex(
-                f"usage:{fingerprint}",
-                86400 * 365,
-                json.dumps(current_usage)
-            )
-            
-            # Create email -> fingerprint mapping (use existing fingerprint as primary)
-            self.client.setex(
-                f"email_to_fingerprint:{email_lower}",
-                86400 * 365,
-                existing_fp
-            )
-            
-            return existing_usage
+            merge_linked_usage(existing_usage, current_usage, email_lower)
+            linked = {field: existing_usage[field] for field in LINKED_USAGE_FIELDS}
+            # Existing fingerprint stays the primary one for the email
+            primary_fp = existing_fp
+            fingerprints = [existing_fp, fingerprint]
         else:
             # No existing account, just link this fingerprint to email
             current_usage["email"] = email_lower
             current_usage["is_paid"] = True
-            
-            self.client.setex(
-                f"usage:{fingerprint}",
-                86400 * 365,
-                json.dumps(current_usage)
-            )
-            
-            # Create email -> fingerprint mapping
-            self.client.setex(
-                f"email_to_fingerprint:{email_lower}",
-                86400 * 365,
-                fingerprint
-            )
-            
-            return current_usage
-    
-    def increment_usage(self, fingerprint: str, model: str, is_paid: bool = False, duration_seconds: float = 0.0):
-        """Increment usage minutes for a fingerprint"""
-        if not self.client:
-            return
-        usage = self.get_usage(fingerprint)
+            linked = {"email": email_lower, "is_paid": True}
+            primary_fp = fingerprint
+            fingerprints = [fingerprint]
         
-        duration_minutes = duration_seconds / 60.0
+        async def link():
+            async with self.client.pipeline(transaction=True) as pipe:
+                for linked_fp in fingerprints:
+                    pipe.hset(f"usage:{linked_fp}", mapping=encode_usage(linked))
+                    pipe.expire(f"usage:{linked_fp}", USAGE_TTL)
+                    queue_email_index(pipe, email_lower, linked_fp)
+                pipe.set(f"email_to_fingerprint:{email_lower}", primary_fp, ex=USAGE_TTL)
+                await pipe.execute()
         
-        if model in ["tiny", "base"]:
-            usage["tiny_base_minutes_used"] = usage.get("tiny_base_minutes_used", 0.0) + duration_minutes
-        elif model in ["small", "medium", "large"]:
-            usage["premium_minutes_used"] = usage.get("premium_minutes_used", 0.0) + duration_minutes
-        
-        usage["is_paid"] = is_paid or usage.get("is_paid", False)
-        
-        self.client.setex(
-            f"usage:{fingerprint}",
-            86400 * 365,  # 1 year TTL
-            json.dumps(usage)
-        )
-    
-    def set_minutes(self, fingerprint: str, minutes: float, email: Optional[str] = None):
-        """Set minutes balance for a fingerprint"""
+        await self._call_migrating([f"usage:{linked_fp}" for linked_fp in fingerprints], link)
+        return existing[1] if existing else current_usage
+
+    async def add_minutes(self, fingerprint: str, minutes: float, email: Optional[str] = None) -> float:
+        """Add purchased minutes to a fingerprint's balance in one atomic round-trip; returns the new balance"""
         if not self.client:
-            return
-        usage = self.get_usage(fingerprint)
-        usage["minutes"] = minutes
-        if email:
-            usage["email"] = email
-            usage["is_paid"] = True
+            return minutes
+        key = f"usage:{fingerprint}"
         
-        self.client.setex(
-            f"usage:{fingerprint}",
-            86400 * 365,
-            json.dumps(usage)
-        )
+        async def add():
+            async with self.client.pipeline(transaction=True) as pipe:
+                pipe.hincrbyfloat(key, "minutes", minutes)
+                if email:
+                    pipe.hset(key, mapping={"email": email, "is_paid": "1"})
+                    queue_email_index(pipe, email, fingerprint)
+                pipe.expire(key, USAGE_TTL)
+                return (await pipe.execute())[0]
+        
+        return float(await self._call_migrating([key], add))
 
-    def add_minutes_by_email(self, email: str, minutes: float) -> float:
+    async def add_minutes_by_email(self, email: str, minutes: float) -> float:
         """Add minutes to a pending bucket for an email (admin gift). Recipient claims via /minutes/claim."""
         if not self.client:
             return minutes
         key = f"usage:pending:{email.lower()}"
-        data = self.client.get(key)
-        if data:
-            obj = json.loads(data)
-        else:
-            obj = {"minutes": 0.0, "email": email.lower()}
-        obj["minutes"] = obj.get("minutes", 0.0) + minutes
-        obj["email"] = email.lower()
-        self.client.setex(key, 86400 * 365, json.dumps(obj))
-        return obj["minutes"]
-
-    def get_pending_minutes(self, email: str) -> Optional[Dict[str, Any]]:
-        """Get pending minutes for an email, or None."""
-        if not self.client:
-            return None
-        data = self.client.get(f"usage:pending:{email.lower()}")
-        if not data:
-            return None
-        return json.loads(data)
+        
+        async def add():
+            async with self.client.pipeline(transaction=True) as pipe:
+                pipe.hincrbyfloat(key, "minutes", minutes)
+                pipe.hset(key, "email", email.lower())
+                pipe.expire(key, USAGE_TTL)
+                return (await pipe.execute())[0]
+        
+        return float(await self._call_migrating([key], add))
 
-    def merge_pending_into_fingerprint(self, fingerprint: str, email: str) -> Optional[Dict[str, Any]]:
+    async def merge_pending_into_fingerprint(self, fingerprint: str, email: str) -> Optional[Dict[str, Any]]:
         """If pending minutes exist for email, merge into usage:{fingerprint}, delete pending, set email_to_fingerprint. Returns merged usage or None."""
         if not self.client:
             return None
-        pending = self.get_pending_minutes(email.lower())
-        if not pending:
+        keys = [
+            f"usage:pending:{email.lower()}",
+            f"usage:{fingerprint}",
+            f"email_to_fingerprint:{email.lower()}",
+            email_index_key(email)
+        ]
+        balance = await self._call_migrating(keys[:2], lambda: self._claim_pending(
+            keys=keys, args=[email.lower(), fingerprint, USAGE_TTL]
+        ))
+        if balance is None:
             return None
-        current = self.get_usage(fingerprint)
-        merged_minutes = pending.get("minutes", 0.0) + current.get("minutes", 0.0)
-        merged = {
-            "minutes": merged_minutes,
-            "email": email.lower(),
-            "is_paid": True,
-            "tiny_base_minutes_used": current.get("tiny_base_minutes_used", 0.0),
-            "premium_minutes_used": current.get("premium_minutes_used", 0.0),
-        }
-        self.client.setex(f"usage:{fingerprint}", 86400 * 365, json.dumps(merged))
-        self.client.setex(f"email_to_fingerprint:{email.lower()}", 86400 * 365, fingerprint)
-        self.client.delete(f"usage:pending:{email.lower()}")
-        return merged
-    
-    def deduct_minutes(self, fingerprint: str, amount: float) -> bool:
-        """Deduct minutes, returns True if successful"""
+        return await self.get_usage(fingerprint)
+
+    async def reserve_minutes(self, fingerprint: str, model: str, minutes: float) -> Dict[str, Any]:
+        """
+        Check and hold a new job's minutes in one atomic round-trip, so jobs
+        submitted together can't spend the same minutes. Free users reserve
+        against their free minutes of the model's tier, paid users against
+        their balance. The reservation is committed with the job's usage
+        (RedisClient.commit_usage) or released if the job doesn't run.
+        Raises InsufficientMinutesError if the minutes aren't available.
+        """
+        tier = usage_tier(model)
         if not self.client:
-            return True  # Allow in dev mode
-        usage = self.get_usage(fingerprint)
-        current_minutes = usage.get("minutes", 0.0)
-        
-        if current_minutes < amount:
-            return False
-        
-        usage["minutes"] = current_minutes - amount
-        self.client.setex(
-            f"usage:{fingerprint}",
-            86400 * 365,
-            json.dumps(usage)
-        )
-        return True
-    
-    def store_job_metadata(self, job_id: str, metadata: Dict[str, Any], ttl: int = 604800):
-        """Store job metadata with TTL (default 7 days)"""
+            # Dev mode: only the free minutes, as if none had been used
+            if minutes > free_tier_minutes(tier):
+                raise InsufficientMinutesError(False, tier, minutes, free_tier_minutes(tier))
+            return {"field": f"reserved_{tier}_minutes", "minutes": minutes}
+        key = f"usage:{fingerprint}"
+        field, available, paid_flag = await self._call_migrating([key], lambda: self._reserve_minutes(
+            keys=[key], args=[minutes, tier, free_tier_minutes(tier), USAGE_TTL]
+        ))
+        if not field:
+            raise InsufficientMinutesError(paid_flag == "1", tier, minutes, max(0.0, float(available)))
+        return {"field": field, "minutes": minutes}
+
+    async def release_minutes(self, fingerprint: str, reservation: Optional[Dict[str, Any]]):
+        """Release the reservation of a job that was never run"""
+        if not self.client or not reservation:
+            return
+        key = f"usage:{fingerprint}"
+        await self._call_migrating([key], lambda: self._release_minutes(
+            keys=[key], args=[reservation["field"], reservation["minutes"]]
+        ))
+
+    async def _call_migrating(self, keys: List[str], call: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run a write to usage records, converting the records it touches to
+        hashes first if they are still JSON strings, and invalidate their
+        cached reads afterwards.
+        """
+        try:
+            try:
+                return await call()
+            except ResponseError as e:
+                if not is_wrong_type(e):
+                    raise
+            for key in keys:
+                data = await self.client.get(key) if await self.client.type(key) == "string" else None
+                if data:
+                    async with self.client.pipeline(transaction=True) as pipe:
+                        queue_usage_migration(pipe, key, data)
+                        await pipe.execute()
+            return await call()
+        finally:
+            await self._invalidate(keys)
+
+    async def _read_through(self, key: str, read: Callable[[str], Awaitable[Any]]) -> Any:
+        """Read a record through the in-process read cache"""
+        hit, value, version = read_cache.lookup(key)
+        if hit:
+            return value
+        value = await read(key)
+        read_cache.put(key, value, version)
+        return value
+
+    async def _invalidate(self, keys: List[str]):
+        """Drop written keys from the read cache, in this process and (if enabled) on the other nodes"""
+        read_cache.invalidate(keys)
+        if settings.read_cache_cross_node:
+            await self.client.publish(INVALIDATION_CHANNEL, invalidation_message(keys))
+
+    async def store_job_metadata(self, job_id: str, metadata: Dict[str, Any], ttl: int = JOB_TTL):
+        """Replace a job's record (a hash of its metadata) with TTL (default 7 days), in one round-trip"""
         if not self.client:
             return
-        self.client.setex(
-            f"job:{job_id}",
-            ttl,
-            json.dumps(metadata)
-        )
-    
-    def get_job_metadata(self, job_id: str) -> Optional[Dict[str, Any]]:
-        """Get job metadata"""
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.delete(f"job:{job_id}")
+            pipe.hset(f"job:{job_id}", mapping=encode_job_fields(metadata))
+            pipe.expire(f"job:{job_id}", ttl)
+            await pipe.execute()
+        await self._invalidate([f"job:{job_id}"])
+
+    async def get_job_metadata(self, job_id: str, fresh: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Get job metadata, progress included, with one HGETALL (or none when cached).
+        fresh=True always reads Redis, for when a cached record up to its TTL old won't do.
+        """
         if not self.client:
             return None
-        data = self.client.get(f"job:{job_id}")
-        if data:
-            return json.loads(data)
-        return None
-    
-    def update_job_progress(self, job_id: str, progress: float, elapsed_time: float, estimated_total_time: float):
-        """Update job progress metadata"""
+        if fresh:
+            return await self._read_job(f"job:{job_id}")
+        return await self._read_through(f"job:{job_id}", self._read_job)
+
+    async def _read_job(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            return decode_job_fields(await self.client.hgetall(key))
+        except ResponseError:
+            # Record written as one JSON string before job records were hashes
+            data = await self.client.get(key)
+            return json.loads(data) if data else None
+
+    async def delete_job_metadata(self, job_id: str):
+        """Delete job metadata"""
         if not self.client:
             return
-        
-        metadata = self.get_job_metadata(job_id)
-        if metadata:
-            # Don't overwrite status if it's already completed or failed
-            current_status = metadata.get("status")
-            if current_status not in ["completed", "failed"]:
-                metadata["status"] = "processing"
-            metadata["progress"] = progress
-            metadata["elapsed_time"] = elapsed_time
-            metadata["estimated_total_time"] = estimated_total_time
-            metadata["time_remaining"] = max(0, estimated_total_time - elapsed_time)
-            
-            # Get TTL to preserve it
-            ttl = self.client.ttl(f"job:{job_id}")
-            if ttl > 0:
-                self.client.setex(
-                    f"job:{job_id}",
-                    ttl,
-                    json.dumps(metadata)
-                )
-            else:
-                # Default TTL if not set
-                self.client.setex(
-                    f"job:{job_id}",
-                    604800,  # 7 days
-                    json.dumps(metadata)
-                )
-    
-    def set_rate_limit(self, key: str, limit: int, window: int):
-        """Set rate limit counter"""
-        if not self.client:
-            return True  # Allow in dev mode
-        current = self.client.incr(f"ratelimit:{key}")
-        if current == 1:
-            self.client.expire(f"ratelimit:{key}", window)
-        return current <= limit
+        await self.client.delete(f"job:{job_id}")
+        await self._invalidate([f"job:{job_id}"])
+
+
+if __name__ == "__main__":
+    # One-off maintenance: python -m app.redis_client backfill-email-index
+    import argparse
+    parser = argparse.ArgumentParser(description="Redis maintenance")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("backfill-email-index", help="Index the emails of existing usage records")
+    args = parser.parse_args()
+    if args.command == "backfill-email-index":
+        counts = RedisClient().backfill_email_index()
+        print(f"Indexed {counts['indexed']} of {counts['scanned']} usage records")
@@ -1,6 +1,6 @@
 import os
 import magic
-from fastapi import HTTPException, UploadFile
+from fastapi import HTTPException
 from typing import Tuple
 import mutagen
 from mutagen import File as MutagenFile
@@ -60,63 +60,55 @@ def get_audio_duration(file_path: str) -> float:
         raise ValueError(f"Could not extract audio duration: {str(e)}")
 
 
-async def validate_upload(file: UploadFile, is_paid: bool = False) -> Tuple[str, float]:
+def read_file_head(file_path: str, size: int = 1024) -> bytes:
+    """Read the first bytes of a file for magic-byte sniffing"""
+    with open(file_path, "rb") as f:
+        return f.read(size)
+
+
+def validate_upload(file_path: str, filename: str, is_paid: bool = False) -> Tuple[str, float]:
     """
-    Validate uploaded file and return sanitized filename and duration.
+    Validate an upload that has already been streamed to disk and return
+    sanitized filename and duration. All checks run against that one file.
     Raises HTTPException if validation fails.
     """
     # Check filename extension
-    if not validate_file_extension(file.filename):
+    if not validate_file_extension(filename):
         raise HTTPException(
             status_code=400,
             detail=f"Invalid file type. Allowed: {', '.join(ALLOWED_EXTENSIONS)}"
         )
     
-    # Read file content for validation
-    content = await file.read()
-    await file.seek(0)  # Reset file pointer
-    
     # Check file size
-    if len(content) > MAX_FILE_SIZE:
+    if os.path.getsize(file_path) > MAX_FILE_SIZE:
         raise HTTPException(
             status_code=400,
             detail=f"File too large. Maximum size: {MAX_FILE_SIZE / (1024*1024):.0f}MB"
         )
     
     # Validate file type using magic bytes
-    if not validate_file_type(content):
+    if not validate_file_type(read_file_head(file_path)):
         raise HTTPException(
             status_code=400,
             detail="Invalid file type detected. Please upload a valid audio file."
         )
     
-    # Save temporarily to get duration
-    import tempfile
-    with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file.filename)[1]) as tmp:
-        tmp.write(content)
-        tmp_path = tmp.name
-    
+    # Get audio duration
     try:
-        # Get audio duration
-        duration = get_audio_duration(tmp_path)
-        
-        # Check duration limits
-        max_duration = PAID_TIER_MAX_DURATION if is_paid else FREE_TIER_MAX_DURATION
-        if duration > max_duration:
-            tier_name = "paid (3 hours)" if is_paid else "free (45 minutes)"
-            raise HTTPException(
-                status_code=400,
-                detail=f"Audio duration ({duration/60:.1f} minutes) exceeds {tier_name} limit"
-            )
-        
-        # Sanitize filename
-        safe_filename = sanitize_filename(file.filename)
-        
-        return safe_filename, duration
+        duration = get_audio_duration(file_path)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # Check duration limits
+    max_duration = PAID_TIER_MAX_DURATION if is_paid else FREE_TIER_MAX_DURATION
+    if duration > max_duration:
+        tier_name = "paid (3 hours)" if is_paid else "free (45 minutes)"
+        raise HTTPException(
+            status_code=400,
+            detail=f"Audio duration ({duration/60:.1f} minutes) exceeds {tier_name} limit"
+        )
+    
+    # Sanitize filename
+    safe_filename = sanitize_filename(filename)
     
-    finally:
-        # Clean up temp file
-        try:
-            os.unlink(tmp_path)
-        except Exception:
-            pass
+    return safe_filename, duration
@@ -0,0 +1,104 @@
+import sys
+import struct
+from array import array
+from typing import Iterable, Iterator, Optional, Tuple
+
+# count, text length; then starts, ends, text offsets and the UTF-8 text
+HEADER = struct.Struct("<QQ")
+
+
+class SegmentStore:
+    """
+    Compact, append-only store of transcript segments.
+
+    Start and end times live in two float arrays and all text in one UTF-8
+    buffer indexed by offsets, so a multi-hour transcript is a handful of
+    buffers instead of tens of thousands of per-segment objects. Segments are
+    (start, end, text) tuples when read back; text is only decoded on access.
+    """
+
+    __slots__ = ("_starts", "_ends", "_offsets", "_text")
+
+    def __init__(self):
+        self._starts = array("d")
+        self._ends = array("d")
+        self._offsets = array("Q", [0])
+        self._text = bytearray()
+
+    def append(self, start: float, end: float, text: str):
+        """Add one segment"""
+        self._starts.append(start)
+        self._ends.append(end)
+        self._text += text.encode("utf-8")
+        self._offsets.append(len(self._text))
+
+    def extend(self, segments: Iterable[Tuple[float, float, str]], offset: float = 0.0):
+        """Add segments, shifting their timestamps by offset seconds"""
+        for start, end, text in segments:
+            self.append(start + offset, end + offset, text)
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def __bool__(self) -> bool:
+        return len(self._starts) > 0
+
+    def __getitem__(self, index: int) -> Tuple[float, float, str]:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("segment index out of range")
+        return self._starts[index], self._ends[index], self.text_at(index)
+
+    def __iter__(self) -> Iterator[Tuple[float, float, str]]:
+        for index in range(len(self)):
+            yield self._starts[index], self._ends[index], self.text_at(index)
+
+    def text_at(self, index: int) -> str:
+        """Text of one segment"""
+        return self._text[self._offsets[index]:self._offsets[index + 1]].decode("utf-8")
+
+    @property
+    def last_end(self) -> float:
+        """End of the last segment, 0 when empty"""
+        return self._ends[-1] if self._ends else 0.0
+
+    def text(self, last: Optional[int] = None) -> str:
+        """The segment texts joined with spaces, optionally of only the last few segments"""
+        first = 0 if last is None else max(0, len(self) - last)
+        return " ".join(self.text_at(index) for index in range(first, len(self))).strip()
+
+    def to_bytes(self) -> bytes:
+        """Serialize to one buffer, for pipes and files"""
+        columns = [self._starts, self._ends, self._offsets]
+        if sys.byteorder != "little":
+            columns = [array(column.typecode, column) for column in columns]
+            for column in columns:
+                column.byteswap()
+        return b"".join(
+            [HEADER.pack(len(self), len(self._text))]
+            + [column.tobytes() for column in columns]
+            + [bytes(self._text)]
+        )
+
+    def __reduce__(self):
+        # Pickles (e.g. to worker processes) as the compact buffer
+        return SegmentStore.from_bytes, (self.to_bytes(),)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "SegmentStore":
+        """Inverse of to_bytes"""
+        count, text_length = HEADER.unpack_from(data)
+        store = cls()
+        position = HEADER.size
+        for column, length in ((store._starts, count), (store._ends, count)):
+            column.frombytes(data[position:position + 8 * length])
+            position += 8 * length
+        store._offsets = array("Q")
+        store._offsets.frombytes(data[position:position + 8 * (count + 1)])
+        position += 8 * (count + 1)
+        if sys.byteorder != "little":
+            for column in (store._starts, store._ends, store._offsets):
+                column.byteswap()
+        store._text = bytearray(data[position:position + text_length])
+        return store
@@ -1,152 +1,526 @@
 import os
 import json
+import time
 import uuid
-from datetime import datetime, timedelta
+import hashlib
+import shutil
+import struct
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
 
 from app.config import settings
+from app.container import Section, find_section, gzip_bytes, read_header, read_section, write_container, write_gzip
+from app.formats import RENDERERS
+from app.journal import JOB_STATE_NAME
+from app.segments import SegmentStore
 
 
+logger = logging.getLogger(__name__)
+
 STORAGE_ROOT = settings.storage_root
 TTL_DAYS = settings.ttl_days
 
+# Layout under STORAGE_ROOT:
+#   jobs/{h[0:2]}/{h[2:4]}/{job_id}.job  One container per completed job (h: SHA-256 of the job ID)
+#     .../{job_id}.job.{format}.gz       A download format, rendered and gzipped when first requested
+#   running/{job_id}/                    A running job's journal, decoded audio and resume state
+#   .expiry/                             The expiry index
+#   {fingerprint}/{job_id}/              Jobs stored before containers; moved into one when next read
+JOBS_DIR_NAME = "jobs"
+RUNNING_DIR_NAME = "running"
+CONTAINER_SUFFIX = ".job"
+LEGACY_SEGMENTS_NAME = "segments.bin"
+LEGACY_METADATA_NAME = "metadata.json"
+
 
 def get_storage_path(fingerprint: str, job_id: str) -> Path:
-    """Get storage path for a transcription job"""
+    """Working directory of a running job (journal, decoded audio and resume state)"""
+    legacy_path = _legacy_path(fingerprint, job_id)
+    if legacy_path and (legacy_path / JOB_STATE_NAME).exists():
+        return legacy_path  # Started before the running/ layout and not finished yet
+    return Path(STORAGE_ROOT) / RUNNING_DIR_NAME / job_id
+
+
+def get_container_path(job_id: str) -> Path:
+    """The container of a completed job, in directories sharded by a hash of its ID"""
+    digest = hashlib.sha256(job_id.encode("utf-8")).hexdigest()
+    return Path(STORAGE_ROOT) / JOBS_DIR_NAME / digest[:2] / digest[2:4] / (job_id + CONTAINER_SUFFIX)
+
+
+def _legacy_path(fingerprint: str, job_id: str) -> Optional[Path]:
+    if fingerprint in _RESERVED_NAMES:
+        return None
     return Path(STORAGE_ROOT) / fingerprint / job_id
 
 
 def save_transcription_outputs(
     fingerprint: str,
     job_id: str,
-    text: str,
+    segments: SegmentStore,
     language: str,
     duration: float
-) -> Dict[str, str]:
-    """Save transcription outputs (.txt, .srt, .vtt) and return file paths"""
-    storage_path = get_storage_path(fingerprint, job_id)
-    storage_path.mkdir(parents=True, exist_ok=True)
-    
-    # Save text file
-    txt_path = storage_path / "output.txt"
-    txt_path.write_text(text, encoding="utf-8")
-    
-    # Generate SRT (simplified - just one segment)
-    srt_path = storage_path / "output.srt"
-    srt_content = f"1\n00:00:00,000 --> {format_timestamp(duration)},000\n{text}\n"
-    srt_path.write_text(srt_content, encoding="utf-8")
-    
-    # Generate VTT
-    vtt_path = storage_path / "output.vtt"
-    vtt_content = f"WEBVTT\n\n00:00:00.000 --> {format_timestamp_vtt(duration)}\n{text}\n"
-    vtt_path.write_text(vtt_content, encoding="utf-8")
-    
-    # Save metadata
+) -> Path:
+    """
+    Save a finished transcription as one container file: its metadata and segments.
+    
+    Download formats are rendered from the segments when first requested (see
+    find_output), so jobs whose outputs are never downloaded cost no rendering.
+    """
+    expires_at = datetime.utcnow() + timedelta(days=TTL_DAYS)
     metadata = {
         "job_id": job_id,
         "fingerprint": fingerprint,
         "language": language,
         "duration": duration,
+        "segments": len(segments),
         "created_at": datetime.utcnow().isoformat(),
-        "expires_at": (datetime.utcnow() + timedelta(days=TTL_DAYS)).isoformat()
+        "expires_at": expires_at.isoformat()
     }
-    metadata_path = storage_path / "metadata.json"
-    metadata_path.write_text(json.dumps(metadata), encoding="utf-8")
+    container_path = get_container_path(job_id)
+    write_container(container_path, metadata, {"segments": segments.to_bytes()}, {})
+    index_expiry(fingerprint, job_id, _timestamp(expires_at.isoformat()))
+    return container_path
+
+
+def _open_container(fingerprint: str, job_id: str) -> Optional[Tuple[Path, Dict[str, Any]]]:
+    """Path and header of a job's container, or None; a legacy job directory is moved into one first"""
+    container_path = get_container_path(job_id)
+    try:
+        header = read_header(container_path)
+    except FileNotFoundError:
+        if not _migrate_legacy(fingerprint, job_id):
+            return None
+        try:
+            header = read_header(container_path)
+        except FileNotFoundError:
+            return None
+    if header["metadata"].get("fingerprint") != fingerprint:
+        return None
+    return container_path, header
+
+
+def _migrate_legacy(fingerprint: str, job_id: str) -> bool:
+    """Move a job saved as a directory of files into a container; False if there is no such job"""
+    legacy_path = _legacy_path(fingerprint, job_id)
+    if not legacy_path:
+        return False
+    try:
+        metadata = json.loads((legacy_path / LEGACY_METADATA_NAME).read_text(encoding="utf-8"))
+    except (FileNotFoundError, NotADirectoryError):
+        return False
     
-    return {
-        "txt": str(txt_path),
-        "srt": str(srt_path),
-        "vtt": str(vtt_path)
-    }
+    sections: Dict[str, bytes] = {}
+    compressed: Dict[str, int] = {}
+    segments_path = legacy_path / LEGACY_SEGMENTS_NAME
+    if segments_path.exists():
+        # Formats are rendered from the segments when downloaded, as for new jobs
+        sections["segments"] = segments_path.read_bytes()
+    else:
+        # Saved before segment files: only the formats that were written, which can't be rendered again
+        for format in RENDERERS:
+            try:
+                text = (legacy_path / f"output.{format}").read_bytes()
+            except FileNotFoundError:
+                continue
+            sections[format] = gzip_bytes(text)
+            compressed[format] = len(text)
+    
+    write_container(get_container_path(job_id), metadata, sections, compressed)
+    shutil.rmtree(legacy_path, ignore_errors=True)
+    logger.info(f"Moved stored transcription {job_id} into a container")
+    return True
 
 
-def format_timestamp(seconds: float) -> str:
-    """Format seconds to SRT timestamp (HH:MM:SS,mmm)"""
-    hours = int(seconds // 3600)
-    minutes = int((seconds % 3600) // 60)
-    secs = int(seconds % 60)
-    millis = int((seconds % 1) * 1000)
-    return f"{hours:02d}:{minutes:02d}:{secs:02d},{millis:03d}"
+def has_transcription(fingerprint: str, job_id: str) -> bool:
+    """True if the job's outputs are stored"""
+    return _open_container(fingerprint, job_id) is not None
 
 
-def format_timestamp_vtt(seconds: float) -> str:
-    """Format seconds to VTT timestamp (HH:MM:SS.mmm)"""
-    hours = int(seconds // 3600)
-    minutes = int((seconds % 3600) // 60)
-    secs = int(seconds % 60)
-    millis = int((seconds % 1) * 1000)
-    return f"{hours:02d}:{minutes:02d}:{secs:02d}.{millis:03d}"
+def load_transcription(fingerprint: str, job_id: str) -> Optional[Tuple[SegmentStore, Dict[str, Any]]]:
+    """The stored segments and metadata of a job, or None"""
+    opened = _open_container(fingerprint, job_id)
+    if opened is None:
+        return None
+    container_path, header = opened
+    section = find_section(container_path, header, "segments")
+    if section is None:
+        return None
+    return SegmentStore.from_bytes(read_section(section)), header["metadata"]
 
 
-def get_transcription_files(fingerprint: str, job_id: str) -> Optional[Dict[str, str]]:
-    """Get paths to transcription output files"""
-    storage_path = get_storage_path(fingerprint, job_id)
-    
-    txt_path = storage_path / "output.txt"
-    srt_path = storage_path / "output.srt"
-    vtt_path = storage_path / "output.vtt"
-    
-    if not txt_path.exists():
+def find_output(fingerprint: str, job_id: str, format: str, download: bool = False) -> Optional[Section]:
+    """
+    Where a format lies in the job's container, or None. With download=True
+    (a client downloading the file) the job counts as delivered from now on.
+    """
+    opened = _open_container(fingerprint, job_id)
+    if opened is None:
         return None
+    container_path, header = opened
+    section = find_section(container_path, header, format)
+    if section is None and format in RENDERERS:
+        section = _render_output(container_path, header, format)
+    if section is not None and download:
+        _mark_delivered(fingerprint, job_id, header["metadata"])
+    return section
+
+
+def _rendered_path(container_path: Path, format: str) -> Path:
+    """Where a format rendered on first download is kept: next to the job's container"""
+    return container_path.with_name(f"{container_path.name}.{format}.gz")
+
+
+def _render_output(container_path: Path, header: Dict[str, Any], format: str) -> Optional[Section]:
+    """
+    A format rendered from the container's segments and gzip-compressed,
+    written on the first request and served as stored after that; None if
+    the container has no segments to render.
+    """
+    path = _rendered_path(container_path, format)
+    try:
+        with open(path, "rb") as f:
+            length = os.fstat(f.fileno()).st_size
+            f.seek(-4, os.SEEK_END)
+            size, = struct.unpack("<I", f.read(4))  # gzip trailer: the uncompressed size (mod 2**32)
+        return Section(path=path, offset=0, length=length, size=size, encoding="gzip")
+    except FileNotFoundError:
+        pass
     
-    return {
-        "txt": str(txt_path),
-        "srt": str(srt_path),
-        "vtt": str(vtt_path)
-    }
+    segments_section = find_section(container_path, header, "segments")
+    if segments_section is None:
+        return None
+    segments = SegmentStore.from_bytes(read_section(segments_section))
+    metadata = header["metadata"]
+    render = RENDERERS[format]
+    chunks = render(segments, metadata.get("language", "unknown"), metadata.get("duration", 0.0))
+    size = write_gzip(path, (chunk.encode("utf-8") for chunk in chunks))
+    if not container_path.exists():
+        # The job was deleted while rendering
+        _remove(path)
+        return None
+    return Section(path=path, offset=0, length=path.stat().st_size, size=size, encoding="gzip")
+
+
+def get_transcription_text(fingerprint: str, job_id: str) -> Optional[str]:
+    """The plain-text transcript of a completed job"""
+    section = find_output(fingerprint, job_id, "txt")
+    if section is None:
+        return None
+    return read_section(section).decode("utf-8")
 
 
 def delete_transcription(fingerprint: str, job_id: str):
-    """Delete transcription files"""
-    storage_path = get_storage_path(fingerprint, job_id)
-    if storage_path.exists():
-        import shutil
-        shutil.rmtree(storage_path)
+    """Delete a job's container and working directory"""
+    for path in _job_paths(fingerprint, job_id):
+        _remove(path)
 
 
-def cleanup_expired_transcriptions():
-    """Clean up expired transcription files (should be called periodically)"""
-    storage_root = Path(STORAGE_ROOT)
-    if not storage_root.exists():
-        return
-    
-    now = datetime.utcnow()
-    deleted_count = 0
+def _job_paths(fingerprint: str, job_id: str) -> List[Path]:
+    """Everything a job may have on disk: its container, working directory and legacy directory"""
+    paths = [get_container_path(job_id), Path(STORAGE_ROOT) / RUNNING_DIR_NAME / job_id]
+    legacy_path = _legacy_path(fingerprint, job_id)
+    if legacy_path:
+        paths.append(legacy_path)
+    return [path for path in paths if path.exists()]
+
+
+def _remove(path: Path) -> int:
+    """Delete a container (with the outputs rendered next to it) or directory and return the bytes it held"""
+    try:
+        if path.is_dir():
+            size = directory_size(path)
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            size = path.stat().st_size
+            path.unlink()
+    except FileNotFoundError:
+        return 0
+    if path.name.endswith(CONTAINER_SUFFIX):
+        for format in RENDERERS:
+            size += _remove(_rendered_path(path, format))
+    return size
+
+
+EXPIRY_DIR_NAME = ".expiry"  # Expiry index under STORAGE_ROOT: one file of job paths per hour in which they expire
+EXPIRY_BUCKET_SECONDS = 3600
+EXPIRY_BACKFILLED_NAME = ".backfilled"  # Marks that jobs stored before the index existed have been indexed
+DELIVERED_SUFFIX = ".delivered"  # {bucket}.delivered lists the jobs of a bucket that were already delivered
+
+# Top-level names that aren't legacy fingerprint directories
+_RESERVED_NAMES = (JOBS_DIR_NAME, RUNNING_DIR_NAME, EXPIRY_DIR_NAME)
+
+# The sweeper, low-disk eviction and POST /cleanup may sweep at the same time
+_sweep_lock = threading.Lock()
+
+# Jobs this process already marked delivered, so repeat downloads don't append again
+_delivered: set = set()
+_delivered_lock = threading.Lock()
+
+
+def _expiry_dir() -> Path:
+    return Path(STORAGE_ROOT) / EXPIRY_DIR_NAME
+
+
+def _timestamp(expires_at: str) -> float:
+    # Expiry times are stored as naive UTC ISO strings
+    return datetime.fromisoformat(expires_at).replace(tzinfo=timezone.utc).timestamp()
+
+
+def _append_entry(name: str, fingerprint: str, job_id: str):
+    expiry_dir = _expiry_dir()
+    expiry_dir.mkdir(parents=True, exist_ok=True)
+    # One short O_APPEND write per entry, so concurrent writers don't interleave
+    with open(expiry_dir / name, "a", encoding="utf-8") as f:
+        f.write(f"{fingerprint}/{job_id}\n")
+
+
+def index_expiry(fingerprint: str, job_id: str, expires_at: Optional[float] = None):
+    """
+    Record when a job expires (a Unix time, by default TTL_DAYS from now).
     
+    A job may be indexed more than once (when submitted, then when its outputs
+    are saved); the sweep goes by the job's current expiry and indexes it again
+    if that is still ahead.
+    """
+    if expires_at is None:
+        expires_at = time.time() + TTL_DAYS * 86400
+    _append_entry(str(int(expires_at // EXPIRY_BUCKET_SECONDS)), fingerprint, job_id)
+
+
+def _mark_delivered(fingerprint: str, job_id: str, metadata: Dict[str, Any]):
+    """Note that a job's transcript reached the client, making it first in line for low-disk eviction"""
+    with _delivered_lock:
+        if job_id in _delivered:
+            return
+        if len(_delivered) >= 100000:
+            _delivered.clear()
+        _delivered.add(job_id)
+    try:
+        bucket = int(_timestamp(metadata["expires_at"]) // EXPIRY_BUCKET_SECONDS)
+    except (KeyError, ValueError):
+        return
+    _append_entry(f"{bucket}{DELIVERED_SUFFIX}", fingerprint, job_id)
+
+
+def backfill_expiry_index() -> int:
+    """Index the jobs stored before the expiry index existed (walks the storage tree once) and return how many"""
+    storage_root = Path(STORAGE_ROOT)
+    if (storage_root / EXPIRY_DIR_NAME / EXPIRY_BACKFILLED_NAME).exists() or not storage_root.exists():
+        return 0
+    indexed = 0
     for fingerprint_dir in storage_root.iterdir():
-        if not fingerprint_dir.is_dir():
+        if not fingerprint_dir.is_dir() or fingerprint_dir.name in _RESERVED_NAMES:
             continue
-        
         for job_dir in fingerprint_dir.iterdir():
-            if not job_dir.is_dir():
+            if job_dir.is_dir():
+                index_expiry(fingerprint_dir.name, job_dir.name, _expires_at(job_dir))
+                indexed += 1
+    _expiry_dir().mkdir(parents=True, exist_ok=True)
+    (_expiry_dir() / EXPIRY_BACKFILLED_NAME).touch()
+    return indexed
+
+
+def _expires_at(path: Path) -> float:
+    """Expiry of a container or job directory from its metadata, or TTL_DAYS after it was last modified"""
+    try:
+        if path.is_dir():
+            metadata = json.loads((path / LEGACY_METADATA_NAME).read_text(encoding="utf-8"))
+        else:
+            metadata = read_header(path)["metadata"]
+        return _timestamp(metadata["expires_at"])
+    except Exception:
+        return path.stat().st_mtime + TTL_DAYS * 86400
+
+
+def cleanup_expired_transcriptions(max_jobs: Optional[int] = None) -> Dict[str, int]:
+    """
+    Delete expired jobs found through the expiry index.
+    
+    Only index buckets whose hour has passed are read, so the cost follows the
+    number of expired jobs rather than of stored ones. At most max_jobs entries
+    are handled per call; the rest stay in their bucket for the next call.
+    Returns {"jobs", "bytes"} reclaimed.
+    """
+    with _sweep_lock:
+        return _sweep_expired(max_jobs)
+
+
+def _sweep_expired(max_jobs: Optional[int]) -> Dict[str, int]:
+    reclaimed = {"jobs": 0, "bytes": 0}
+    expiry_dir = _expiry_dir()
+    if not expiry_dir.exists():
+        return reclaimed
+    
+    now = time.time()
+    names = os.listdir(expiry_dir)
+    due = sorted(
+        int(name) for name in names
+        if name.isdigit() and (int(name) + 1) * EXPIRY_BUCKET_SECONDS <= now
+    )
+    budget = max_jobs
+    for bucket in due:
+        if budget is not None and budget <= 0:
+            break
+        bucket_path = expiry_dir / str(bucket)
+        entries = bucket_path.read_text(encoding="utf-8").splitlines()
+        handled = entries if budget is None else entries[:budget]
+        for entry in handled:
+            fingerprint, _, job_id = entry.partition("/")
+            if not job_id:
                 continue
-            
-            metadata_path = job_dir / "metadata.json"
-            if not metadata_path.exists():
-                # No metadata, delete if older than TTL
-                if (datetime.utcnow() - datetime.fromtimestamp(job_dir.stat().st_mtime)) > timedelta(days=TTL_DAYS):
-                    import shutil
-                    shutil.rmtree(job_dir)
-                    deleted_count += 1
+            later = None
+            deleted = False
+            for path in _job_paths(fingerprint, job_id):
+                expires_at = _expires_at(path)
+                if expires_at > now:
+                    # Saved or modified since it was indexed
+                    later = max(later or 0, expires_at)
+                    continue
+                reclaimed["bytes"] += _remove(path)
+                deleted = True
+            if later:
+                index_expiry(fingerprint, job_id, later)
+            if deleted:
+                reclaimed["jobs"] += 1
+        if budget is not None:
+            budget -= len(handled)
+        remaining = entries[len(handled):]
+        if remaining:
+            tmp_path = expiry_dir / (str(bucket) + ".tmp")
+            tmp_path.write_text("".join(entry + "\n" for entry in remaining), encoding="utf-8")
+            os.replace(tmp_path, bucket_path)
+        else:
+            bucket_path.unlink()
+    
+    # Delivery lists of buckets that are done
+    for name in names:
+        bucket = name[:-len(DELIVERED_SUFFIX)]
+        if name.endswith(DELIVERED_SUFFIX) and bucket.isdigit() and not (expiry_dir / bucket).exists():
+            try:
+                (expiry_dir / name).unlink()
+            except FileNotFoundError:
+                pass
+    
+    return reclaimed
+
+
+def evict_delivered_transcriptions(target_bytes: int) -> Dict[str, int]:
+    """
+    Delete transcriptions that have already been delivered, oldest first,
+    until target_bytes are reclaimed; for when the disk runs low.
+    
+    A job counts as delivered once a format was downloaded (see find_output);
+    its text shown in a status response doesn't count. The delivery lists are
+    kept per expiry bucket, so they come in the order jobs were saved (every
+    job has the same TTL); index entries of evicted jobs are skipped by the
+    sweep later.
+    Returns {"jobs", "bytes"} reclaimed.
+    """
+    reclaimed = {"jobs": 0, "bytes": 0}
+    expiry_dir = _expiry_dir()
+    if not expiry_dir.exists():
+        return reclaimed
+    
+    buckets = sorted(
+        int(name[:-len(DELIVERED_SUFFIX)]) for name in os.listdir(expiry_dir)
+        if name.endswith(DELIVERED_SUFFIX) and name[:-len(DELIVERED_SUFFIX)].isdigit()
+    )
+    for bucket in buckets:
+        try:
+            entries = (expiry_dir / f"{bucket}{DELIVERED_SUFFIX}").read_text(encoding="utf-8").splitlines()
+        except FileNotFoundError:
+            continue  # Swept meanwhile
+        for entry in entries:
+            if reclaimed["bytes"] >= target_bytes:
+                return reclaimed
+            _, _, job_id = entry.partition("/")
+            if not job_id:
                 continue
-            
+            size = _remove(get_container_path(job_id))
+            if size:
+                reclaimed["bytes"] += size
+                reclaimed["jobs"] += 1
+    
+    return reclaimed
+
+
+def directory_size(path: Path) -> int:
+    """Bytes in the files under path"""
+    total = 0
+    for dir_path, _, file_names in os.walk(path):
+        for name in file_names:
             try:
-                metadata = json.loads(metadata_path.read_text())
-                expires_at = datetime.fromisoformat(metadata.get("expires_at", ""))
-                
-                if now > expires_at:
-                    import shutil
-                    shutil.rmtree(job_dir)
-                    deleted_count += 1
-            except Exception:
-                # If we can't parse metadata, delete if old enough
-                if (datetime.utcnow() - datetime.fromtimestamp(job_dir.stat().st_mtime)) > timedelta(days=TTL_DAYS):
-                    import shutil
-                    shutil.rmtree(job_dir)
-                    deleted_count += 1
-    
-    return deleted_count
+                total += os.stat(os.path.join(dir_path, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+class ExpirySweeper:
+    """
+    Background thread deleting expired transcriptions every interval seconds.
+    
+    Each tick handles at most max_jobs expired jobs; when it had to stop there,
+    the next tick follows right away (after a short pause) instead of after the
+    full interval. The first tick indexes jobs stored before the index existed.
+    """
+    
+    def __init__(self, interval: float, max_jobs: int):
+        self.interval = interval
+        self.max_jobs = max_jobs
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.runs = 0
+        self.jobs_reclaimed = 0
+        self.bytes_reclaimed = 0
+        self.last_run: Optional[float] = None
+    
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="expiry-sweeper", daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "runs": self.runs,
+            "jobs_reclaimed": self.jobs_reclaimed,
+            "bytes_reclaimed": self.bytes_reclaimed,
+            "last_run": self.last_run
+        }
+    
+    def _run(self):
+        try:
+            indexed = backfill_expiry_index()
+            if indexed:
+                logger.info(f"Indexed expiry of {indexed} stored transcriptions")
+        except Exception as e:
+            logger.error(f"Expiry index backfill failed: {str(e)}")
+        while not self._stop.is_set():
+            wait = self.interval
+            try:
+                reclaimed = cleanup_expired_transcriptions(self.max_jobs)
+                self.record(reclaimed)
+                if reclaimed["jobs"]:
+                    logger.info(f"Reclaimed {reclaimed['jobs']} expired transcriptions ({reclaimed['bytes'] / 1e6:.1f} MB)")
+                if reclaimed["jobs"] >= self.max_jobs:
+                    wait = 1.0
+            except Exception as e:
+                logger.error(f"Expiry sweep failed: {str(e)}")
+            self._stop.wait(wait)
+    
+    def record(self, reclaimed: Dict[str, int]):
+        """Count a sweep (the sweeper's own or one run through POST /cleanup)"""
+        self.runs += 1
+        self.jobs_reclaimed += reclaimed["jobs"]
+        self.bytes_reclaimed += reclaimed["bytes"]
+        self.last_run = time.time()
 
 
 def generate_job_id() -> str:
@@ -0,0 +1,197 @@
+import os
+import time
+import shutil
+import threading
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.storage import cleanup_expired_transcriptions, directory_size, evict_delivered_transcriptions
+from app.transcript_cache import transcript_cache
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+
+class InsufficientStorageError(Exception):
+    """Raised when space for an upload can't be reserved, even after evicting transcripts"""
+
+    def __init__(self, required: int, available: int):
+        super().__init__(f"Need {required} bytes, {available} available")
+        self.required = required
+        self.available = available
+
+
+class StorageManager:
+    """
+    Watches free space on the data volume shared by models, uploads and
+    transcripts, and keeps bytes aside for uploads before they are streamed.
+
+    Free space counts as the volume's free bytes minus what is reserved for
+    uploads still arriving. Below evict_below bytes it evicts, oldest first:
+    expired transcriptions, expired transcript cache entries, then
+    transcriptions that were already delivered. An upload is refused only if
+    reserving it would still leave less than refuse_below bytes. A background
+    thread runs the same eviction every check_interval seconds (jobs write
+    decoded audio and outputs without a reservation) and re-measures the
+    bytes used per area every usage_refresh seconds.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        areas: Dict[str, str],
+        evict_below: int,
+        refuse_below: int,
+        check_interval: float,
+        usage_refresh: float
+    ):
+        self.path = path
+        self.areas = areas
+        self.evict_below = evict_below
+        self.refuse_below = refuse_below
+        self.check_interval = check_interval
+        self.usage_refresh = usage_refresh
+        self._reservations: Dict[str, int] = {}
+        self._lock = threading.Lock()  # Guards _reservations; only held briefly
+        self._evict_lock = threading.Lock()  # One space check (and eviction) at a time
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._area_bytes: Dict[str, int] = {}
+        self._measured_at: Optional[float] = None
+        self.evicted_jobs = 0
+        self.evicted_bytes = 0
+        self.refused = 0
+
+    def reserve(self, key: str, nbytes: int):
+        """
+        Set the bytes held for key (an upload), evicting transcripts if that
+        takes free space below evict_below. Raises InsufficientStorageError,
+        holding nothing new, if there still isn't room.
+        """
+        with self._evict_lock:
+            with self._lock:
+                increase = nbytes - self._reservations.get(key, 0)
+            if increase > 0:
+                free = self.free_bytes()
+                if free - increase < self.evict_below:
+                    self._evict(self.evict_below - (free - increase))
+                    free = self.free_bytes()
+                if free - increase < self.refuse_below:
+                    self.refused += 1
+                    raise InsufficientStorageError(increase, max(0, free - self.refuse_below))
+            with self._lock:
+                self._reservations[key] = nbytes
+
+    def hold(self, key: str, nbytes: int):
+        """Set the bytes held for key without checking space, e.g. as an upload's remaining bytes shrink"""
+        with self._lock:
+            self._reservations[key] = nbytes
+
+    def release(self, key: str):
+        """Stop holding space for key, once its bytes are on disk or it was abandoned"""
+        with self._lock:
+            self._reservations.pop(key, None)
+
+    def free_bytes(self) -> int:
+        """Free bytes on the volume, less what is reserved"""
+        with self._lock:
+            reserved = sum(self._reservations.values())
+        return self._disk_usage().free - reserved
+
+    def _disk_usage(self):
+        # The volume's mount point always exists, even before the directories are created
+        path = self.path
+        while not os.path.exists(path):
+            path = os.path.dirname(path) or "."
+        return shutil.disk_usage(path)
+
+    def _evict(self, target: int):
+        """Reclaim at least target bytes if possible; called holding _evict_lock"""
+        steps: List[Tuple[str, Callable[[int], Dict[str, int]]]] = [
+            ("expired transcriptions", lambda remaining: cleanup_expired_transcriptions()),
+            ("expired transcript cache entries", lambda remaining: self._cleanup_transcript_cache()),
+            ("delivered transcriptions", evict_delivered_transcriptions)
+        ]
+        reclaimed = 0
+        for name, step in steps:
+            if reclaimed >= target:
+                break
+            try:
+                result = step(target - reclaimed)
+            except Exception as e:
+                logger.error(f"Evicting {name} failed: {str(e)}")
+                continue
+            reclaimed += result["bytes"]
+            self.evicted_jobs += result["jobs"]
+            self.evicted_bytes += result["bytes"]
+            if result["jobs"]:
+                logger.warning(f"Low disk space: evicted {result['jobs']} {name} ({result['bytes'] / MB:.1f} MB)")
+
+    def _cleanup_transcript_cache(self) -> Dict[str, int]:
+        before = self._disk_usage().free
+        transcript_cache.cleanup()
+        return {"jobs": 0, "bytes": max(0, self._disk_usage().free - before)}
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="storage-manager", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                with self._evict_lock:
+                    free = self.free_bytes()
+                    if free < self.evict_below:
+                        self._evict(self.evict_below - free)
+                if self._measured_at is None or time.time() - self._measured_at >= self.usage_refresh:
+                    self._measure_areas()
+            except Exception as e:
+                logger.error(f"Storage check failed: {str(e)}")
+            self._stop.wait(self.check_interval)
+
+    def _measure_areas(self):
+        # Walks each area, so it runs on its own (long) interval in the background
+        self._area_bytes = {
+            name: directory_size(path) if os.path.isdir(path) else 0
+            for name, path in self.areas.items()
+        }
+        self._measured_at = time.time()
+
+    def stats(self) -> Dict[str, Any]:
+        usage = self._disk_usage()
+        with self._lock:
+            reserved = sum(self._reservations.values())
+            reservations = len(self._reservations)
+        return {
+            "total_bytes": usage.total,
+            "free_bytes": usage.free,
+            "reserved_bytes": reserved,
+            "reservations": reservations,
+            "area_bytes": self._area_bytes,
+            "area_bytes_measured_at": self._measured_at,
+            "evicted_jobs": self.evicted_jobs,
+            "evicted_bytes": self.evicted_bytes,
+            "refused_uploads": self.refused
+        }
+
+
+storage_manager = StorageManager(
+    path=settings.storage_root,
+    areas={
+        "models": settings.model_cache_dir,
+        "uploads": settings.upload_dir,
+        "transcriptions": settings.storage_root,
+        "transcript_cache": settings.transcript_cache_dir
+    },
+    evict_below=settings.storage_evict_below_mb * MB,
+    refuse_below=settings.storage_refuse_below_mb * MB,
+    check_interval=settings.storage_check_interval_seconds,
+    usage_refresh=settings.storage_usage_refresh_seconds
+)
@@ -0,0 +1,217 @@
+import os
+import hmac
+import json
+import time
+import struct
+import hashlib
+import threading
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+from app.config import settings
+from app.segments import SegmentStore
+
+logger = logging.getLogger(__name__)
+
+NONCE_SIZE = 12
+HEADER = struct.Struct(">d")  # Creation time, kept in clear so expiry doesn't need the key
+META_LENGTH = struct.Struct(">I")  # Length of the JSON metadata ahead of the segment store
+
+
+class TranscriptCache:
+    """
+    Content-addressed cache of finished transcripts.
+
+    Entries are keyed on the requester, a hash of the uploaded bytes, the model,
+    the language and the decoding settings, so re-uploading the same file skips
+    inference. Each entry is encrypted with AES-GCM under a key derived from the
+    server secret, the requester and the audio hash: the files on the volume
+    can't be read without the original audio, and one requester's upload never
+    unlocks another's transcript. Entries expire TTL seconds after they were
+    written and the least recently used go first once the size bounds are hit.
+
+    It also tracks which keys are being transcribed right now, so a duplicate
+    submitted meanwhile can follow that job instead of running inference again.
+    """
+
+    def __init__(self, cache_dir: str, secret: bytes, max_entries: int, max_bytes: int, ttl_seconds: float):
+        self.cache_dir = Path(cache_dir)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._secret = secret
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, List[Any]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.attached = 0
+        self.evictions = 0
+
+    def key(self, fingerprint: str, audio_hash: str, model: str, language: Optional[str], options: str) -> str:
+        """Cache key of one transcription request; reveals nothing about its inputs"""
+        message = "\0".join([fingerprint, audio_hash, model, language or "auto", options])
+        return hmac.new(self._secret, b"key\0" + message.encode("utf-8"), hashlib.sha256).hexdigest()
+
+    def _cipher(self, fingerprint: str, audio_hash: str) -> AESGCM:
+        derived = hmac.new(self._secret, f"enc\0{fingerprint}\0{audio_hash}".encode("utf-8"), hashlib.sha256)
+        return AESGCM(derived.digest())
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.bin"
+
+    def get(self, key: str, fingerprint: str, audio_hash: str) -> Optional[Dict[str, Any]]:
+        """Return the cached result for key, in the shape transcribe_audio returns, or None"""
+        path = self._path(key)
+        try:
+            blob = path.read_bytes()
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+
+        header = blob[:HEADER.size]
+        nonce = blob[HEADER.size:HEADER.size + NONCE_SIZE]
+        ciphertext = blob[HEADER.size + NONCE_SIZE:]
+        try:
+            created_at, = HEADER.unpack(header)
+            if time.time() - created_at > self.ttl_seconds:
+                raise ValueError("expired")
+            payload = self._cipher(fingerprint, audio_hash).decrypt(nonce, ciphertext, key.encode("ascii") + header)
+            meta_length, = META_LENGTH.unpack_from(payload)
+            meta = json.loads(payload[META_LENGTH.size:META_LENGTH.size + meta_length])
+            segments = SegmentStore.from_bytes(payload[META_LENGTH.size + meta_length:])
+        except (InvalidTag, ValueError, struct.error):
+            # Expired, truncated or written under another secret
+            self._remove(path)
+            self.misses += 1
+            return None
+
+        os.utime(path)  # Most recently used
+        self.hits += 1
+        return {
+            "language": meta["language"],
+            "duration": meta["duration"],
+            "peak_rss_mb": None,
+            "segments": segments
+        }
+
+    def put(self, key: str, fingerprint: str, audio_hash: str, result: Dict[str, Any]):
+        """Store a transcription result, then evict down to the size bounds"""
+        meta = json.dumps({"language": result["language"], "duration": result["duration"]}).encode("utf-8")
+        payload = META_LENGTH.pack(len(meta)) + meta + result["segments"].to_bytes()
+        header = HEADER.pack(time.time())
+        nonce = os.urandom(NONCE_SIZE)
+        ciphertext = self._cipher(fingerprint, audio_hash).encrypt(nonce, payload, key.encode("ascii") + header)
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_bytes(header + nonce + ciphertext)
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def _entries(self) -> List[Tuple[Path, os.stat_result]]:
+        if not self.cache_dir.exists():
+            return []
+        entries = []
+        for path in self.cache_dir.glob("*.bin"):
+            try:
+                entries.append((path, path.stat()))
+            except FileNotFoundError:
+                pass
+        return entries
+
+    def _remove(self, path: Path):
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+
+    def _evict(self):
+        """Drop least recently used entries until within max_entries and max_bytes"""
+        with self._lock:
+            entries = sorted(self._entries(), key=lambda entry: entry[1].st_mtime)
+            total_bytes = sum(stat.st_size for _, stat in entries)
+            while entries and (len(entries) > self.max_entries or total_bytes > self.max_bytes):
+                path, stat = entries.pop(0)
+                self._remove(path)
+                total_bytes -= stat.st_size
+                self.evictions += 1
+
+    def cleanup(self) -> int:
+        """Delete expired entries and return how many were deleted"""
+        cutoff = time.time() - self.ttl_seconds
+        deleted = 0
+        for path, _ in self._entries():
+            try:
+                with open(path, "rb") as f:
+                    created_at, = HEADER.unpack(f.read(HEADER.size))
+            except (OSError, struct.error):
+                created_at = 0
+            if created_at < cutoff:
+                self._remove(path)
+                deleted += 1
+        if deleted:
+            logger.info(f"Deleted {deleted} expired transcript cache entries")
+        return deleted
+
+    def join(self, key: str, follower: Any) -> bool:
+        """
+        Attach follower to the transcription in flight for key and return True.
+        If none is in flight, record the caller as running it and return False.
+        """
+        with self._lock:
+            if key in self._in_flight:
+                self._in_flight[key].append(follower)
+                self.attached += 1
+                return True
+            self._in_flight[key] = []
+            return False
+
+    def followers(self, key: str) -> List[Any]:
+        """Followers attached so far to the transcription in flight for key"""
+        with self._lock:
+            return list(self._in_flight.get(key, []))
+
+    def finish(self, key: str) -> List[Any]:
+        """Mark the transcription for key as done and return its followers"""
+        with self._lock:
+            return self._in_flight.pop(key, [])
+
+    def stats(self) -> Dict[str, Any]:
+        """Entry counts and hit rates for monitoring"""
+        entries = self._entries()
+        with self._lock:
+            in_flight = len(self._in_flight)
+        return {
+            "entries": len(entries),
+            "bytes": sum(stat.st_size for _, stat in entries),
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "attached": self.attached,
+            "evictions": self.evictions,
+            "in_flight": in_flight
+        }
+
+
+def _cache_secret() -> bytes:
+    secret = settings.transcript_cache_secret or settings.api_key
+    if not secret:
+        # Entries written by a previous run become unreadable and are evicted
+        logger.warning("No TRANSCRIPT_CACHE_SECRET or API_KEY set; transcript cache won't survive restarts")
+        return os.urandom(32)
+    return secret.encode("utf-8")
+
+
+transcript_cache = TranscriptCache(
+    cache_dir=settings.transcript_cache_dir,
+    secret=_cache_secret(),
+    max_entries=settings.transcript_cache_max_entries,
+    max_bytes=settings.transcript_cache_max_mb * 1024 * 1024,
+    ttl_seconds=settings.transcript_cache_ttl_hours * 3600
+)
@@ -1,17 +1,42 @@
-from faster_whisper import WhisperModel
+from faster_whisper import WhisperModel, BatchedInferencePipeline
+from faster_whisper.utils import download_model
+import numpy as np
+import argparse
+import gc
+import json
 import os
-import tempfile
+import threading
 import time
 import logging
-from typing import Optional, Callable
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Callable, Tuple
 from app.models import ModelSize
 from app.config import settings
+from app.audio import SAMPLING_RATE, DecodedAudio, decode_to_pcm
+from app.chunking import find_silence_gaps, plan_chunks
+from app.segments import SegmentStore
 
 logger = logging.getLogger(__name__)
 
 
-# Model cache in memory
-model_cache = {}
+# Characters of preceding transcript passed as the prompt for the next streaming window
+STREAM_PROMPT_CHARS = 200
+
+# Language detection pre-pass: Whisper looks at 30 s of audio at a time
+LANGUAGE_WINDOW_SECONDS = 30
+SILENCE_RMS = 1e-3  # Windows quieter than this say nothing about the language
+
+# Approximate resident size (MB) of each model with int8 weights on CPU,
+# used when the RSS growth of a load can't be measured
+MODEL_SIZE_ESTIMATES_MB = {
+    "tiny": 100,
+    "base": 180,
+    "small": 550,
+    "medium": 1600,
+    "large": 3200,
+}
 
 
 def get_model_cache_dir() -> str:
@@ -21,118 +46,668 @@ def get_model_cache_dir() -> str:
     return cache_dir
 
 
-def load_model(size: ModelSize) -> WhisperModel:
-    """Load Whisper model, using cache if available"""
-    size_str = size.value
-    
-    if size_str not in model_cache:
+def resolve_model_path(size_str: str) -> str:
+    """
+    Return a local directory holding the model, downloading it only if needed.
+
+    Models baked into the image (settings.model_preload_dir) are preferred, then
+    the volume cache. Checking both with local_files_only avoids a Hugging Face
+    round-trip on every load.
+    """
+    for cache_dir in [settings.model_preload_dir, get_model_cache_dir()]:
+        if not cache_dir:
+            continue
+        try:
+            return download_model(size_str, local_files_only=True, cache_dir=cache_dir)
+        except Exception:
+            continue
+    logger.info(f"Model {size_str} not found locally, downloading to {settings.model_cache_dir}")
+    return download_model(size_str, cache_dir=get_model_cache_dir())
+
+
+def download_models(sizes: List[str], cache_dir: str):
+    """Download models into cache_dir (used at image build time)"""
+    os.makedirs(cache_dir, exist_ok=True)
+    for size_str in sizes:
+        path = download_model(size_str, cache_dir=cache_dir)
+        logger.info(f"Downloaded model {size_str} to {path}")
+
+
+def get_rss_mb() -> float:
+    """
+    Current resident anonymous memory of this process in MB (0 if unavailable).
+
+    File-backed pages are left out: the decoded audio is a memory-mapped PCM
+    file whose pages count as resident once read, so the full RSS would grow
+    with the file's length even where the memory actually allocated doesn't.
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("RssAnon:"):
+                    return int(line.split()[1]) / 1024  # Reported in kB
+    except Exception:
+        pass
+    return 0.0
+
+
+class ModelCache:
+    """
+    LRU cache of loaded Whisper models with a memory budget.
+
+    Each entry records an approximate resident size. Before loading a model,
+    least recently used models that no running job holds are evicted until the
+    new one fits in the budget. Models pinned via use() are never evicted.
+    """
+
+    def __init__(self, budget_mb: float):
+        self.budget_mb = budget_mb
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._loading: Dict[str, threading.Event] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.load_seconds_total = 0.0
+
+    def get(self, size: ModelSize) -> WhisperModel:
+        """Return a loaded model without pinning it"""
+        entry = self._acquire(size.value)
+        self._release(size.value)
+        return entry["model"]
+
+    @contextmanager
+    def use(self, size: ModelSize):
+        """Pin a model for the duration of a job so it can't be evicted"""
+        entry = self._acquire(size.value)
+        try:
+            yield entry["model"]
+        finally:
+            self._release(size.value)
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache counters and resident models for tuning the budget"""
+        with self._lock:
+            return {
+                "budget_mb": self.budget_mb,
+                "resident_mb": round(sum(e["size_mb"] for e in self._entries.values()), 1),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "load_seconds_total": round(self.load_seconds_total, 2),
+                "models": [
+                    {
+                        "model": name,
+                        "size_mb": round(entry["size_mb"], 1),
+                        "in_use": entry["in_use"],
+                        "load_seconds": round(entry["load_seconds"], 2)
+                    }
+                    for name, entry in self._entries.items()
+                ]
+            }
+
+    def _acquire(self, size_str: str) -> Dict[str, Any]:
+        while True:
+            with self._lock:
+                entry = self._entries.get(size_str)
+                if entry is not None:
+                    self._entries.move_to_end(size_str)
+                    entry["in_use"] += 1
+                    self.hits += 1
+                    logger.info(f"Using cached model {size_str}")
+                    return entry
+                loading = self._loading.get(size_str)
+                if loading is None:
+                    # This thread loads the model; others wait for it
+                    self.misses += 1
+                    self._loading[size_str] = threading.Event()
+                    self._evict_for(MODEL_SIZE_ESTIMATES_MB.get(size_str, 500))
+                    break
+            loading.wait()
+
+        try:
+            entry = self._load(size_str)
+            with self._lock:
+                entry["in_use"] = 1
+                self._entries[size_str] = entry
+            return entry
+        finally:
+            with self._lock:
+                self._loading.pop(size_str).set()
+
+    def _release(self, size_str: str):
+        with self._lock:
+            entry = self._entries.get(size_str)
+            if entry is not None:
+                entry["in_use"] = max(0, entry["in_use"] - 1)
+
+    def _evict_for(self, needed_mb: float):
+        """Evict idle models, least recently used first, until needed_mb fits. Caller holds the lock."""
+        resident_mb = sum(e["size_mb"] for e in self._entries.values())
+        for name in list(self._entries.keys()):
+            if resident_mb + needed_mb <= self.budget_mb:
+                break
+            entry = self._entries[name]
+            if entry["in_use"] > 0:
+                continue
+            del self._entries[name]
+            resident_mb -= entry["size_mb"]
+            self.evictions += 1
+            logger.info(f"Evicted model {name} ({entry['size_mb']:.0f}MB) from cache")
+        if resident_mb + needed_mb > self.budget_mb:
+            logger.warning(
+                f"Model cache over budget: {resident_mb:.0f}MB resident + {needed_mb:.0f}MB needed > {self.budget_mb:.0f}MB, "
+                f"all remaining models are in use"
+            )
+        gc.collect()
+
+    def _load(self, size_str: str) -> Dict[str, Any]:
         logger.info(f"Loading model {size_str} (not in cache)")
-        cache_dir = get_model_cache_dir()
-        logger.info(f"Model cache directory: {cache_dir}")
-        model_cache[size_str] = WhisperModel(
-            size_str,
-            download_root=cache_dir,
+        rss_before = get_rss_mb()
+        start = time.time()
+        model = WhisperModel(
+            resolve_model_path(size_str),
             device="cpu",
             compute_type="int8",
-            cpu_threads=2  # Use both CPUs on Fly.io free tier (2 shared CPUs)
+            # The cores are split between the chunk threads, so parallel chunks don't oversubscribe them
+            cpu_threads=max(1, (os.cpu_count() or 2) // max(1, settings.chunk_parallelism)),
+            num_workers=max(1, settings.chunk_parallelism)  # Parallel transcribe() calls from chunk threads
         )
-        logger.info(f"Model {size_str} loaded successfully")
-    else:
-        logger.info(f"Using cached model {size_str}")
+        load_seconds = time.time() - start
+        measured_mb = get_rss_mb() - rss_before
+        size_mb = measured_mb if measured_mb > 0 else MODEL_SIZE_ESTIMATES_MB.get(size_str, 500)
+        with self._lock:
+            self.load_seconds_total += load_seconds
+        logger.info(f"Model {size_str} loaded successfully in {load_seconds:.1f}s (~{size_mb:.0f}MB)")
+        return {"model": model, "size_mb": size_mb, "in_use": 0, "load_seconds": load_seconds}
+
+
+# Model cache in memory
+model_cache = ModelCache(budget_mb=settings.model_cache_budget_mb)
+
+
+def load_model(size: ModelSize) -> WhisperModel:
+    """Load Whisper model, using cache if available"""
+    return model_cache.get(size)
+
+
+def get_batch_size(model_size: ModelSize) -> int:
+    """Batch size for batched inference with the given model"""
+    return settings.batch_sizes.get(model_size.value, 8)
+
+
+def decoding_signature(model_size: ModelSize) -> str:
+    """The settings that change the transcript of a given file, for keying cached results"""
+    return json.dumps({
+        "batch_size": get_batch_size(model_size) if settings.batched_inference else None,
+        "chunked": [settings.chunk_parallelism > 1, settings.chunk_min_duration, settings.chunk_target_seconds],
+        "streaming": [settings.streaming_min_duration, settings.stream_window_seconds, settings.stream_overlap_seconds]
+    }, sort_keys=True)
+
+
+def warm_up_models(sizes: List[str]):
+    """
+    Make sure the given models are on disk, load them into the cache and run a
+    short dummy inference so the CTranslate2 kernels are warm for the first job.
+    """
+    for size_str in sizes:
+        try:
+            size = ModelSize(size_str)
+        except ValueError:
+            logger.warning(f"Skipping warm-up of unknown model {size_str}")
+            continue
+        start = time.time()
+        with model_cache.use(size) as model:
+            # One second of silence runs the encoder and a short decode
+            segments, _ = model.transcribe(np.zeros(16000, dtype=np.float32), language="en", beam_size=1)
+            list(segments)
+        logger.info(f"Warmed up model {size_str} in {time.time() - start:.1f}s")
+
+
+class ProgressTracker:
+    """
+    Throttled progress reporting for a job.
+
+    Progress is the share of audio processed. The processed seconds are summed
+    over independently transcribed chunks, so chunks running in parallel report
+    one combined progress value. The transcript language is reported once, as
+    soon as it is known, and each finished segment as it is produced.
+    """
+
+    def __init__(
+        self,
+        model_size: ModelSize,
+        audio_duration: Optional[float],
+        callback: Optional[Callable[[float, float, float], None]],
+        interval: float = 2.0,
+        language_callback: Optional[Callable[[str, float], None]] = None,
+        segment_callback: Optional[Callable[[float, float, str], None]] = None
+    ):
+        self.model_size = model_size
+        self.audio_duration = audio_duration
+        self.callback = callback
+        self.interval = interval
+        self.language_callback = language_callback
+        self.language_reported = False
+        self.segment_callback = segment_callback
+        self.start_time = time.time()
+        self._last_update_time = self.start_time
+        self._processed: Dict[int, float] = {}
+        self._lock = threading.Lock()
+        self.peak_rss_mb = get_rss_mb()
+
+    def sample_memory(self):
+        """Track the peak resident memory seen while the job runs"""
+        self.peak_rss_mb = max(self.peak_rss_mb, get_rss_mb())
+
+    def report_language(self, language: str, probability: float):
+        """Publish the transcript language, once per job"""
+        if self.language_reported:
+            return
+        self.language_reported = True
+        if self.language_callback:
+            self.language_callback(language, probability)
+
+    def report_segment(self, start: float, end: float, text: str):
+        """Publish a finished segment, timed on the whole file"""
+        if self.segment_callback:
+            # Chunks finish segments on several threads
+            with self._lock:
+                self.segment_callback(start, end, text)
+
+    def update(self, processed_seconds: float, chunk: int = 0):
+        """Record that `chunk` has been transcribed up to processed_seconds"""
+        self.sample_memory()
+        if not self.callback or not self.audio_duration or self.audio_duration <= 0:
+            return
+        with self._lock:
+            self._processed[chunk] = processed_seconds
+            current_time = time.time()
+            # Only update progress every 2 seconds to avoid too many Redis writes
+            if current_time - self._last_update_time < self.interval:
+                return
+            self._last_update_time = current_time
+            progress = min(1.0, sum(self._processed.values()) / self.audio_duration)
+            elapsed_time = current_time - self.start_time
+            # Estimate total time based on current progress
+            if progress > 0.01:  # Avoid division by zero
+                estimated_total_time = elapsed_time / progress
+            else:
+                estimated_total_time = estimate_transcription_time(self.audio_duration, self.model_size)
+            self.callback(progress, elapsed_time, estimated_total_time)
+
+
+def start_transcription(
+    model: WhisperModel,
+    model_size: ModelSize,
+    audio,
+    language: Optional[str],
+    initial_prompt: Optional[str] = None
+):
+    """Start transcribing a path or 16 kHz array - returns faster-whisper's (segments, info) tuple"""
+    if settings.batched_inference:
+        # VAD-bounded chunks go through the encoder and decoder in batches
+        batch_size = get_batch_size(model_size)
+        logger.info(f"Calling batched transcribe() with batch_size={batch_size}...")
+        return BatchedInferencePipeline(model=model).transcribe(
+            audio,
+            language=language,
+            batch_size=batch_size,
+            initial_prompt=initial_prompt
+        )
+    logger.info(f"Calling model.transcribe()...")
+    return model.transcribe(
+        audio,
+        language=language,
+        initial_prompt=initial_prompt
+    )
+
+
+def transcribe_serial(
+    model: WhisperModel,
+    model_size: ModelSize,
+    audio,
+    language: Optional[str],
+    tracker: ProgressTracker
+) -> Tuple[str, SegmentStore]:
+    """Transcribe audio as one stream - returns (language, segments)"""
+    segments, info = start_transcription(model, model_size, audio, language)
+    logger.info(f"Transcription started, detected language: {info.language if hasattr(info, 'language') else 'unknown'}")
+    tracker.report_language(info.language, info.language_probability)
+    
+    segments_list = SegmentStore()
+    
+    # Iterate through segments to track progress; only times and text are kept
+    logger.info("Iterating through transcription segments...")
+    for segment in segments:
+        if (len(segments_list) + 1) % 10 == 0:
+            logger.info(f"Processed {len(segments_list) + 1} segments, current time: {segment.end:.1f}s")
+        segments_list.append(segment.start, segment.end, segment.text)
+        tracker.report_segment(segment.start, segment.end, segment.text)
+        # Calculate progress based on segment end time
+        tracker.update(segment.end)
+    
+    return info.language, segments_list
+
+
+def transcribe_chunked(
+    model: WhisperModel,
+    model_size: ModelSize,
+    decoded: DecodedAudio,
+    language: Optional[str],
+    tracker: ProgressTracker
+) -> Tuple[str, SegmentStore]:
+    """
+    Split long audio at silences and transcribe the chunks in parallel.
+
+    Chunks run on settings.chunk_parallelism threads, which the model serves with
+    as many CTranslate2 workers. Segments are merged back in order with their
+    timestamps offset to the start of their chunk. Finished segments are
+    reported in timeline order: a chunk's segments are held back until every
+    earlier chunk is done, so the reported transcript never has holes.
+    """
+    audio = decoded.array
+    chunks = plan_chunks(len(audio), find_silence_gaps(audio), settings.chunk_target_seconds)
+    logger.info(f"Split {len(audio) / SAMPLING_RATE:.0f}s of audio into {len(chunks)} chunks")
+    if len(chunks) == 1:
+        return transcribe_serial(model, model_size, audio, language, tracker)
+    
+    # The first chunk settles the language for all chunks so the transcript stays consistent
+    first_start, first_end = chunks[0]
+    first_segments, info = start_transcription(model, model_size, audio[first_start:first_end], language)
+    detected_language = info.language
+    logger.info(f"Chunked transcription language: {detected_language}")
+    tracker.report_language(detected_language, info.language_probability)
+    
+    # Chunks before `head` are finished; segments of later chunks wait in `held`
+    order_lock = threading.Lock()
+    head = 0
+    finished = set()
+    held: Dict[int, List[Tuple[float, float, str]]] = {}
+    
+    def report_in_order(index: int, start: float, end: float, text: str):
+        with order_lock:
+            if index == head:
+                tracker.report_segment(start, end, text)
+            else:
+                held.setdefault(index, []).append((start, end, text))
+    
+    def finish_in_order(index: int):
+        nonlocal head
+        with order_lock:
+            finished.add(index)
+            while head in finished:
+                head += 1
+                for segment in held.pop(head, []):
+                    tracker.report_segment(*segment)
+    
+    def transcribe_chunk(index: int) -> SegmentStore:
+        chunk_start, chunk_end = chunks[index]
+        offset = chunk_start / SAMPLING_RATE
+        if index == 0:
+            segments = first_segments
+        else:
+            segments, _ = start_transcription(model, model_size, audio[chunk_start:chunk_end], detected_language)
+        # Timestamps are shifted onto the timeline of the whole file as they are stored
+        chunk_segments = SegmentStore()
+        for segment in segments:
+            chunk_segments.append(offset + segment.start, offset + segment.end, segment.text)
+            report_in_order(index, offset + segment.start, offset + segment.end, segment.text)
+            tracker.update(segment.end, chunk=index)
+        tracker.update((chunk_end - chunk_start) / SAMPLING_RATE, chunk=index)
+        finish_in_order(index)
+        logger.info(f"Finished chunk {index + 1}/{len(chunks)} with {len(chunk_segments)} segments")
+        return chunk_segments
+    
+    merged = SegmentStore()
+    with ThreadPoolExecutor(max_workers=settings.chunk_parallelism, thread_name_prefix="chunk") as executor:
+        for chunk_segments in executor.map(transcribe_chunk, range(len(chunks))):
+            merged.extend(chunk_segments)
+    
+    return detected_language, merged
+
+
+def transcribe_streaming(
+    model: WhisperModel,
+    model_size: ModelSize,
+    decoded: DecodedAudio,
+    language: Optional[str],
+    tracker: ProgressTracker,
+    resume_segments: Optional[SegmentStore] = None
+) -> Tuple[str, SegmentStore]:
+    """
+    Transcribe long audio in bounded windows so peak memory doesn't grow with length.
+
+    faster-whisper computes features for its whole input at once, so each call
+    only gets settings.stream_window_seconds of audio. Segments ending in the
+    last stream_overlap_seconds of a window are dropped and decoded again at
+    the start of the next window, which begins at the last kept segment. The
+    tail of the transcript so far is passed as the prompt to carry the decoder
+    context across the boundary.
+    
+    resume_segments are segments already transcribed by an interrupted run;
+    transcription continues from the end of the last one.
+    """
+    window = settings.stream_window_seconds
+    overlap = settings.stream_overlap_seconds
+    duration = decoded.duration
+    detected_language = language
+    segments_list = SegmentStore()
+    segments_list.extend(resume_segments or [])
+    cursor = segments_list.last_end
+    tracker.update(cursor)
+    
+    while cursor < duration:
+        window_end = min(duration, cursor + window)
+        last_window = window_end >= duration
+        commit_limit = window_end if last_window else window_end - overlap
+        prompt = segments_list.text(last=8)[-STREAM_PROMPT_CHARS:] or None
+        
+        segments, info = start_transcription(
+            model,
+            model_size,
+            decoded.window(cursor, window_end),
+            detected_language,
+            initial_prompt=prompt
+        )
+        if detected_language is None:
+            # Keep the first window's language for the whole file
+            detected_language = info.language
+        tracker.report_language(detected_language, info.language_probability)
+        
+        committed_end = cursor
+        for segment in segments:
+            start = cursor + segment.start
+            end = cursor + segment.end
+            if end > commit_limit:
+                break  # Decoded again from the next window with full context
+            segments_list.append(start, end, segment.text)
+            committed_end = end
+            tracker.report_segment(start, end, segment.text)
+            tracker.update(end)
+        
+        tracker.sample_memory()
+        logger.info(
+            f"Streamed window {cursor:.0f}-{window_end:.0f}s, {len(segments_list)} segments so far, "
+            f"peak RSS {tracker.peak_rss_mb:.0f}MB"
+        )
+        if last_window:
+            break
+        # Resume after the last kept segment, or past the window if it had none
+        cursor = committed_end if committed_end > cursor else commit_limit
     
-    return model_cache[size_str]
+    return detected_language, segments_list
+
+
+def detect_language(decoded: DecodedAudio) -> Tuple[Optional[str], float]:
+    """
+    Detect the spoken language with the tiny model on a few windows spread over the audio.
+
+    Each window is one 30 s encoder pass of the cheapest model, so this takes a
+    fraction of a second instead of a full encoder pass of the job's model.
+    Language probabilities are averaged over the windows that aren't silent.
+    Returns (language, probability); language is None when the best average
+    probability is below settings.language_detection_threshold.
+    """
+    start = time.time()
+    duration = decoded.duration
+    count = max(1, settings.language_detection_windows)
+    window = LANGUAGE_WINDOW_SECONDS
+    # Windows centred on evenly spaced points; short files collapse to one window
+    window_starts = sorted({
+        max(0.0, min(duration - window, (i + 0.5) * duration / count - window / 2))
+        for i in range(count)
+    })
+    
+    totals: Dict[str, float] = {}
+    windows_used = 0
+    with model_cache.use(ModelSize.TINY) as model:
+        for window_start in window_starts:
+            samples = np.asarray(decoded.window(window_start, window_start + window))
+            if samples.size == 0 or np.sqrt(np.mean(np.square(samples))) < SILENCE_RMS:
+                continue
+            _, _, all_probabilities = model.detect_language(samples)
+            for language, probability in all_probabilities:
+                totals[language] = totals.get(language, 0.0) + probability
+            windows_used += 1
+    
+    if not windows_used:
+        logger.info("Language pre-pass found no audible windows")
+        return None, 0.0
+    language, total = max(totals.items(), key=lambda item: item[1])
+    probability = total / windows_used
+    logger.info(
+        f"Language pre-pass: {language} ({probability:.2f}) from {windows_used} windows "
+        f"in {time.time() - start:.2f}s"
+    )
+    if probability < settings.language_detection_threshold:
+        return None, probability
+    return language, probability
+
+
+def load_decoded_audio(audio_path: str, pcm_path: str) -> DecodedAudio:
+    """Decode audio_path to PCM at pcm_path, reusing a complete earlier decode"""
+    if os.path.exists(pcm_path):
+        logger.info(f"Reusing decoded PCM at {pcm_path}")
+        return DecodedAudio(pcm_path)
+    return decode_to_pcm(audio_path, pcm_path)
 
 
 def transcribe_audio(
     audio_path: str,
     model_size: ModelSize,
     language: Optional[str] = None,
-    audio_duration: Optional[float] = None,
-    progress_callback: Optional[Callable[[float, float, float], None]] = None
+    progress_callback: Optional[Callable[[float, float, float], None]] = None,
+    pcm_path: Optional[str] = None,
+    language_callback: Optional[Callable[[str, float], None]] = None,
+    segment_callback: Optional[Callable[[float, float, str], None]] = None,
+    resume_segments: Optional[SegmentStore] = None
 ) -> dict:
     """
     Transcribe audio file using faster-whisper.
     
+    The file is decoded once to 16 kHz PCM and every stage works on views of
+    that decode. Files of at least settings.chunk_min_duration seconds are split
+    at silences and transcribed in parallel chunks when chunk_parallelism > 1;
+    otherwise files of at least settings.streaming_min_duration seconds are
+    transcribed in bounded windows to keep peak memory flat. With language
+    "auto" the tiny model detects the language first when it is confident.
+    
     Args:
         audio_path: Path to audio file
         model_size: Whisper model size
         language: Language code or None for auto-detect
-        audio_duration: Duration of audio in seconds (for progress tracking)
         progress_callback: Optional callback(progress, elapsed_time, estimated_total_time)
+        pcm_path: Where to keep the decoded PCM (the caller deletes it); a
+            temporary file that is deleted on return if not given
+        language_callback: Optional callback(language, probability), called once
+            as soon as the language is known
+        segment_callback: Optional callback(start, end, text) for each finished
+            segment, in timeline order
+        resume_segments: Segments committed by an interrupted run of this job;
+            only the audio after the last one is transcribed, in windows
     
     Returns:
-        dict with keys: text, language, segments
+        dict with keys: language, segments (a SegmentStore; segments.text() is
+        the transcript), duration (exact, from the decode), peak_rss_mb (peak
+        resident anonymous memory of this process during the job, see get_rss_mb)
     """
-    logger.info(f"Loading model {model_size.value}")
-    model = load_model(model_size)
+    keep_pcm = pcm_path is not None
+    if keep_pcm:
+        decoded = load_decoded_audio(audio_path, pcm_path)
+    else:
+        decoded = decode_to_pcm(audio_path, os.path.splitext(audio_path)[0] + ".pcm")
+    try:
+        return transcribe_decoded(
+            decoded, model_size, language, progress_callback, language_callback, segment_callback, resume_segments
+        )
+    finally:
+        if keep_pcm:
+            decoded.close()
+        else:
+            decoded.delete()
+
+
+def transcribe_decoded(
+    decoded: DecodedAudio,
+    model_size: ModelSize,
+    language: Optional[str] = None,
+    progress_callback: Optional[Callable[[float, float, float], None]] = None,
+    language_callback: Optional[Callable[[str, float], None]] = None,
+    segment_callback: Optional[Callable[[float, float, str], None]] = None,
+    resume_segments: Optional[SegmentStore] = None
+) -> dict:
+    """Transcribe already decoded audio - see transcribe_audio"""
+    audio_duration = decoded.duration
+    tracker = ProgressTracker(
+        model_size,
+        audio_duration,
+        progress_callback,
+        language_callback=language_callback,
+        segment_callback=segment_callback
+    )
     
     # Prepare language parameter
     lang = None if language == "auto" or language is None else language
-    logger.info(f"Starting transcription: audio_path={audio_path}, language={lang}, duration={audio_duration}s")
+    if lang is None and settings.language_detection_prepass and model_size != ModelSize.TINY:
+        try:
+            lang, probability = detect_language(decoded)
+        except Exception as e:
+            logger.warning(f"Language pre-pass failed, the model will detect the language: {str(e)}")
+            lang = None
+        if lang:
+            tracker.report_language(lang, probability)
     
-    # Run transcription - faster-whisper returns (segments, info) tuple
-    logger.info(f"Calling model.transcribe()...")
-    segments, info = model.transcribe(
-        audio_path,
-        language=lang
-    )
-    logger.info(f"Transcription started, detected language: {info.language if hasattr(info, 'language') else 'unknown'}")
+    logger.info(f"Loading model {model_size.value}")
+    # Pin the model while its segments are being generated so it can't be evicted
+    with model_cache.use(model_size) as model:
+        logger.info(f"Starting transcription: pcm_path={decoded.path}, language={lang}, duration={audio_duration:.1f}s")
+        
+        if resume_segments:
+            # Windows pick up from any point in the file with the transcript so far as context
+            logger.info(f"Resuming from {resume_segments.last_end:.1f}s with {len(resume_segments)} segments")
+            detected_language, segments = transcribe_streaming(
+                model, model_size, decoded, lang, tracker, resume_segments=resume_segments
+            )
+        elif audio_duration >= settings.streaming_min_duration:
+            # The longest files go one window at a time, the lowest peak memory of the paths
+            detected_language, segments = transcribe_streaming(model, model_size, decoded, lang, tracker)
+        elif settings.chunk_parallelism > 1 and audio_duration >= settings.chunk_min_duration:
+            # Chunks are bounded in length, so this also caps memory
+            detected_language, segments = transcribe_chunked(model, model_size, decoded, lang, tracker)
+        else:
+            detected_language, segments = transcribe_serial(model, model_size, decoded.array, lang, tracker)
     
-    start_time = time.time()
-    segments_list = []
-    last_progress_value = 0.0
-    last_update_time = start_time
-    segment_count = 0
+    elapsed_total = time.time() - tracker.start_time
+    tracker.sample_memory()
+    logger.info(f"Finished processing {len(segments)} segments in {elapsed_total:.1f}s, peak RSS {tracker.peak_rss_mb:.0f}MB")
     
-    # Iterate through segments to track progress
-    logger.info("Iterating through transcription segments...")
-    for segment in segments:
-        segment_count += 1
-        if segment_count % 10 == 0:
-            logger.info(f"Processed {segment_count} segments, current time: {segment.end:.1f}s")
-        segments_list.append(segment)
-        
-        # Update progress if callback provided and audio duration known
-        if progress_callback and audio_duration and audio_duration > 0:
-            # Calculate progress based on segment end time
-            progress = min(1.0, segment.end / audio_duration)
-            elapsed_time = time.time() - start_time
-            current_time = time.time()
-            
-            # Only update progress every 2 seconds to avoid too many Redis writes
-            if current_time - last_update_time >= 2.0:
-                # Estimate total time based on current progress
-                if progress > 0.01:  # Avoid division by zero
-                    estimated_total_time = elapsed_time / progress
-                else:
-                    estimated_total_time = estimate_transcription_time(audio_duration, model_size)
-                
-                progress_callback(progress, elapsed_time, estimated_total_time)
-                last_progress_value = progress
-                last_update_time = current_time
-    
-    elapsed_total = time.time() - start_time
-    logger.info(f"Finished processing {len(segments_list)} segments in {elapsed_total:.1f}s")
-    
-    # Reconstruct full text from segments
-    text = " ".join([segment.text for segment in segments_list]).strip()
-    logger.info(f"Reconstructed text length: {len(text)} characters")
-    
-    # Convert segments to dict format for compatibility
-    segments_dict = [
-        {
-            "text": segment.text,
-            "start": segment.start,
-            "end": segment.end
-        }
-        for segment in segments_list
-    ]
-    
-    logger.info(f"Transcription complete: language={info.language}, segments={len(segments_dict)}")
+    logger.info(f"Transcription complete: language={detected_language}, segments={len(segments)}")
     return {
-        "text": text,
-        "language": info.language,
-        "segments": segments_dict
+        "language": detected_language,
+        "segments": segments,
+        "duration": audio_duration,
+        "peak_rss_mb": round(tracker.peak_rss_mb, 1)
     }
 
 
@@ -180,3 +755,16 @@ def calculate_credit_cost(duration_seconds: float, model_size: ModelSize) -> flo
     
     multiplier = multipliers.get(model_size, 1.0)
     return duration_minutes * multiplier
+
+
+if __name__ == "__main__":
+    # Build-time model download: python -m app.transcription download tiny base --cache-dir /opt/whisper_models
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Manage Whisper models")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    download_parser = subparsers.add_parser("download", help="Download models into a cache directory")
+    download_parser.add_argument("sizes", nargs="+", choices=[size.value for size in ModelSize])
+    download_parser.add_argument("--cache-dir", default=settings.model_cache_dir)
+    args = parser.parse_args()
+    if args.command == "download":
+        download_models(args.sizes, args.cache_dir)
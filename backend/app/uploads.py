@@ -0,0 +1,428 @@
+import os
+import re
+import json
+import time
+import hashlib
+import uuid
+import shutil
+import tempfile
+import threading
+import logging
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, UploadFile
+from starlette.formparsers import MultiPartException, MultiPartParser
+from starlette.requests import Request
+
+from app.config import settings
+from app.security import ALLOWED_EXTENSIONS, MAX_FILE_SIZE, validate_file_extension
+from app.storage_manager import InsufficientStorageError, storage_manager
+
+logger = logging.getLogger(__name__)
+
+
+def get_upload_dir() -> str:
+    """Get the directory where uploads are streamed to"""
+    upload_dir = settings.upload_dir
+    os.makedirs(upload_dir, exist_ok=True)
+    return upload_dir
+
+
+def reserve_upload_space(key: str, nbytes: int):
+    """Hold disk space for upload bytes still to arrive, or refuse the upload with 507"""
+    try:
+        storage_manager.reserve(key, nbytes)
+    except InsufficientStorageError:
+        raise HTTPException(
+            status_code=507,
+            detail="Server storage is full. Please try again later.",
+            headers={"Retry-After": "300"}
+        )
+
+
+def discard_upload(path: Optional[str]):
+    """Delete an uploaded file, ignoring errors"""
+    if not path:
+        return
+    try:
+        os.unlink(path)
+    except Exception:
+        pass
+
+
+@dataclass
+class ReceivedUpload:
+    """A multipart upload whose file part has been streamed to disk"""
+    path: str
+    filename: str
+    size: int
+    sha256: str
+    fields: Dict[str, str] = field(default_factory=dict)
+
+
+class DiskMultiPartParser(MultiPartParser):
+    """
+    Multipart parser that streams file parts straight into a file in the upload
+    directory instead of a SpooledTemporaryFile, enforcing the size limit and
+    extension as the bytes arrive.
+    """
+
+    def __init__(self, headers: Headers, stream, max_size: int):
+        super().__init__(headers, stream, max_files=1, max_fields=20)
+        self.max_size = max_size
+        self.received = 0
+        self.disk_paths = []
+        self.sha256 = hashlib.sha256()  # Of the file part, hashed as it streams in
+
+    def on_headers_finished(self) -> None:
+        super().on_headers_finished()
+        upload = self._current_part.file
+        if upload is None:
+            return
+        if not validate_file_extension(upload.filename):
+            raise MultiPartException(f"Invalid file type. Allowed: {', '.join(ALLOWED_EXTENSIONS)}")
+        # Swap the spooled buffer for a real file on the upload volume
+        upload.file.close()
+        disk_file = tempfile.NamedTemporaryFile(
+            dir=get_upload_dir(),
+            suffix=os.path.splitext(upload.filename)[1].lower(),
+            delete=False
+        )
+        self.disk_paths.append(disk_file.name)
+        self._files_to_close_on_error.append(disk_file)
+        upload.file = disk_file
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._current_part.file is not None:
+            self.received += end - start
+            if self.received > self.max_size:
+                raise MultiPartException(
+                    f"File too large. Maximum size: {self.max_size / (1024*1024):.0f}MB"
+                )
+            self.sha256.update(data[start:end])
+        super().on_part_data(data, start, end)
+
+
+async def receive_upload(request: Request, file_field: str = "file") -> ReceivedUpload:
+    """
+    Stream a multipart/form-data upload to disk in one pass.
+
+    The file part is written to settings.upload_dir chunk by chunk as it arrives;
+    the caller owns the returned path and must delete it when done. Disk space
+    for the body (by Content-Length) is reserved before reading it.
+    """
+    content_type = request.headers.get("content-type", "")
+    if not content_type.startswith("multipart/form-data"):
+        raise HTTPException(status_code=400, detail="Expected multipart/form-data upload")
+
+    try:
+        expected_size = min(int(request.headers.get("content-length", "")), MAX_FILE_SIZE)
+    except ValueError:
+        expected_size = MAX_FILE_SIZE
+    reservation_key = f"upload:{uuid.uuid4().hex}"
+    await run_in_threadpool(reserve_upload_space, reservation_key, expected_size)
+
+    parser = DiskMultiPartParser(request.headers, request.stream(), max_size=MAX_FILE_SIZE)
+    try:
+        form = await parser.parse()
+    except MultiPartException as e:
+        for path in parser.disk_paths:
+            discard_upload(path)
+        raise HTTPException(status_code=400, detail=e.message)
+    except BaseException:
+        # Client disconnected or similar - don't leave partial uploads behind
+        for path in parser.disk_paths:
+            discard_upload(path)
+        raise
+    finally:
+        # The bytes are on disk now (or gone)
+        storage_manager.release(reservation_key)
+
+    upload = form.get(file_field)
+    if not isinstance(upload, UploadFile):
+        for path in parser.disk_paths:
+            discard_upload(path)
+        raise HTTPException(status_code=400, detail=f"Missing file field '{file_field}'")
+
+    upload.file.close()
+    fields = {key: value for key, value in form.multi_items() if isinstance(value, str)}
+    logger.info(f"Received upload {upload.filename} ({parser.received} bytes) at {upload.file.name}")
+    return ReceivedUpload(
+        path=upload.file.name,
+        filename=upload.filename,
+        size=parser.received,
+        sha256=parser.sha256.hexdigest(),
+        fields=fields
+    )
+
+
+# Resumable uploads
+#
+# A session lives in {upload_dir}/sessions/{upload_id}/ as a preallocated data
+# file plus session.json recording which byte ranges have arrived. Chunks can
+# be PUT in any order and are written straight to their offset in the data
+# file, so memory use doesn't depend on the file size.
+
+UPLOAD_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+CONTENT_RANGE_PATTERN = re.compile(r"^bytes (\d+)-(\d+)/(\d+)$")
+WRITE_BUFFER_SIZE = 1024 * 1024
+
+# Serializes updates to a session's range list within this process
+_session_locks: Dict[str, threading.Lock] = {}
+_session_locks_guard = threading.Lock()
+
+
+def _session_lock(upload_id: str) -> threading.Lock:
+    with _session_locks_guard:
+        return _session_locks.setdefault(upload_id, threading.Lock())
+
+
+def get_sessions_dir() -> Path:
+    """Directory holding resumable upload sessions"""
+    sessions_dir = Path(get_upload_dir()) / "sessions"
+    sessions_dir.mkdir(parents=True, exist_ok=True)
+    return sessions_dir
+
+
+def get_session_path(upload_id: str) -> Path:
+    """Directory of one upload session"""
+    if not UPLOAD_ID_PATTERN.match(upload_id):
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return get_sessions_dir() / upload_id
+
+
+def _write_session(session_path: Path, session: Dict[str, Any]):
+    tmp_path = session_path / "session.json.tmp"
+    tmp_path.write_text(json.dumps(session), encoding="utf-8")
+    os.replace(tmp_path, session_path / "session.json")
+
+
+def merge_ranges(ranges: List[List[int]], start: int, end: int) -> List[List[int]]:
+    """Add the half-open byte range [start, end) to a sorted list of disjoint ranges"""
+    merged = []
+    for range_start, range_end in sorted(ranges + [[start, end]]):
+        if merged and range_start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], range_end)
+        else:
+            merged.append([range_start, range_end])
+    return merged
+
+
+def session_status(session: Dict[str, Any]) -> Dict[str, Any]:
+    """Public view of a session: contiguous offset, received ranges and completeness"""
+    ranges = session["ranges"]
+    offset = ranges[0][1] if ranges and ranges[0][0] == 0 else 0
+    return {
+        "upload_id": session["upload_id"],
+        "size": session["size"],
+        "offset": offset,
+        "received_bytes": sum(end - start for start, end in ranges),
+        "ranges": ranges,
+        "complete": offset == session["size"]
+    }
+
+
+def create_upload_session(fingerprint: str, filename: str, size: int) -> Dict[str, Any]:
+    """Create a session with a preallocated data file of the declared size"""
+    if not validate_file_extension(filename):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid file type. Allowed: {', '.join(ALLOWED_EXTENSIONS)}"
+        )
+    if size <= 0 or size > MAX_FILE_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"File too large. Maximum size: {MAX_FILE_SIZE / (1024*1024):.0f}MB"
+        )
+
+    upload_id = uuid.uuid4().hex
+    # Held until the data is complete, shrinking as chunks arrive
+    reserve_upload_space(_reservation_key(upload_id), size)
+    session_path = get_session_path(upload_id)
+    try:
+        session_path.mkdir(parents=True)
+        data_name = "data" + os.path.splitext(filename)[1].lower()
+        with open(session_path / data_name, "wb") as f:
+            f.truncate(size)  # Sparse until chunks arrive
+
+        now = time.time()
+        session = {
+            "upload_id": upload_id,
+            "fingerprint": fingerprint,
+            "filename": filename,
+            "data_name": data_name,
+            "size": size,
+            "ranges": [],
+            "created_at": now,
+            "updated_at": now
+        }
+        _write_session(session_path, session)
+    except BaseException:
+        delete_upload_session(upload_id)
+        raise
+    logger.info(f"Created upload session {upload_id} for {size} bytes")
+    return session
+
+
+def get_upload_session(upload_id: str, fingerprint: str) -> Dict[str, Any]:
+    """Load a session, checking it belongs to the fingerprint"""
+    session_file = get_session_path(upload_id) / "session.json"
+    try:
+        session = json.loads(session_file.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    if session.get("fingerprint") != fingerprint:
+        raise HTTPException(status_code=403, detail="Access denied")
+    return session
+
+
+def parse_content_range(header: Optional[str], size: int) -> Tuple[int, int]:
+    """Parse 'bytes start-end/total' into a half-open range within the upload"""
+    match = CONTENT_RANGE_PATTERN.match(header or "")
+    if not match:
+        raise HTTPException(status_code=400, detail="Content-Range must be 'bytes start-end/total'")
+    start, end, total = (int(group) for group in match.groups())
+    if total != size or start > end or end >= size:
+        raise HTTPException(status_code=416, detail=f"Range outside upload of {size} bytes")
+    return start, end + 1
+
+
+async def write_upload_chunk(request: Request, upload_id: str, fingerprint: str) -> Dict[str, Any]:
+    """Stream a PUT body into the session's data file at the offset given by Content-Range"""
+    session = await run_in_threadpool(get_upload_session, upload_id, fingerprint)
+    start, end = parse_content_range(request.headers.get("content-range"), session["size"])
+
+    fd = await run_in_threadpool(_open_data, session)
+    position = start
+    buffer = bytearray()
+    try:
+        async for chunk in request.stream():
+            if position + len(buffer) + len(chunk) > end:
+                raise HTTPException(status_code=400, detail="Body is longer than Content-Range")
+            buffer += chunk
+            if len(buffer) >= WRITE_BUFFER_SIZE:
+                await run_in_threadpool(os.pwrite, fd, bytes(buffer), position)
+                position += len(buffer)
+                buffer.clear()
+        if buffer:
+            await run_in_threadpool(os.pwrite, fd, bytes(buffer), position)
+            position += len(buffer)
+    finally:
+        os.close(fd)
+
+    if position != end:
+        raise HTTPException(status_code=400, detail="Body is shorter than Content-Range")
+
+    return await run_in_threadpool(_record_chunk, upload_id, fingerprint, start, end)
+
+
+def _open_data(session: Dict[str, Any]) -> int:
+    """Open a session's data file for writing"""
+    session_path = get_session_path(session["upload_id"])
+    try:
+        return os.open(session_path / session["data_name"], os.O_WRONLY)
+    except FileNotFoundError:
+        raise _missing_data(session_path)
+
+
+def _missing_data(session_path: Path) -> HTTPException:
+    # The data file goes when a complete request takes it, and with the session when that is deleted
+    if not session_path.exists():
+        return HTTPException(status_code=404, detail="Upload not found")
+    return HTTPException(status_code=409, detail="Upload is already being completed")
+
+
+def _record_chunk(upload_id: str, fingerprint: str, start: int, end: int) -> Dict[str, Any]:
+    """Add a written range to the session and return its status"""
+    # Re-read under the lock so concurrent chunks don't lose each other's ranges
+    with _session_lock(upload_id):
+        session = get_upload_session(upload_id, fingerprint)
+        session["ranges"] = merge_ranges(session["ranges"], start, end)
+        session["updated_at"] = time.time()
+        _write_session(get_session_path(upload_id), session)
+    status = session_status(session)
+    storage_manager.hold(_reservation_key(upload_id), status["size"] - status["received_bytes"])
+    return status
+
+
+def hash_file(path: str) -> str:
+    """SHA-256 of a file, read in blocks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(WRITE_BUFFER_SIZE):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def take_upload_data(session: Dict[str, Any]) -> str:
+    """
+    Move a complete session's data file out of the session and return its path.
+    Under the session lock, so of concurrent completes one gets the data and the rest a 409.
+    """
+    session_path = get_session_path(session["upload_id"])
+    fd, path = tempfile.mkstemp(dir=get_upload_dir(), suffix=os.path.splitext(session["data_name"])[1])
+    os.close(fd)
+    with _session_lock(session["upload_id"]):
+        try:
+            os.replace(session_path / session["data_name"], path)
+        except FileNotFoundError:
+            discard_upload(path)
+            raise _missing_data(session_path)
+    storage_manager.release(_reservation_key(session["upload_id"]))
+    return path
+
+
+def restore_upload_data(session: Dict[str, Any], path: str):
+    """Put a data file back into its session, e.g. when finalizing failed"""
+    session_path = get_session_path(session["upload_id"])
+    if session_path.exists():
+        os.replace(path, session_path / session["data_name"])
+    else:
+        discard_upload(path)
+
+
+def delete_upload_session(upload_id: str):
+    """Remove a session directory and whatever it still holds"""
+    shutil.rmtree(get_session_path(upload_id), ignore_errors=True)
+    storage_manager.release(_reservation_key(upload_id))
+    with _session_locks_guard:
+        _session_locks.pop(upload_id, None)
+
+
+def cleanup_stale_upload_sessions() -> int:
+    """Delete sessions that haven't received data within the session TTL"""
+    cutoff = time.time() - settings.upload_session_ttl_hours * 3600
+    deleted = 0
+    for session_path in get_sessions_dir().iterdir():
+        try:
+            session = json.loads((session_path / "session.json").read_text(encoding="utf-8"))
+            updated_at = session.get("updated_at", 0)
+        except Exception:
+            updated_at = session_path.stat().st_mtime
+        if updated_at < cutoff:
+            shutil.rmtree(session_path, ignore_errors=True)
+            storage_manager.release(_reservation_key(session_path.name))
+            deleted += 1
+    if deleted:
+        logger.info(f"Deleted {deleted} abandoned upload sessions")
+    return deleted
+
+
+def _reservation_key(upload_id: str) -> str:
+    return f"upload:{upload_id}"
+
+
+def restore_upload_reservations():
+    """Hold space again for the bytes still to arrive in sessions a previous process left open"""
+    for session_path in get_sessions_dir().iterdir():
+        try:
+            session = json.loads((session_path / "session.json").read_text(encoding="utf-8"))
+        except Exception:
+            continue
+        status = session_status(session)
+        if not status["complete"]:
+            storage_manager.hold(_reservation_key(session_path.name), status["size"] - status["received_bytes"])
@@ -0,0 +1,284 @@
+import multiprocessing
+import queue
+import signal
+import threading
+import logging
+from typing import Any, Callable, Dict, List, Optional
+
+from app.models import ModelSize
+from app.segments import SegmentStore
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerCrashedError(Exception):
+    """Raised when a worker process dies while running a job"""
+    pass
+
+
+def _worker_main(conn, warmup_models: List[str]):
+    """Entry point of a worker process: keep models loaded and run jobs sent over the pipe"""
+    # The API process owns shutdown; don't die on the Ctrl-C sent to the process group
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    # Imported here so models and faster-whisper only live in the worker process
+    from app.transcription import transcribe_audio, warm_up_models, model_cache
+
+    try:
+        warm_up_models(warmup_models)
+    except Exception as e:
+        logging.getLogger(__name__).error(f"Model warm-up failed: {str(e)}", exc_info=True)
+    conn.send(("ready", None))
+
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            break  # API process went away
+        if message is None:
+            break
+
+        job_id, kwargs = message
+
+        def send_progress(progress: float, elapsed_time: float, estimated_total_time: float):
+            conn.send(("progress", (progress, elapsed_time, estimated_total_time)))
+
+        def send_language(language: str, probability: float):
+            conn.send(("language", (language, probability)))
+
+        def send_segment(start: float, end: float, text: str):
+            conn.send(("segment", (start, end, text)))
+
+        try:
+            result = transcribe_audio(
+                progress_callback=send_progress,
+                language_callback=send_language,
+                segment_callback=send_segment,
+                **kwargs
+            )
+            reply = ("result", {
+                "language": result["language"],
+                "duration": result["duration"],
+                "peak_rss_mb": result["peak_rss_mb"],
+                "segments": result["segments"].to_bytes()
+            })
+        except Exception as e:
+            reply = ("error", f"{type(e).__name__}: {str(e)}")
+        # Report this process's model cache before the job outcome so the API can expose it
+        conn.send(("stats", model_cache.stats()))
+        conn.send(reply)
+
+
+class ProcessWorker:
+    """A long-lived worker process that runs one transcription job at a time"""
+
+    def __init__(self, index: int, context, warmup_models: List[str]):
+        self.index = index
+        self._context = context
+        self._warmup_models = warmup_models
+        self._process = None
+        self._conn = None
+        self._lock = threading.Lock()  # Held while a job owns the pipe
+        self.ready = False
+        self.restarts = 0
+        self.model_cache_stats: Optional[Dict[str, Any]] = None
+
+    def start(self):
+        """Spawn the worker process"""
+        parent_conn, child_conn = self._context.Pipe()
+        self._process = self._context.Process(
+            target=_worker_main,
+            args=(child_conn, self._warmup_models),
+            name=f"transcription-worker-{self.index}",
+            daemon=True
+        )
+        self._process.start()
+        child_conn.close()
+        self._conn = parent_conn
+        self.ready = False
+        logger.info(f"Started worker process {self._process.name} (pid {self._process.pid})")
+
+    def stop(self, timeout: float = 5.0):
+        """Ask the worker to exit, killing it if it doesn't"""
+        if not self._process:
+            return
+        try:
+            self._conn.send(None)
+        except Exception:
+            pass
+        self._process.join(timeout)
+        if self._process.is_alive():
+            self._process.kill()
+            self._process.join()
+        self._conn.close()
+        self._process = None
+
+    def poll_ready(self) -> bool:
+        """True once the worker process has finished warming up its models"""
+        if self.ready or not self._conn:
+            return self.ready
+        # A running job reads the pipe itself
+        if self._lock.acquire(blocking=False):
+            try:
+                while self._conn.poll(0):
+                    kind, _ = self._conn.recv()
+                    if kind == "ready":
+                        self.ready = True
+            except (EOFError, OSError):
+                pass
+            finally:
+                self._lock.release()
+        return self.ready
+
+    def run(
+        self,
+        job_id: str,
+        kwargs: Dict[str, Any],
+        progress_callback: Optional[Callable],
+        language_callback: Optional[Callable] = None,
+        segment_callback: Optional[Callable] = None
+    ) -> Dict[str, Any]:
+        """Run a job in the worker process, relaying progress, language and segment events, and return its result"""
+        with self._lock:
+            return self._run(job_id, kwargs, progress_callback, language_callback, segment_callback)
+
+    def _run(
+        self,
+        job_id: str,
+        kwargs: Dict[str, Any],
+        progress_callback: Optional[Callable],
+        language_callback: Optional[Callable],
+        segment_callback: Optional[Callable]
+    ) -> Dict[str, Any]:
+        if not self._process or not self._process.is_alive():
+            self._replace()
+
+        try:
+            self._conn.send((job_id, kwargs))
+        except (BrokenPipeError, OSError):
+            self._crashed()
+        while True:
+            try:
+                if not self._conn.poll(1.0):
+                    if not self._process.is_alive():
+                        self._crashed()
+                    continue
+                kind, payload = self._conn.recv()
+            except (EOFError, OSError):
+                # Pipe closed: the process died, possibly mid-message
+                self._process.join(1.0)
+                self._crashed()
+
+            if kind == "ready":
+                self.ready = True
+            elif kind == "progress":
+                if progress_callback:
+                    progress_callback(*payload)
+            elif kind == "language":
+                if language_callback:
+                    language_callback(*payload)
+            elif kind == "segment":
+                if segment_callback:
+                    segment_callback(*payload)
+            elif kind == "stats":
+                self.model_cache_stats = payload
+            elif kind == "result":
+                return {
+                    "language": payload["language"],
+                    "duration": payload["duration"],
+                    "peak_rss_mb": payload["peak_rss_mb"],
+                    "segments": SegmentStore.from_bytes(payload["segments"])
+                }
+            elif kind == "error":
+                raise RuntimeError(payload)
+
+    def _crashed(self):
+        """Replace the dead worker process and fail the current job"""
+        exitcode = self._process.exitcode
+        self._replace()
+        reason = " (likely out of memory)" if exitcode == -signal.SIGKILL else ""
+        raise WorkerCrashedError(f"Worker process exited with code {exitcode}{reason}")
+
+    def _replace(self):
+        """Replace a dead worker process with a fresh one"""
+        logger.warning(f"Replacing worker process transcription-worker-{self.index}")
+        if self._process:
+            self._process.join(0)
+        if self._conn:
+            self._conn.close()
+        self.restarts += 1
+        self.start()
+
+
+class ProcessWorkerPool:
+    """
+    Pool of long-lived worker processes for transcription.
+
+    Each process keeps its own models loaded, so inference never competes with the
+    API event loop for the GIL. Only progress events and the serialized segment
+    store cross the process boundary. A worker that crashes fails only its own job and
+    is replaced. Each process warms up the configured models when it starts.
+    """
+
+    def __init__(self, num_workers: int, warmup_models: Optional[List[str]] = None):
+        context = multiprocessing.get_context("spawn")
+        self._workers: List[ProcessWorker] = [
+            ProcessWorker(i, context, warmup_models or [])
+            for i in range(max(1, num_workers))
+        ]
+        self._idle: "queue.Queue[ProcessWorker]" = queue.Queue()
+
+    def start(self):
+        """Spawn all worker processes"""
+        for worker in self._workers:
+            worker.start()
+            self._idle.put(worker)
+
+    def stop(self):
+        """Shut down all worker processes"""
+        for worker in self._workers:
+            worker.stop()
+
+    def is_ready(self) -> bool:
+        """True once every worker process has warmed up"""
+        return all([worker.poll_ready() for worker in self._workers])
+
+    def transcribe(
+        self,
+        job_id: str,
+        audio_path: str,
+        model_size: ModelSize,
+        language: Optional[str] = None,
+        progress_callback: Optional[Callable[[float, float, float], None]] = None,
+        language_callback: Optional[Callable[[str, float], None]] = None,
+        segment_callback: Optional[Callable[[float, float, str], None]] = None,
+        pcm_path: Optional[str] = None,
+        resume_segments: Optional[SegmentStore] = None
+    ) -> Dict[str, Any]:
+        """Same contract as transcription.transcribe_audio, executed in an idle worker process"""
+        worker = self._idle.get()
+        try:
+            return worker.run(
+                job_id,
+                {
+                    "audio_path": audio_path,
+                    "model_size": model_size,
+                    "language": language,
+                    "pcm_path": pcm_path,
+                    "resume_segments": resume_segments
+                },
+                progress_callback,
+                language_callback,
+                segment_callback
+            )
+        finally:
+            self._idle.put(worker)
+
+    def stats(self) -> Dict[str, Any]:
+        """Worker counts and per-process model cache stats for monitoring"""
+        return {
+            "workers": len(self._workers),
+            "idle": self._idle.qsize(),
+            "restarts": sum(worker.restarts for worker in self._workers),
+            "model_cache": [worker.model_cache_stats for worker in self._workers]
+        }